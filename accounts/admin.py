@@ -18,7 +18,7 @@ class StudentRequestAdmin(admin.ModelAdmin):
     approve_requests.short_description = "Approve selected student requests"
 
 class StudentProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'created_at')
+    list_display = ('user', 'created_at', 'pictures_ready')
     search_fields = ('user_username', 'user_email',)
 
 admin.site.register(StudentRequest, StudentRequestAdmin)
@@ -0,0 +1,162 @@
+# accounts/images.py
+"""
+Profile picture processing.
+
+``StudentProfile.save()`` hashes a newly uploaded picture (which is cheap
+compared to decoding it), keeps the stored file when the same picture is
+uploaded again, and leaves resizing to the ``process_profile_pictures``
+command. The original is shown until that has run, so one larger than
+``ORIGINAL_MAX_SIZE`` is scaled down when it is saved; that is the only
+decoding done in the request, and JPEGs are scaled while decoding.
+
+That worker decodes each new picture once and writes every size in
+``PICTURE_SIZES`` from the same decoded image, never larger than the
+picture itself. The files are named after the
+picture's hash, so a name always refers to the same content and can be
+cached by browsers and proxies for as long as they like.
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Square crops, largest first: each one is resized from the previous one
+PICTURE_SIZES = {
+    'retina': 600,  # card at 2x
+    'card': 300,    # profile pages and writer cards
+    'avatar': 100,  # comments and bylines, 50px at 2x
+}
+# Bound on the stored original, twice the largest size
+ORIGINAL_MAX_SIZE = 1200
+VARIANT_DIR = 'profile_pictures/sizes'
+JPEG_QUALITY = 85
+
+
+def hash_file(file):
+    """sha256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def bound_original(file):
+    """
+    A picture scaled down to ``ORIGINAL_MAX_SIZE``, if it is larger.
+
+    Only the header is read when the picture is small enough, or isn't
+    an image at all (the worker reports those).
+
+    Returns:
+        ContentFile: The scaled JPEG, or None to keep the file as it is
+    """
+    try:
+        with Image.open(file) as img:
+            if max(img.size) <= ORIGINAL_MAX_SIZE:
+                return None
+            img.draft('RGB', (ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE))
+            img = ImageOps.exif_transpose(img).convert('RGB')
+            img.thumbnail((ORIGINAL_MAX_SIZE, ORIGINAL_MAX_SIZE), Image.LANCZOS)
+            output = BytesIO()
+            img.save(output, format='JPEG', quality=JPEG_QUALITY)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    finally:
+        file.seek(0)
+    return ContentFile(output.getvalue(), name=f'{os.path.splitext(os.path.basename(file.name))[0]}.jpg')
+
+
+def variant_name(picture_hash, size):
+    """Storage name of one size of a picture."""
+    return f'{VARIANT_DIR}/{picture_hash[:2]}/{picture_hash}-{size}.jpg'
+
+
+def render_variants(file):
+    """
+    Decode an image once and encode every size of it.
+
+    Returns:
+        dict: Size name to JPEG bytes
+    """
+    largest = max(PICTURE_SIZES.values())
+    with Image.open(file) as img:
+        # Lets the JPEG decoder scale down while decoding
+        img.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+
+    variants = {}
+    for size_name, size in sorted(PICTURE_SIZES.items(), key=lambda item: -item[1]):
+        # A small picture isn't scaled up, its larger sizes stay at its own
+        size = min(size, *img.size)
+        img = ImageOps.fit(img, (size, size), Image.LANCZOS)
+        output = BytesIO()
+        img.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants[size_name] = output.getvalue()
+    return variants
+
+
+def process_profile(profile):
+    """
+    Write the sizes of a profile's picture and mark them ready.
+
+    Returns:
+        bool: False if the picture couldn't be read
+    """
+    from .models import StudentProfile
+
+    picture_hash = profile.picture_hash
+    try:
+        with profile.profile_picture.open('rb') as file:
+            if not picture_hash:
+                # Uploaded before pictures were hashed
+                picture_hash = hash_file(file)
+            variants = render_variants(file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Can't process the picture of profile {profile.pk}: {e}")
+        variants = None
+
+    if variants:
+        for size_name, content in variants.items():
+            name = variant_name(picture_hash, size_name)
+            # The same name always holds the same image
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(content))
+
+    # Unless a new picture was uploaded meanwhile. A picture that can't be
+    # decoded is done too, with no hash, so pages show the original.
+    StudentProfile.objects.filter(pk=profile.pk, profile_picture=profile.profile_picture.name).update(
+        picture_hash=picture_hash if variants else '', pictures_ready=True,
+    )
+    return variants is not None
+
+
+def process_pending(limit=None):
+    """
+    Process profiles whose picture sizes haven't been written yet.
+
+    Returns:
+        tuple: (processed, failed) profile counts
+    """
+    from .models import StudentProfile
+
+    pending = StudentProfile.objects.filter(pictures_ready=False).exclude(
+        profile_picture=''
+    ).exclude(profile_picture__isnull=True).order_by('updated_at')
+    if limit:
+        pending = pending[:limit]
+
+    processed = failed = 0
+    for profile in pending:
+        if process_profile(profile):
+            processed += 1
+        else:
+            failed += 1
+    return processed, failed
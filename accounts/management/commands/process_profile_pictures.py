@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import images
+
+
+class Command(BaseCommand):
+    help = "Write the resized versions of newly uploaded profile pictures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help="Keep running, checking for new pictures")
+        parser.add_argument('--interval', type=int, default=5,
+                            help="Seconds between checks with --watch (default: 5)")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Most pictures processed per check")
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = images.process_pending(options['limit'])
+            if processed or failed:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Processed {processed} profile picture(s), {failed} couldn't be read"
+                ))
+
+            if not options['watch']:
+                if not (processed or failed):
+                    self.stdout.write("No profile pictures to process")
+                return
+            time.sleep(options['interval'])
@@ -1,10 +1,17 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django_ckeditor_5.fields import CKEditor5Field
+from django.core.files.storage import default_storage
 from django.utils.text import slugify
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
+import os
+
+from .images import bound_original, hash_file, variant_name
+
+
+def profile_picture_path(instance, filename):
+    """Pictures are stored under their content hash, set by StudentProfile.save()"""
+    extension = os.path.splitext(filename)[1].lower()
+    return f'profile_pictures/{instance.picture_hash or os.path.splitext(filename)[0]}{extension}'
 
 class StudentRequest(models.Model):
     """Model for student status requests"""
@@ -20,7 +27,10 @@ class StudentProfile(models.Model):
     """Student profile model that extends the User model"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     bio = CKEditor5Field('Text', blank=True, null=True, config_name='default')
-    profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to=profile_picture_path, blank=True, null=True)
+    # sha256 of profile_picture; its sizes are written by the process_profile_pictures command
+    picture_hash = models.CharField(max_length=64, blank=True, editable=False)
+    pictures_ready = models.BooleanField(default=False, editable=False)
     slug = models.SlugField(unique=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -37,14 +47,44 @@ class StudentProfile(models.Model):
         if not self.slug:
             slug = slugify(self.full_name or self.user.username)
             self.slug = slug
-        if self.profile_picture:
-            img = Image.open(self.profile_picture)
-            img = img.convert('RGB')
-            img.thumbnail((300, 300))  # Resize image to a max of 300x300
-            temp_image = BytesIO()
-            img.save(temp_image, format='JPEG')
-            temp_image.seek(0)
-            self.profile_picture = InMemoryUploadedFile(temp_image, 'ImageField', 
-                                                        self.profile_picture.name, 
-                                                        'image/jpeg', temp_image.tell(), None)
+        picture = self.profile_picture
+        if picture and not picture._committed:
+            # A new upload; resizing happens in the background (accounts.images)
+            picture_hash = hash_file(picture)
+            if self.pk and picture_hash == self.picture_hash:
+                # The same picture again, keep the stored file
+                self.profile_picture = type(self).objects.filter(pk=self.pk).values_list(
+                    'profile_picture', flat=True
+                ).first()
+            else:
+                self.picture_hash = picture_hash
+                self.pictures_ready = False
+                # The original is shown until the sizes are written
+                bounded = bound_original(picture)
+                if bounded:
+                    self.profile_picture = bounded
+        elif not picture:
+            self.picture_hash = ''
+            self.pictures_ready = False
         super().save(*args, **kwargs)
+    
+    def picture_name(self, size):
+        """Storage name of the picture in one of images.PICTURE_SIZES, or of the original until those are written."""
+        if self.pictures_ready and self.picture_hash:
+            return variant_name(self.picture_hash, size)
+        return self.profile_picture.name if self.profile_picture else ''
+    
+    @property
+    def avatar_url(self):
+        name = self.picture_name('avatar')
+        return default_storage.url(name) if name else ''
+    
+    @property
+    def card_url(self):
+        name = self.picture_name('card')
+        return default_storage.url(name) if name else ''
+    
+    @property
+    def retina_url(self):
+        name = self.picture_name('retina')
+        return default_storage.url(name) if name else ''
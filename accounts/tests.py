@@ -1,3 +1,116 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from . import images
+from .models import StudentProfile
+
+
+def upload(color='red', size=(800, 600), name='me.png'):
+    output = BytesIO()
+    Image.new('RGB', size, color).save(output, format='PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+class ProfilePictureTest(TestCase):
+    """Pictures are hashed on save and resized by the background worker"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.profile = StudentProfile.objects.create(
+            user=User.objects.create_user('sam', 'sam@example.com', 'pass')
+        )
+
+    def test_save_only_hashes(self):
+        # A picture within the bound is stored without being decoded
+        picture = upload()
+        with mock.patch('PIL.ImageFile.ImageFile.load') as load:
+            self.profile.profile_picture = picture
+            self.profile.save()
+        load.assert_not_called()
+
+        self.assertEqual(self.profile.profile_picture.name, f'profile_pictures/{self.profile.picture_hash}.png')
+        with self.profile.profile_picture.open('rb') as file:
+            self.assertEqual(file.read(), picture.open().read())
+        self.assertFalse(self.profile.pictures_ready)
+        # The original is shown until the sizes are written
+        self.assertEqual(self.profile.avatar_url, self.profile.profile_picture.url)
+
+    def test_worker_writes_every_size(self):
+        self.profile.profile_picture = upload()
+        self.profile.save()
+
+        self.assertEqual(images.process_pending(), (1, 0))
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.pictures_ready)
+        for size_name, size in images.PICTURE_SIZES.items():
+            name = images.variant_name(self.profile.picture_hash, size_name)
+            with default_storage.open(name) as file, Image.open(file) as img:
+                self.assertEqual(img.size, (size, size))
+        self.assertTrue(self.profile.avatar_url.endswith(f'{self.profile.picture_hash}-avatar.jpg'))
+        self.assertEqual(images.process_pending(), (0, 0))
+
+    def test_large_original_is_bounded(self):
+        self.profile.profile_picture = upload(size=(4000, 3000))
+        self.profile.save()
+        self.assertEqual(self.profile.profile_picture.name, f'profile_pictures/{self.profile.picture_hash}.jpg')
+        with self.profile.profile_picture.open('rb') as file, Image.open(file) as img:
+            self.assertEqual(img.size, (images.ORIGINAL_MAX_SIZE, images.ORIGINAL_MAX_SIZE * 3 // 4))
+
+        # Uploading it again still keeps the stored file
+        name = self.profile.profile_picture.name
+        self.profile.profile_picture = upload(size=(4000, 3000))
+        self.profile.save()
+        self.assertEqual(self.profile.profile_picture.name, name)
+
+    def test_small_picture_is_not_enlarged(self):
+        self.profile.profile_picture = upload(size=(400, 200))
+        self.profile.save()
+        images.process_pending()
+        sizes = {}
+        for size_name in images.PICTURE_SIZES:
+            with default_storage.open(images.variant_name(self.profile.picture_hash, size_name)) as file, \
+                    Image.open(file) as img:
+                sizes[size_name] = img.size
+        self.assertEqual(sizes, {'retina': (200, 200), 'card': (200, 200), 'avatar': (100, 100)})
+
+    def test_unchanged_picture_is_kept(self):
+        self.profile.profile_picture = upload()
+        self.profile.save()
+        images.process_pending()
+        self.profile.refresh_from_db()
+        name = self.profile.profile_picture.name
+
+        self.profile.bio = 'Editor of the sports page'
+        self.profile.save()
+        self.profile.profile_picture = upload(name='again.png')
+        self.profile.save()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.profile_picture.name, name)
+        self.assertTrue(self.profile.pictures_ready)
+
+        self.profile.profile_picture = upload(color='blue')
+        self.profile.save()
+        self.assertNotEqual(self.profile.profile_picture.name, name)
+        self.assertFalse(self.profile.pictures_ready)
+
+    def test_unreadable_picture(self):
+        self.profile.profile_picture = SimpleUploadedFile('broken.png', b'not an image')
+        self.profile.save()
+
+        self.assertEqual(images.process_pending(), (0, 1))
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.pictures_ready)
+        self.assertEqual(self.profile.card_url, self.profile.profile_picture.url)
@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import MediaUpload
+
+
+@admin.register(MediaUpload)
+class MediaUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'news', 'media_type', 'status', 'received', 'size', 'updated_at', 'expires_at')
+    list_filter = ('status', 'media_type')
+    search_fields = ('filename', 'news__title')
+    readonly_fields = ('received', 'sha256', 'media', 'error', 'created_at', 'updated_at')
+    raw_id_fields = ('news',)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked media uploads that expired, with the parts received so far"
+
+    def handle(self, *args, **options):
+        deleted = uploads.clear_stale()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} stale upload(s)"))
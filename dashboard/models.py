@@ -1,3 +1,45 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+from news.models import News, NewsMedia
+
+
+class MediaUpload(models.Model):
+    """
+    A NewsMedia file being uploaded in chunks (see dashboard/uploads.py).
+
+    ``received`` is how many bytes have been written, so an interrupted
+    upload resumes from there until ``expires_at``.
+    """
+    UPLOADING = 'uploading'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (UPLOADING, 'Uploading'),
+        (COMPLETE, 'Complete'),
+        (FAILED, 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    news = models.ForeignKey(News, on_delete=models.CASCADE, related_name='media_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # sha256 of the whole file, checked once it is assembled when given
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    media_type = models.CharField(max_length=10, choices=NewsMedia.MEDIA_TYPE_CHOICES)
+    title = models.CharField(max_length=100, blank=True)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPLOADING)
+    error = models.TextField(blank=True)
+    media = models.OneToOneField(NewsMedia, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size} bytes)'
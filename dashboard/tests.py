@@ -1,3 +1,131 @@
-from django.test import TestCase
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import StudentProfile
+from news.models import Category, News, NewsMedia
+from . import uploads
+from .models import MediaUpload
+
+
+class ChunkedUploadTest(TestCase):
+    """Media files are uploaded in chunks, resumably, and assembled into a NewsMedia"""
+
+    content = os.urandom(2500)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, MEDIA_UPLOAD_TEMP_DIR=os.path.join(media_root, 'parts'), MEDIA_UPLOAD_CHUNK_SIZE=1000,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        user = User.objects.create_user('writer', 'writer@example.com', 'pass')
+        self.post = News.objects.create(
+            title='Concert', author=StudentProfile.objects.create(user=user),
+            category=Category.objects.create(name='Music', image=''),
+            featured_image='news/images/x.jpg', summary='Recording', content='',
+        )
+        self.client.force_login(user)
+
+    def start(self, **data):
+        data = {'filename': 'concert.mp4', 'size': len(self.content), 'media_type': 'video', **data}
+        return self.client.post(reverse('dashboard:start_media_upload', args=[self.post.slug]), data)
+
+    def put(self, url, first, last, **headers):
+        return self.client.put(
+            url, self.content[first:last + 1], content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {first}-{last}/{len(self.content)}', **headers},
+        )
+
+    def test_upload_and_resume(self):
+        received = []
+
+        def hook(media, **kwargs):
+            received.append(media)
+        uploads.media_uploaded.connect(hook)
+        self.addCleanup(uploads.media_uploaded.disconnect, hook)
+
+        response = self.start(sha256=hashlib.sha256(self.content).hexdigest(), title='Live')
+        self.assertEqual(response.status_code, 201)
+        url = response.json()['url']
+
+        self.assertEqual(self.put(url, 0, 999).json()['received'], 1000)
+        # A retried chunk after the connection dropped is refused, with where to resume
+        response = self.put(url, 0, 999)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 1000)
+        self.assertEqual(self.client.get(url).json()['received'], 1000)
+
+        checksum = hashlib.sha256(self.content[1000:2000]).hexdigest()
+        self.assertEqual(self.put(url, 1000, 1999, **{'X-Chunk-SHA256': checksum}).json()['received'], 2000)
+        state = self.put(url, 2000, 2499).json()
+        self.assertEqual(state['status'], MediaUpload.COMPLETE)
+
+        media = NewsMedia.objects.get(news=self.post)
+        self.assertEqual((media.title, media.media_type), ('Live', 'video'))
+        self.assertTrue(media.file.name.startswith('news/media/concert'))
+        with default_storage.open(media.file.name) as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertEqual(received, [media])
+        self.assertFalse(os.path.exists(uploads.part_path(MediaUpload.objects.get())))
+
+    def test_checksums(self):
+        url = self.start().json()['url']
+        response = self.put(url, 0, 999, **{'X-Chunk-SHA256': '0' * 64})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['received'], 0)
+
+        # Nothing would check an upload with neither checksum
+        url = self.start().json()['url']
+        response = self.put(url, 0, 999)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('X-Chunk-SHA256', response.json()['error'])
+
+        url = self.start(sha256='0' * 64).json()['url']
+        for first in (0, 1000, 2000):
+            response = self.put(url, first, min(first + 999, 2499))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], MediaUpload.FAILED)
+        self.assertFalse(NewsMedia.objects.exists())
+
+    def test_same_chunk_sent_twice_at_once(self):
+        upload = uploads.start(self.post, 'concert.mp4', len(self.content), 'video', hashlib.sha256(self.content).hexdigest())
+        content = self.content
+
+        class Retried:
+            """A slow first attempt; the retry arrives and is written while it is still being read."""
+            def __init__(self):
+                self.sent = 0
+
+            def read(self, size):
+                if self.sent == 0:
+                    uploads.write_chunk(MediaUpload.objects.get(pk=upload.pk), 0, BytesIO(content[:1000]), 1000)
+                data = b'\0' * min(size, 1000 - self.sent)
+                self.sent += len(data)
+                return data
+
+        with self.assertRaises(uploads.OffsetMismatch):
+            uploads.write_chunk(upload, 0, Retried(), 1000)
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 1000)
+        # The late attempt wrote nothing over the retry
+        with open(uploads.part_path(upload), 'rb') as part:
+            self.assertEqual(part.read(), self.content[:1000])
+
+    def test_only_the_author(self):
+        url = self.start().json()['url']
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        StudentProfile.objects.create(user=other)
+        self.client.force_login(other)
+        self.assertEqual(self.put(url, 0, 999).status_code, 404)
+        self.assertEqual(self.start().status_code, 404)
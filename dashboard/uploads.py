@@ -0,0 +1,262 @@
+# dashboard/uploads.py
+"""
+Chunked, resumable uploads of NewsMedia files.
+
+Large videos and recordings sent through the media formset tie up a worker
+for the whole transfer and get spooled by Django's upload handlers. Instead
+the client:
+
+1. Starts an upload (``start``) with the file's name, size, media type and
+   optionally its sha256.
+2. Sends the file in chunks of at most ``MEDIA_UPLOAD_CHUNK_SIZE`` bytes
+   (``write_chunk``). Each chunk is streamed from the request straight into
+   a part file at its offset, and carries its own sha256 unless the upload
+   was started with the file's. Uploads checked by neither are refused.
+   A chunk is received into a temporary file of its own, with no lock or
+   transaction held while a slow client sends it. Only then is its range
+   claimed, if the upload still stands where the chunk starts, and copied
+   into the part file; of two requests sending the same chunk, one wins
+   and the other is told where to resume.
+3. After an interruption, asks how much was received and continues from
+   there, until the upload expires (``MEDIA_UPLOAD_EXPIRY`` seconds after
+   the last chunk).
+
+Once every byte is in, the whole-file checksum is verified, the part file
+is moved into the media storage under ``news/media/`` and the NewsMedia is
+created. Receivers of the ``media_uploaded`` signal then get the new
+NewsMedia, for processing that shouldn't happen in the request.
+
+``clear_stale_uploads`` deletes expired uploads and their part files.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from news.models import NewsMedia
+from .models import MediaUpload
+
+logger = logging.getLogger(__name__)
+
+# Defaults for MEDIA_UPLOAD_CHUNK_SIZE, MEDIA_UPLOAD_MAX_SIZE and MEDIA_UPLOAD_EXPIRY
+CHUNK_SIZE = 8 * 1024 * 1024
+MAX_SIZE = 2 * 1024 * 1024 * 1024
+EXPIRY = 24 * 60 * 60
+# Read from the request and written to the part file this much at a time
+COPY_BUFFER = 256 * 1024
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Sent with ``media`` (the new NewsMedia) and ``upload`` once a file is in place
+media_uploaded = Signal()
+
+
+class UploadError(Exception):
+    """A request the upload can't accept; ``status`` is the HTTP status to answer with."""
+    status = 400
+
+
+class OffsetMismatch(UploadError):
+    """The chunk doesn't start where the upload stands, the client should resume from ``received``."""
+    status = 409
+
+
+class StoredPartFile(File):
+    """
+    The assembled part file. Having a temporary_file_path() lets
+    FileSystemStorage move it into place instead of copying it.
+    """
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def chunk_size():
+    return getattr(settings, 'MEDIA_UPLOAD_CHUNK_SIZE', CHUNK_SIZE)
+
+
+def part_path(upload):
+    """Where the bytes of an upload are gathered."""
+    directory = getattr(settings, 'MEDIA_UPLOAD_TEMP_DIR', None) or os.path.join(tempfile.gettempdir(), 'media_uploads')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{upload.id}.part')
+
+
+def expiry():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'MEDIA_UPLOAD_EXPIRY', EXPIRY))
+
+
+def start(news, filename, size, media_type, sha256='', title='', description=''):
+    """
+    Start the upload of a file for an article.
+
+    Returns:
+        MediaUpload: The new upload, nothing received yet
+    """
+    filename = os.path.basename(filename or '').strip()
+    if not filename:
+        raise UploadError('A file name is required')
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('The file size must be a number of bytes')
+    max_size = getattr(settings, 'MEDIA_UPLOAD_MAX_SIZE', MAX_SIZE)
+    if not 0 < size <= max_size:
+        raise UploadError(f'Files must be between 1 byte and {max_size} bytes')
+    if media_type not in dict(NewsMedia.MEDIA_TYPE_CHOICES):
+        raise UploadError(f'Unknown media type: {media_type}')
+    sha256 = (sha256 or '').lower()
+    if sha256 and not SHA256_RE.match(sha256):
+        raise UploadError('The checksum must be a hex encoded sha256')
+
+    upload = MediaUpload.objects.create(
+        news=news, filename=filename, size=size, sha256=sha256, media_type=media_type,
+        title=title or '', description=description or '', expires_at=expiry(),
+    )
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length, checksum=''):
+    """
+    Write the ``length`` bytes read from ``stream`` at ``offset``.
+
+    The chunk must start where the upload stands. Without a ``checksum``
+    (allowed when the upload has a whole-file sha256) whatever arrived
+    before the client went away counts as received; with one the whole
+    chunk must arrive and match, or nothing does.
+
+    Returns:
+        MediaUpload: The upload, completed if this was the last chunk
+    """
+    if length <= 0 or length > chunk_size():
+        raise UploadError(f'Chunks must be between 1 byte and {chunk_size()} bytes')
+
+    upload.refresh_from_db()
+    check_offset(upload, offset)
+    if offset + length > upload.size:
+        raise UploadError('The chunk goes past the end of the file')
+    if not checksum and not upload.sha256:
+        raise UploadError('Chunks need an X-Chunk-SHA256 header when the upload has no sha256')
+
+    path = part_path(upload)
+    with tempfile.TemporaryFile(dir=os.path.dirname(path)) as chunk:
+        digest = hashlib.sha256()
+        written = 0
+        while written < length:
+            data = stream.read(min(COPY_BUFFER, length - written))
+            if not data:
+                break
+            chunk.write(data)
+            digest.update(data)
+            written += len(data)
+
+        if checksum and (written != length or digest.hexdigest() != checksum.lower()):
+            raise UploadError("The chunk doesn't match its checksum")
+
+        if written:
+            with transaction.atomic():
+                # Claimed only if no other attempt moved the upload on meanwhile.
+                # The updated row stays locked until the bytes are in place,
+                # keeping the next chunk out
+                claimed = MediaUpload.objects.filter(
+                    pk=upload.pk, status=MediaUpload.UPLOADING, received=offset,
+                ).update(received=offset + written, expires_at=expiry(), updated_at=timezone.now())
+                if not claimed:
+                    upload.refresh_from_db()
+                    check_offset(upload, offset)
+                chunk.seek(0)
+                with open(path, 'r+b') as part:
+                    part.seek(offset)
+                    shutil.copyfileobj(chunk, part, COPY_BUFFER)
+                    # Bytes past the end come from an earlier attempt at this chunk
+                    part.truncate()
+
+    upload.refresh_from_db()
+    if upload.received == upload.size:
+        complete(upload)
+    return upload
+
+
+def check_offset(upload, offset):
+    """Refuse a chunk unless the upload is in progress and stands at ``offset``."""
+    if upload.status != MediaUpload.UPLOADING:
+        raise UploadError(f'This upload is {upload.status}')
+    if offset != upload.received:
+        raise OffsetMismatch(f'Expected the chunk at byte {upload.received}')
+
+
+def fail(upload, error):
+    """Give up on an upload and remove what was received."""
+    upload.status = MediaUpload.FAILED
+    upload.error = error
+    upload.save(update_fields=['status', 'error', 'updated_at'])
+    remove_part(upload)
+
+
+def remove_part(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(COPY_BUFFER), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete(upload):
+    """Verify the assembled file, store it and create its NewsMedia."""
+    path = part_path(upload)
+    if upload.sha256 and file_sha256(path) != upload.sha256:
+        fail(upload, 'The file does not match its checksum')
+        raise UploadError('The file does not match its checksum')
+
+    with transaction.atomic():
+        media = NewsMedia(
+            news=upload.news, media_type=upload.media_type,
+            title=upload.title, description=upload.description,
+        )
+        with open(path, 'rb') as part:
+            # Stored under the field's upload_to, moved rather than copied
+            media.file.save(upload.filename, StoredPartFile(part, name=path), save=False)
+        media.save()
+        upload.status = MediaUpload.COMPLETE
+        upload.media = media
+        upload.save(update_fields=['status', 'media', 'updated_at'])
+    remove_part(upload)
+
+    # A failing receiver doesn't undo the upload
+    for receiver, response in media_uploaded.send_robust(sender=NewsMedia, media=media, upload=upload):
+        if isinstance(response, Exception):
+            logger.error(f'Post-upload hook {receiver} failed for {media.file.name}: {response}')
+    return media
+
+
+def clear_stale(now=None):
+    """
+    Delete expired uploads and their part files.
+
+    Returns:
+        int: Uploads deleted
+    """
+    stale = MediaUpload.objects.filter(expires_at__lt=now or timezone.now())
+    count = 0
+    for upload in stale.iterator():
+        remove_part(upload)
+        upload.delete()
+        count += 1
+    return count
@@ -12,6 +12,8 @@ urlpatterns = [
     path('posts/<slug:slug>/edit/', views.edit_post, name='edit_post'),
     path('posts/<slug:slug>/analytics/', views.post_analytics, name='post_analytics'),
     path('posts/<slug:slug>/media/', views.manage_media, name='manage_media'),  # <-- Added line
+    path('posts/<slug:slug>/media/uploads/', views.start_media_upload, name='start_media_upload'),
+    path('uploads/<uuid:upload_id>/', views.media_upload, name='media_upload'),
     path('comments/', views.manage_comments, name='manage_comments'),
     path('comments/<int:comment_id>/approve/', views.approve_comment, name='approve_comment'),
     path('comments/<int:comment_id>/delete/', views.delete_comment, name='delete_comment'),
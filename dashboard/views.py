@@ -1,11 +1,19 @@
+import re
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Count, Sum
 from django.core.paginator import Paginator
 from news.models import News, Category, Comment, NewsMedia
+from news.pagination import KeysetPaginator
+from . import uploads
 from .forms import NewsForm, NewsMediaFormSet
+from .models import MediaUpload
 
 @login_required
 def writer_dashboard(request):
@@ -34,13 +42,14 @@ def writer_dashboard(request):
                      .annotate(count=Count('id'))
                      .order_by('-count'))
     
-    # Media statistics
-    total_media = NewsMedia.objects.filter(news__author=student_profile).count()
-    media_type_counts = (NewsMedia.objects
+    # Media statistics, from the stored file metadata
+    media_type_counts = list(NewsMedia.objects
                         .filter(news__author=student_profile)
                         .values('media_type')
-                        .annotate(count=Count('id'))
+                        .annotate(count=Count('id'), size=Sum('file_size'))
                         .order_by('-count'))
+    total_media = sum(media_type['count'] for media_type in media_type_counts)
+    total_media_size = sum(media_type['size'] or 0 for media_type in media_type_counts)
     
     context = {
         'total_posts': total_posts,
@@ -52,11 +61,14 @@ def writer_dashboard(request):
         'recent_comments': recent_comments,
         'category_stats': list(category_stats),
         'total_media': total_media,
-        'media_type_counts': list(media_type_counts),
+        'total_media_size': total_media_size,
+        'media_type_counts': media_type_counts,
     }
     
     return render(request, 'dashboard/writer_dashboard.html', context)
 
+POST_SORT_OPTIONS = ('-created_at', 'created_at', '-views', 'title')
+
 @login_required
 def post_list(request):
     """View that shows all posts by the logged-in writer"""
@@ -76,12 +88,12 @@ def post_list(request):
         
     # Sorting
     sort_by = request.GET.get('sort', '-created_at')
-    posts = posts.order_by(sort_by)
+    if sort_by not in POST_SORT_OPTIONS:
+        sort_by = '-created_at'
     
-    # Pagination
-    paginator = Paginator(posts, 10)  # 10 posts per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Pagination (by cursor, so deep pages don't use OFFSET)
+    paginator = KeysetPaginator(posts, 10, ordering=(sort_by,), count='approximate')  # 10 posts per page
+    page_obj = paginator.get_page(request)
     
     # Get all categories for filter dropdown
     categories = Category.objects.all()
@@ -192,14 +204,14 @@ def post_analytics(request, slug):
     
     # Get comment statistics
     comment_count = post.comments.count()
-    approved_comment_count = post.approved_comments().count()
+    approved_comment_count = post.approved_comment_count
     
     # Get media statistics
-    media_count = post.media_files.count()
-    media_by_type = (post.media_files
+    media_by_type = list(post.media_files
                     .values('media_type')
-                    .annotate(count=Count('id'))
+                    .annotate(count=Count('id'), size=Sum('file_size'))
                     .order_by('-count'))
+    media_count = sum(media_type['count'] for media_type in media_by_type)
     
     context = {
         'post': post,
@@ -291,4 +303,75 @@ def manage_media(request, slug):
         'title': f'Manage Media for: {post.title}',
     }
     
-    return render(request, 'dashboard/manage_media.html', context)
\ No newline at end of file
+    return render(request, 'dashboard/manage_media.html', context)
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+def upload_state(upload):
+    """What the uploader script needs to know about an upload"""
+    state = {
+        'id': str(upload.id),
+        'url': reverse('dashboard:media_upload', args=[upload.id]),
+        'status': upload.status,
+        'size': upload.size,
+        'received': upload.received,
+        'chunk_size': uploads.chunk_size(),
+    }
+    if upload.media_id:
+        state['media'] = {'id': upload.media_id, 'url': upload.media.get_file_url()}
+    if upload.error:
+        state['error'] = upload.error
+    return state
+
+@login_required
+@require_POST
+def start_media_upload(request, slug):
+    """Start a chunked upload of a media file for one of the writer's posts"""
+    post = get_object_or_404(News, slug=slug, author=request.user.profile)
+    try:
+        upload = uploads.start(
+            post,
+            filename=request.POST.get('filename'),
+            size=request.POST.get('size'),
+            media_type=request.POST.get('media_type'),
+            sha256=request.POST.get('sha256'),
+            title=request.POST.get('title'),
+            description=request.POST.get('description'),
+        )
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(upload_state(upload), status=201)
+
+@login_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def media_upload(request, upload_id):
+    """
+    GET the state of an upload to resume it, PUT a chunk of it or DELETE it.
+
+    A chunk is the raw request body, placed by its
+    ``Content-Range: bytes <first>-<last>/<size>`` header. An optional
+    ``X-Chunk-SHA256`` header is checked against it.
+    """
+    upload = get_object_or_404(MediaUpload, id=upload_id, news__author=request.user.profile)
+
+    if request.method == 'DELETE':
+        uploads.remove_part(upload)
+        upload.delete()
+        return JsonResponse({'status': 'deleted'})
+
+    if request.method == 'PUT':
+        match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return JsonResponse({'error': 'A Content-Range header is required'}, status=400)
+        first, last, size = (int(value) for value in match.groups())
+        length = int(request.headers.get('Content-Length') or 0)
+        if size != upload.size or last - first + 1 != length:
+            return JsonResponse({'error': "Content-Range doesn't match the upload"}, status=400)
+        try:
+            # Read from the request stream as it arrives, never buffered whole
+            uploads.write_chunk(upload, first, request, length, request.headers.get('X-Chunk-SHA256', ''))
+        except uploads.UploadError as e:
+            upload.refresh_from_db()
+            return JsonResponse({'error': str(e), **upload_state(upload)}, status=e.status)
+
+    return JsonResponse(upload_state(upload))
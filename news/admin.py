@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Category, News, NewsMedia, Comment
+from . import comment_counts
 
 class NewsMediaInline(admin.TabularInline):
     model = NewsMedia
@@ -54,5 +55,6 @@ class CommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments']
     
     def approve_comments(self, request, queryset):
-        queryset.update(is_approved=True)
+        # Also updates the articles' comment counts, which update() would skip
+        comment_counts.approve(queryset)
     approve_comments.short_description = "Approve selected comments"
\ No newline at end of file
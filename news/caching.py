@@ -0,0 +1,166 @@
+# news/caching.py
+"""
+Versioned cache keys for the home page, the site-wide news context and search.
+
+Every cached section declares the kinds of content it is built from. Each
+kind has a version number stored in the cache, which news/signals.py bumps
+when such content changes. Bumping a version moves every section that
+depends on it to a fresh key, so stale entries are never read again and
+simply expire.
+
+Sections are read through ``get_or_build``, which protects the database
+from cache stampedes: only one process rebuilds a missing or expired entry
+(the others wait for it, or keep serving the stale value meanwhile), and
+TTLs are jittered so sections cached together don't all expire together.
+"""
+import random
+import time
+from functools import wraps
+
+from django.core.cache import cache
+
+VERSION_KEY_PREFIX = 'cache_version'
+
+# Spread expiry times by +/- this fraction of the TTL
+TTL_JITTER = 0.1
+# Entries are kept this many times their TTL so a stale value can be served
+# while one process rebuilds it
+STALE_FACTOR = 2
+# Longest a rebuild may hold the lock, and how long others wait on a miss
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+
+NEWS = 'news'
+COMMENTS = 'comments'
+CATEGORIES = 'categories'
+TAGS = 'tags'
+WRITERS = 'writers'
+# Any change to an article's search document, published or not
+SEARCH = 'search'
+
+SECTION_DEPENDENCIES = {
+    # HomePageView
+    'latest_news': (NEWS, COMMENTS),
+    'featured_articles': (NEWS,),
+    'category_articles': (NEWS, CATEGORIES),
+    'most_viewed': (NEWS,),
+    'recent_comments': (COMMENTS,),
+    'active_writers': (NEWS, WRITERS),
+    'home_categories': (NEWS, CATEGORIES),
+    'popular_news': (NEWS, COMMENTS),
+    'trending_tags': (NEWS, TAGS),
+    # news.context_processors.news_context
+    'site_chrome': (NEWS, CATEGORIES, TAGS),
+    # Weekly digest email (subscription.digest)
+    'weekly_digest': (NEWS, CATEGORIES),
+    # The rendered home page (HomePageView.dispatch) uses all of the above
+    'home_page': (NEWS, COMMENTS, CATEGORIES, TAGS, WRITERS),
+    # news.search: result id lists, and the Python index when not on PostgreSQL
+    'search_results': (SEARCH,),
+    'search_index': (SEARCH,),
+}
+
+
+def _version_key(kind):
+    return f'{VERSION_KEY_PREFIX}:{kind}'
+
+
+def get_versions(kinds):
+    """Current version of each kind, creating missing ones."""
+    keys = [_version_key(kind) for kind in kinds]
+    versions = cache.get_many(keys)
+
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        # Seeded from the clock so an evicted version never reuses old keys
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        versions.update(cache.get_many(list(missing)))
+
+    return [versions[key] for key in keys]
+
+
+def section_key(section):
+    """Cache key of a section at the current versions of its dependencies."""
+    versions = get_versions(SECTION_DEPENDENCIES[section])
+    return f"{section}:{'.'.join(str(version) for version in versions)}"
+
+
+def invalidate(*kinds):
+    """Move every section depending on one of ``kinds`` to a new key."""
+    for kind in kinds:
+        try:
+            cache.incr(_version_key(kind))
+        except ValueError:
+            cache.add(_version_key(kind), time.time_ns(), None)
+
+
+def jittered(timeout):
+    return max(1, round(timeout * random.uniform(1 - TTL_JITTER, 1 + TTL_JITTER)))
+
+
+def _store(key, value, timeout):
+    fresh_for = jittered(timeout)
+    cache.set(key, (value, time.time() + fresh_for), fresh_for * STALE_FACTOR)
+    return value
+
+
+def _rebuild(key, build, timeout):
+    """Rebuild under a lock; returns (True, value) or (False, None) if locked."""
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        return False, None
+    try:
+        return True, _store(key, build(), timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def get_or_build(section, build, timeout):
+    """
+    Read a cached section, rebuilding it with ``build()`` when needed.
+
+    Args:
+        section (str): Name from SECTION_DEPENDENCIES
+        build (callable): Computes the value on a miss
+        timeout (int): Seconds the value is considered fresh
+
+    Returns:
+        The cached or freshly built value
+    """
+    key = section_key(section)
+    entry = cache.get(key)
+
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() >= fresh_until:
+            # Stale: one process refreshes, everybody else serves the old value
+            rebuilt, new_value = _rebuild(key, build, timeout)
+            if rebuilt:
+                return new_value
+        return value
+
+    rebuilt, value = _rebuild(key, build, timeout)
+    if rebuilt:
+        return value
+
+    # Someone else is building it: wait for their result rather than piling on
+    deadline = time.time() + WAIT_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+
+    return build()
+
+
+def cached_section(section, timeout):
+    """Decorator caching a method's or function's result via get_or_build."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_build(section, lambda: func(*args, **kwargs), timeout)
+        return wrapper
+    return decorator
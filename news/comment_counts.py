@@ -0,0 +1,76 @@
+# news/comment_counts.py
+"""
+Denormalized ``News.approved_comment_count``.
+
+Comment saves and deletes adjust the counter in the same transaction
+(see news/signals.py and ``Comment.save``). Bulk paths that bypass signals,
+such as approving a queryset, go through ``approve`` instead, and
+``recount`` rebuilds every counter from the comments table.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import caching
+from .models import Comment, News
+
+
+def adjust(deltas):
+    """
+    Apply counter changes.
+
+    Args:
+        deltas (dict): Mapping of news id to the change in approved comments
+    """
+    # One UPDATE per distinct delta rather than per article
+    by_delta = defaultdict(list)
+    for news_id, delta in deltas.items():
+        if delta and news_id is not None:
+            by_delta[delta].append(news_id)
+    for delta, news_ids in by_delta.items():
+        News.objects.filter(pk__in=news_ids).update(
+            approved_comment_count=F('approved_comment_count') + delta
+        )
+
+
+def approve(queryset):
+    """
+    Approve the comments in ``queryset`` and update the counters.
+
+    Returns:
+        int: Number of comments that were approved
+    """
+    with transaction.atomic():
+        pending = list(queryset.filter(is_approved=False).select_for_update()
+                       .values_list('id', 'news_id'))
+        Comment.objects.filter(pk__in=[comment_id for comment_id, _news_id in pending]).update(is_approved=True)
+        adjust(Counter(news_id for _comment_id, news_id in pending))
+
+    if pending:
+        # update() sends no signals
+        caching.invalidate(caching.COMMENTS)
+    return len(pending)
+
+
+def recount():
+    """
+    Recompute every counter from the comments table.
+
+    Returns:
+        int: Number of articles whose counter was wrong
+    """
+    approved = Comment.objects.filter(
+        news=OuterRef('pk'), is_approved=True
+    ).order_by().values('news').annotate(total=Count('id')).values('total')
+    actual = Coalesce(Subquery(approved), Value(0))
+
+    with transaction.atomic():
+        fixed = News.objects.annotate(actual=actual).exclude(
+            approved_comment_count=F('actual')
+        ).update(approved_comment_count=actual)
+
+    if fixed:
+        caching.invalidate(caching.NEWS)
+    return fixed
@@ -1,6 +1,10 @@
 # news/context_processors.py
 
+import operator
+from functools import partial
+
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django.db.models import Count, Q
 from django.conf import settings
 from django.core.cache import cache
@@ -8,15 +12,62 @@ from datetime import timedelta
 from django.contrib.contenttypes.models import ContentType
 
 from .models import News, Category
+from . import caching
+from .dto import ArticleDTO, CategoryDTO, TagDTO
 from taggit.models import Tag
 
+SITE_CHROME_TIMEOUT = 10*60  # 10 minutes
+SITE_CHROME_KEYS = ('categories', 'top_categories', 'featured_news', 'popular_news', 'news_tags')
+
+
+def build_site_chrome():
+    """
+    Evaluate the navigation and sidebar lists shared by every page.
+
+    They are cached together as one bundle so a request needs a single cache
+    read for all of them.
+    """
+    categories = [CategoryDTO.from_category(category) for category in Category.objects.annotate(
+        news_count=Count('news', filter=Q(news__is_live=True))
+    ).order_by('name')]
+
+    return {
+        'categories': categories,
+        # Categories with most news items, derived from the list above
+        'top_categories': sorted(
+            [category for category in categories if category.news_count],
+            key=lambda category: -category.news_count,
+        )[:5],
+        'featured_news': [ArticleDTO.from_news(news) for news in News.published.select_related('category').filter(
+            is_featured=True, 
+        ).order_by('-publish_date')[:4]],
+        'popular_news': [ArticleDTO.from_news(news) for news in News.published.select_related('category').order_by('-views')[:4]],
+        'news_tags': [TagDTO.from_tag(tag) for tag in Tag.objects.all()[:10]],
+    }
+
+
+def get_site_chrome():
+    return caching.get_or_build('site_chrome', build_site_chrome, SITE_CHROME_TIMEOUT)
+
+
+def _is_excluded(request):
+    """Pages in these URL namespaces (e.g. the admin) don't render the news chrome."""
+    match = request.resolver_match
+    if not match:
+        return False
+    excluded = getattr(settings, 'NEWS_CONTEXT_EXCLUDED_NAMESPACES', ('admin',))
+    return any(namespace in excluded for namespace in match.namespaces)
+
+
 def news_context(request):
     """
     Context processor that provides common data for news templates.
-    Implements the same caching strategy used in views.
+
+    The shared lists are lazy: the cached bundle is only read when a template
+    actually uses one of them, and at most once per request.
     """
-    if settings.DEBUG:
-        cache.clear()
+    if _is_excluded(request):
+        return {}
     context = {}
     
     # Current user context
@@ -38,41 +89,10 @@ def news_context(request):
         #         ).count()
         #         context['draft_count'] = draft_count
     
-    # Categories (cached for 1 hour)
-    cache_key = 'all_categories'
-    categories = cache.get(cache_key)
-    if not categories:
-        categories = Category.objects.annotate(news_count=Count('news', 
-            filter=Q(news__status='published', news__publish_date__lte=timezone.now())
-        )).order_by('name')
-        cache.set(cache_key, categories, 60*60)  # 1 hour
-    context['categories'] = categories
-    
-    # Featured news (cached for 10 minutes)
-    cache_key = 'featured_news'
-    featured_news = cache.get(cache_key)
-    if not featured_news:
-        featured_news = News.objects.select_related('author', 'category').filter(
-            status='published', 
-            is_featured=True, 
-            publish_date__lte=timezone.now()
-        ).order_by('-publish_date')[:4]
-        cache.set(cache_key, featured_news, 10*60)  # 10 minutes
-    context['featured_news'] = featured_news
-    
-    # Popular news (cached for 3 hours)
-    cache_key = 'popular_news'
-    popular_news = cache.get(cache_key)
-    if not popular_news:
-        popular_news = News.objects.select_related('author', 'category').filter(
-            status='published',
-        ).order_by('-views')[:4]
-        cache.set(cache_key, popular_news, 3*60*60)  # 3 hours
-    context['popular_news'] = popular_news
-    
-    # Tags
-    news_tags = Tag.objects.all()[:10]
-    context['news_tags'] = news_tags
+    # Categories, featured/popular news, tags and top categories
+    chrome = SimpleLazyObject(get_site_chrome)
+    for name in SITE_CHROME_KEYS:
+        context[name] = SimpleLazyObject(partial(operator.getitem, chrome, name))
     
     # # Latest news (cached for 5 minutes)
     # cache_key = 'latest_news'
@@ -90,16 +110,6 @@ def news_context(request):
     context['week_ago'] = (timezone.now() - timedelta(days=7)).date()
     context['month_ago'] = (timezone.now() - timedelta(days=30)).date()
     
-    # Top categories (with most news items)
-    cache_key = 'top_categories'
-    top_categories = cache.get(cache_key)
-    if not top_categories:
-        top_categories = Category.objects.annotate(
-            news_count=Count('news', filter=Q(news__status='published', news__publish_date__lte=timezone.now()))
-        ).filter(news_count__gt=0).order_by('-news_count')[:5]
-        cache.set(cache_key, top_categories, 3*60*60)  # 3 hours
-    context['top_categories'] = top_categories
-    
     # Search form context
     if 'q' in request.GET:
         context['search_query'] = request.GET.get('q', '')
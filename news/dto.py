@@ -0,0 +1,176 @@
+# news/dto.py
+"""
+Lightweight snapshots of models for cached page sections.
+
+Pickling a model instance, or a QuerySet holding some, stores its whole
+``__dict__``, model state, related-object caches and file fields (which point
+back at the instance). The classes below keep only the values the templates
+read, in ``__slots__``, so cached sections are much smaller and faster to
+load. They expose the same attribute names as the models, so templates use
+them the same way.
+"""
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .images import variants_of
+
+
+class ImageRef:
+    """
+    Stored file name of an image field; ``.url`` is resolved on access.
+
+    ``variants`` are the responsive sizes recorded by news.images, if any.
+    """
+    __slots__ = ('name', 'variants')
+
+    def __init__(self, name, variants=None):
+        self.name = name or ''
+        self.variants = variants
+
+    @classmethod
+    def from_field(cls, field_file):
+        if not field_file:
+            return cls('')
+        return cls(field_file.name, variants_of(field_file))
+
+    @property
+    def url(self):
+        return default_storage.url(self.name) if self.name else ''
+
+    def __bool__(self):
+        return bool(self.name)
+
+    def __str__(self):
+        return self.name
+
+    def __reduce__(self):
+        # Pickle as a plain tuple rather than a slot state dict
+        return (ImageRef, (self.name, self.variants))
+
+
+class Snapshot:
+    """Base class: pickles as a tuple of slot values."""
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def __reduce__(self):
+        return (_restore, (type(self), tuple(getattr(self, name) for name in self.__slots__)))
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {getattr(self, "id", "")}>'
+
+
+def _restore(cls, values):
+    obj = cls.__new__(cls)
+    for name, value in zip(cls.__slots__, values):
+        setattr(obj, name, value)
+    return obj
+
+
+class UserDTO(Snapshot):
+    __slots__ = ('first_name', 'last_name', 'username', 'avatar')
+
+    @classmethod
+    def from_user(cls, user, profile=None):
+        """``profile`` (a StudentProfile) provides the avatar when given."""
+        return cls(
+            first_name=user.first_name,
+            last_name=user.last_name,
+            username=user.username,
+            avatar=ImageRef(profile.picture_name('avatar') if profile else None),
+        )
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+
+class TagDTO(Snapshot):
+    __slots__ = ('name', 'slug', 'num_times')
+
+    @classmethod
+    def from_tag(cls, tag):
+        return cls(name=tag.name, slug=tag.slug, num_times=getattr(tag, 'num_times', None))
+
+
+class CategoryDTO(Snapshot):
+    __slots__ = ('id', 'name', 'slug', 'image', 'news_count', 'articles')
+
+    @classmethod
+    def from_category(cls, category, articles=None):
+        return cls(
+            id=category.id,
+            name=category.name,
+            slug=category.slug,
+            image=ImageRef.from_field(category.image),
+            news_count=getattr(category, 'news_count', None),
+            articles=articles or [],
+        )
+
+
+class ArticleDTO(Snapshot):
+    __slots__ = ('id', 'title', 'slug', 'summary', 'featured_image', 'publish_date',
+                 'views', 'category', 'author', 'tags', 'comment_count')
+
+    @classmethod
+    def from_news(cls, news, category=True, author=False, tags=False, comment_count=None):
+        """
+        Snapshot an article.
+
+        Args:
+            news (News): Article, with the relations asked for already loaded
+            category (bool): Include the category (needs select_related)
+            author (bool): Include the author's user (needs select_related)
+            tags (bool): Include the tags (needs prefetch_related)
+            comment_count (int): Overrides ``approved_comment_count``
+        """
+        # Fields left out with only()/defer() stay empty instead of costing a query
+        deferred = news.get_deferred_fields()
+        return cls(
+            id=news.id,
+            title=news.title,
+            slug=news.slug,
+            summary=None if 'summary' in deferred else news.summary,
+            featured_image=ImageRef.from_field(news.featured_image),
+            publish_date=news.publish_date,
+            views=None if 'views' in deferred else news.views,
+            category=CategoryDTO.from_category(news.category) if category else None,
+            author=UserDTO.from_user(news.author.user) if author else None,
+            tags=[TagDTO.from_tag(tag) for tag in news.tags.all()] if tags else [],
+            comment_count=comment_count if comment_count is not None else (
+                0 if 'approved_comment_count' in deferred else news.approved_comment_count
+            ),
+        )
+
+    def get_absolute_url(self):
+        return reverse('news:news_detail', kwargs={'slug': self.slug})
+
+
+class WriterDTO(Snapshot):
+    __slots__ = ('id', 'slug', 'profile_picture', 'user')
+
+    @classmethod
+    def from_profile(cls, profile):
+        return cls(
+            id=profile.id,
+            slug=profile.slug,
+            profile_picture=ImageRef(profile.picture_name('card')),
+            user=UserDTO.from_user(profile.user, profile),
+        )
+
+
+class CommentDTO(Snapshot):
+    __slots__ = ('id', 'content', 'created_at', 'user', 'news_slug')
+
+    @classmethod
+    def from_comment(cls, comment):
+        user = comment.user
+        return cls(
+            id=comment.id,
+            content=comment.content,
+            created_at=comment.created_at,
+            user=UserDTO.from_user(user, getattr(user, 'profile', None)),
+            news_slug=comment.news.slug,
+        )
@@ -0,0 +1,152 @@
+# news/images.py
+"""
+Responsive variants of article and category images.
+
+Uploaded images used to be sent at their original size everywhere, even as
+100px thumbnails. The ``build_image_variants`` command now writes each image
+at the widths in ``VARIANT_WIDTHS`` (never wider than the original), as JPEG
+plus WebP, and AVIF when Pillow supports it. The widths and formats written
+are recorded in the model's ``<field>_variants`` JSON field, which is NULL
+until the image is processed. The ``{% responsive_image %}`` tag
+(templatetags/responsive_images.py) turns that into ``srcset`` attributes,
+falling back to the original until the variants exist.
+
+Variants are stored as ``variants/<original name>/<width>.<format>``.
+Django never reuses the name of a stored file, so a variant URL always holds
+the same bytes and can be cached indefinitely.
+"""
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from . import caching
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 960, 1280, 1920)
+VARIANT_DIR = 'variants'
+# Encoder settings per format, smallest format first
+FORMATS = {
+    'avif': {'quality': 55},
+    'webp': {'quality': 80, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+CONTENT_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+def available_formats():
+    """Formats this Pillow build can write; JPEG is always included as the fallback."""
+    return [fmt for fmt in FORMATS if fmt == 'jpeg' or features.check(fmt)]
+
+
+def variant_name(name, width, fmt):
+    """Storage name of one variant of a stored image."""
+    return f'{VARIANT_DIR}/{name}/{width}.{fmt}'
+
+
+def variants_of(image):
+    """
+    Recorded variants of a model's FieldFile or of an ImageRef, or None.
+
+    A ``<field>_variants`` column left out with only()/defer() counts as
+    none rather than costing a query.
+    """
+    instance = getattr(image, 'instance', None)
+    if instance is None:
+        return getattr(image, 'variants', None)
+    attname = f'{image.field.name}_variants'
+    if attname in instance.get_deferred_fields():
+        return None
+    return getattr(instance, attname, None)
+
+
+def build_variants(name):
+    """
+    Decode a stored image once and write its variants.
+
+    Each width is resized from the next larger one rather than from the
+    original, which is much cheaper for large uploads.
+
+    Returns:
+        dict: ``{'widths': [...], 'formats': [...]}`` as stored on the model
+    """
+    formats = available_formats()
+    with default_storage.open(name, 'rb') as file, Image.open(file) as img:
+        img.draft('RGB', (VARIANT_WIDTHS[-1], VARIANT_WIDTHS[-1]))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+
+    widths = sorted({width for width in VARIANT_WIDTHS if width < img.width} | {min(img.width, VARIANT_WIDTHS[-1])})
+    for width in reversed(widths):
+        if width != img.width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        for fmt in formats:
+            target = variant_name(name, width, fmt)
+            if default_storage.exists(target):
+                continue
+            output = BytesIO()
+            img.save(output, format=fmt.upper(), **FORMATS[fmt])
+            default_storage.save(target, ContentFile(output.getvalue()))
+
+    return {'widths': widths, 'formats': formats}
+
+
+def process_instance(instance, field_name):
+    """
+    Build the variants of one instance's image and record them.
+
+    Returns:
+        bool: False if the image couldn't be read
+    """
+    field_file = getattr(instance, field_name)
+    try:
+        variants = build_variants(field_file.name)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Can't build variants of {field_file.name}: {e}")
+        variants = None
+
+    changes = {f'{field_name}_variants': variants or {'widths': [], 'formats': []}}
+    model = type(instance)
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        # update() skips auto_now; fragments cached by updated_at (the
+        # article body) would keep the plain <img> otherwise
+        changes['updated_at'] = timezone.now()
+    # Recorded only if the image wasn't replaced meanwhile; an unreadable one
+    # gets no variants, and pages keep using the original
+    model.objects.filter(pk=instance.pk, **{field_name: field_file.name}).update(**changes)
+    return variants is not None
+
+
+def image_fields():
+    """(model, image field name) pairs that get variants."""
+    from .models import Category, News
+    return [(News, 'featured_image'), (Category, 'image')]
+
+
+def process_pending(limit=None):
+    """
+    Build variants for every image that doesn't have them yet.
+
+    Returns:
+        tuple: (processed, failed) image counts
+    """
+    processed = failed = 0
+    for model, field_name in image_fields():
+        pending = model.objects.filter(**{f'{field_name}_variants__isnull': True}).exclude(
+            **{field_name: ''}
+        ).exclude(**{f'{field_name}__isnull': True}).only('pk', field_name)
+        if limit:
+            pending = pending[:limit]
+        for instance in pending:
+            if process_instance(instance, field_name):
+                processed += 1
+            else:
+                failed += 1
+
+    if processed:
+        # update() skips the signals; cached sections hold the old variants
+        caching.invalidate(caching.NEWS, caching.CATEGORIES)
+    return processed, failed
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from news import media_serving
+
+
+class Command(BaseCommand):
+    help = "Compare serving media with django.views.static against news.media_serving"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=64,
+                            help="Size of the test file in MB (default: 64)")
+        parser.add_argument('--requests', type=int, default=20,
+                            help="Requests per case and view (default: 20)")
+
+    def handle(self, *args, **options):
+        results = media_serving.benchmark(options['size'], options['requests'])
+        for case, views in results.items():
+            for name, (sent, seconds) in views.items():
+                self.stdout.write(
+                    f"{case:>5} {name:<13} {options['requests'] / seconds:8.1f} requests/s "
+                    f"{sent / seconds / 1024 / 1024:8.0f} MB/s, {sent / options['requests'] / 1024 / 1024:.1f} MB per request"
+                )
+        self.stdout.write(self.style.SUCCESS("Done"))
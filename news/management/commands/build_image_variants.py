@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news import images
+
+
+class Command(BaseCommand):
+    help = "Write the responsive width and format variants of new article and category images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help="Keep running, checking for new images")
+        parser.add_argument('--interval', type=int, default=10,
+                            help="Seconds between checks with --watch (default: 10)")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Most images processed per model and check")
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = images.process_pending(options['limit'])
+            if processed or failed:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Built variants of {processed} image(s), {failed} couldn't be read"
+                ))
+
+            if not options['watch']:
+                if not (processed or failed):
+                    self.stdout.write("No images need variants")
+                return
+            time.sleep(options['interval'])
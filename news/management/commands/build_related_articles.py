@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from news.related import RELATED_LIMIT, rebuild_related_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the related-articles index from tags, category and TF-IDF similarity"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=RELATED_LIMIT,
+                            help=f"Related articles to keep per article (default: {RELATED_LIMIT})")
+
+    def handle(self, *args, **options):
+        written = rebuild_related_index(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Stored {written} related article link(s)"))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news import view_counter
+
+
+class Command(BaseCommand):
+    help = "Write buffered article view counts to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help="Keep running, flushing every interval")
+        parser.add_argument('--interval', type=int, default=None,
+                            help="Seconds between flushes with --watch (default: NEWS_VIEW_FLUSH_INTERVAL)")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or view_counter.get_flush_interval()
+        while True:
+            flushed = view_counter.flush()
+            if flushed or not options['watch']:
+                self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} buffered view(s)"))
+
+            if not options['watch']:
+                return
+            time.sleep(interval)
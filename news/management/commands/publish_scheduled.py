@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from news import scheduling
+
+
+class Command(BaseCommand):
+    help = "Make scheduled articles live once their publish date has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help="Keep running, waking up when the next article is due")
+        parser.add_argument('--interval', type=int, default=60,
+                            help="Longest sleep between checks with --watch, in seconds (default: 60)")
+
+    def handle(self, *args, **options):
+        while True:
+            published = scheduling.publish_due()
+            if published:
+                self.stdout.write(self.style.SUCCESS(f"Published {len(published)} scheduled article(s)"))
+
+            if not options['watch']:
+                if not published:
+                    self.stdout.write("No scheduled articles are due")
+                return
+
+            # Articles scheduled later are picked up at the next check
+            sleep = options['interval']
+            due = scheduling.next_due()
+            if due:
+                sleep = min(sleep, max(1, (due - timezone.now()).total_seconds()))
+            time.sleep(sleep)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news import media_metadata
+
+
+class Command(BaseCommand):
+    help = "Record the size, type, dimensions and duration of new media files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true',
+                            help="Keep running, checking for new files")
+        parser.add_argument('--interval', type=int, default=10,
+                            help="Seconds between checks with --watch (default: 10)")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="Most files read per check")
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = media_metadata.process_pending(options['limit'])
+            if processed or failed:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Read the metadata of {processed} media file(s), {failed} couldn't be read"
+                ))
+
+            if not options['watch']:
+                if not (processed or failed):
+                    self.stdout.write("No media files need metadata")
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from news.models import News
+from news.search import update_search_document
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored search document of every article"
+
+    def handle(self, *args, **options):
+        count = 0
+        for news in News.objects.select_related('author__user').prefetch_related('tags').iterator(chunk_size=200):
+            update_search_document(news)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search documents for {count} article(s)"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from news import comment_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute every article's approved comment count from its comments"
+
+    def handle(self, *args, **options):
+        fixed = comment_counts.recount()
+        self.stdout.write(self.style.SUCCESS(f"Corrected the comment count of {fixed} article(s)"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from news import view_counter, view_stats
+
+
+class Command(BaseCommand):
+    help = "Flush buffered views and roll hourly article views up into daily totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2,
+                            help="Number of recent days to recompute (default: 2)")
+        parser.add_argument('--keep-days', type=int, default=7,
+                            help="Days of hourly rows to keep (default: 7)")
+
+    def handle(self, *args, **options):
+        flushed = view_counter.flush()
+        rolled_up = view_stats.rollup_daily(days=options['days'])
+        pruned = view_stats.prune_hourly(keep_days=options['keep_days'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Flushed {flushed} view(s), wrote {rolled_up} daily row(s), "
+            f"pruned {pruned} hourly row(s)"
+        ))
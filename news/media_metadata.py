@@ -0,0 +1,262 @@
+# news/media_metadata.py
+"""
+Metadata of NewsMedia files.
+
+The article page and the dashboard used to work out a file's extension and
+icon from its name with template filters, on every render, for every file.
+Instead the size, MIME type, dimensions (images and videos), duration
+(audio and video) and Font Awesome icon class are read once and stored on
+the model.
+
+Reading them can take a while (ffprobe may run for up to 30 seconds), so it
+isn't done while the upload request waits. Saving a new file only sets the
+type and icon, which come from its name, and leaves ``file_size`` NULL
+(``reset_media_metadata`` in signals.py). The ``read_media_metadata``
+command, run with ``--watch`` next to the web server or from cron, reads
+the rest.
+
+Only headers are read, never the whole file.
+Dimensions come from Pillow for images, and from the ``moov`` box of
+MP4/MOV/M4A files along with their duration. WAV durations come from the
+wave module. Other audio and video formats get their duration from ffprobe
+when it is installed, and none otherwise.
+
+The same command fills in files uploaded before the metadata was stored.
+"""
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import struct
+import subprocess
+import wave
+
+from django.utils import timezone
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Types missing from, or named differently in, the mimetypes registry
+MIME_TYPES = {
+    'm4a': 'audio/mp4',
+    'mp3': 'audio/mpeg',
+    'ogg': 'audio/ogg',
+    'oga': 'audio/ogg',
+    'flac': 'audio/flac',
+    'aac': 'audio/aac',
+    'wav': 'audio/wav',
+    'webm': 'video/webm',
+    'mov': 'video/quicktime',
+}
+ICON_CLASSES = {
+    'pdf': 'fas fa-file-pdf',
+    'doc': 'fas fa-file-word', 'docx': 'fas fa-file-word',
+    'xls': 'fas fa-file-excel', 'xlsx': 'fas fa-file-excel', 'csv': 'fas fa-file-excel',
+    'ppt': 'fas fa-file-powerpoint', 'pptx': 'fas fa-file-powerpoint',
+    'zip': 'fas fa-file-archive', 'rar': 'fas fa-file-archive', '7z': 'fas fa-file-archive',
+    'tar': 'fas fa-file-archive', 'gz': 'fas fa-file-archive',
+    'jpg': 'fas fa-file-image', 'jpeg': 'fas fa-file-image', 'png': 'fas fa-file-image',
+    'gif': 'fas fa-file-image', 'bmp': 'fas fa-file-image', 'svg': 'fas fa-file-image',
+    'mp3': 'fas fa-file-audio', 'wav': 'fas fa-file-audio', 'ogg': 'fas fa-file-audio',
+    'flac': 'fas fa-file-audio', 'aac': 'fas fa-file-audio',
+    'mp4': 'fas fa-file-video', 'avi': 'fas fa-file-video', 'mov': 'fas fa-file-video',
+    'wmv': 'fas fa-file-video', 'flv': 'fas fa-file-video', 'webm': 'fas fa-file-video',
+    'txt': 'fas fa-file-alt', 'md': 'fas fa-file-alt', 'rtf': 'fas fa-file-alt',
+    'html': 'fas fa-file-code', 'htm': 'fas fa-file-code', 'xml': 'fas fa-file-code',
+    'js': 'fas fa-file-code', 'css': 'fas fa-file-code', 'py': 'fas fa-file-code',
+    'java': 'fas fa-file-code', 'c': 'fas fa-file-code', 'cpp': 'fas fa-file-code',
+    'php': 'fas fa-file-code',
+}
+# For extensions not listed above
+MIME_ICON_CLASSES = {
+    'image': 'fas fa-file-image',
+    'audio': 'fas fa-file-audio',
+    'video': 'fas fa-file-video',
+    'text': 'fas fa-file-alt',
+}
+DEFAULT_ICON_CLASS = 'fas fa-file'
+MP4_EXTENSIONS = {'mp4', 'm4a', 'm4v', 'mov'}
+
+
+def extension(name):
+    return os.path.splitext(name)[1][1:].lower()
+
+
+def guess_mime_type(name):
+    ext = extension(name)
+    return MIME_TYPES.get(ext) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def icon_class(name, mime_type=''):
+    """Font Awesome class for a file, by extension and then by MIME type."""
+    return (ICON_CLASSES.get(extension(name))
+            or MIME_ICON_CLASSES.get(mime_type.partition('/')[0])
+            or DEFAULT_ICON_CLASS)
+
+
+def _boxes(file, start, end):
+    """(type, content start, end) of the ISO media boxes between two offsets."""
+    position = start
+    while position + 8 <= end:
+        file.seek(position)
+        size, kind = struct.unpack('>I4s', file.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', file.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            return
+        yield kind, position + header, position + size
+        position += size
+
+
+def mp4_metadata(file, size):
+    """Duration and video dimensions from the ``moov`` box of an MP4/MOV file."""
+    metadata = {}
+    for kind, start, end in _boxes(file, 0, size):
+        if kind != b'moov':
+            continue
+        for kind, box_start, box_end in _boxes(file, start, end):
+            if kind == b'mvhd':
+                file.seek(box_start)
+                version = file.read(4)[0]
+                if version == 1:
+                    file.seek(16, os.SEEK_CUR)
+                    timescale, duration = struct.unpack('>IQ', file.read(12))
+                else:
+                    file.seek(8, os.SEEK_CUR)
+                    timescale, duration = struct.unpack('>II', file.read(8))
+                if timescale:
+                    metadata['duration'] = duration / timescale
+            elif kind == b'trak' and 'width' not in metadata:
+                for track_kind, _track_start, track_end in _boxes(file, box_start, box_end):
+                    if track_kind == b'tkhd':
+                        # Ends with the width and height, as 16.16 fixed point
+                        file.seek(track_end - 8)
+                        width, height = struct.unpack('>II', file.read(8))
+                        if width and height:
+                            metadata['width'], metadata['height'] = width >> 16, height >> 16
+        break
+    return metadata
+
+
+def ffprobe_duration(path):
+    """Duration from ffprobe, if installed."""
+    ffprobe = shutil.which('ffprobe')
+    if not ffprobe or not path:
+        return None
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path],
+        capture_output=True, timeout=30,
+    )
+    duration = json.loads(result.stdout or b'{}').get('format', {}).get('duration')
+    return float(duration) if duration else None
+
+
+def local_path(field_file):
+    """A path ffprobe can read, for stored files and uploads spooled to disk."""
+    upload = getattr(field_file, '_file', None)
+    if hasattr(upload, 'temporary_file_path'):
+        return upload.temporary_file_path()
+    if field_file._committed:
+        try:
+            return field_file.path
+        except NotImplementedError:
+            return None
+    return None
+
+
+def read_metadata(field_file):
+    """
+    Metadata of a stored file, or of an upload not saved yet.
+
+    Returns:
+        dict: file_size, mime_type, icon_class and when known width, height
+              and duration, named as the NewsMedia fields
+    """
+    name = field_file.name
+    mime_type = guess_mime_type(name)
+    metadata = {
+        'file_size': field_file.size,
+        'mime_type': mime_type,
+        'icon_class': icon_class(name, mime_type),
+        'width': None,
+        'height': None,
+        'duration': None,
+    }
+    kind = mime_type.partition('/')[0]
+    stored = field_file._committed
+    try:
+        field_file.open('rb')
+        try:
+            if kind == 'image':
+                with Image.open(field_file) as img:
+                    metadata['width'], metadata['height'] = img.size
+            elif extension(name) in MP4_EXTENSIONS:
+                metadata.update(mp4_metadata(field_file, metadata['file_size']))
+            elif extension(name) == 'wav':
+                with wave.open(field_file) as audio:
+                    metadata['duration'] = audio.getnframes() / audio.getframerate()
+        finally:
+            if stored:
+                field_file.close()
+            else:
+                # The upload is read again when it is stored
+                field_file.seek(0)
+        if metadata['duration'] is None and kind in ('audio', 'video'):
+            metadata['duration'] = ffprobe_duration(local_path(field_file))
+    except (OSError, ValueError, EOFError, struct.error, wave.Error, subprocess.SubprocessError) as e:
+        logger.warning(f"Can't read the metadata of {name}: {e}")
+    return metadata
+
+
+def reset(media):
+    """Clear the metadata of a new file until it is read, except what its name gives."""
+    mime_type = guess_mime_type(media.file.name)
+    media.mime_type = mime_type
+    media.icon_class = icon_class(media.file.name, mime_type)
+    media.file_size = media.width = media.height = media.duration = None
+
+
+def apply(media):
+    """Set the metadata fields of a NewsMedia from its file."""
+    for field, value in read_metadata(media.file).items():
+        setattr(media, field, value)
+
+
+def process_pending(limit=None):
+    """
+    Read the metadata of media whose file_size isn't known yet.
+
+    Returns:
+        tuple: (processed, failed) file counts
+    """
+    from .models import News, NewsMedia
+
+    pending = NewsMedia.objects.filter(file_size__isnull=True).exclude(file='')
+    if limit:
+        pending = pending[:limit]
+
+    processed = failed = 0
+    for media in pending:
+        try:
+            apply(media)
+            processed += 1
+        except OSError as e:
+            # The file is gone, its size can't be read. Recorded as empty so
+            # it isn't retried on every check
+            logger.warning(f"Can't read media {media.pk}: {e}")
+            reset(media)
+            media.file_size = 0
+            failed += 1
+
+        changes = {field: getattr(media, field) for field in
+                   ('file_size', 'mime_type', 'icon_class', 'width', 'height', 'duration')}
+        # Recorded only if the file wasn't replaced meanwhile. update() skips
+        # the signals, so touch the article for its cached detail fragment
+        if NewsMedia.objects.filter(pk=media.pk, file=media.file.name).update(**changes):
+            News.objects.filter(pk=media.news_id).update(updated_at=timezone.now())
+    return processed, failed
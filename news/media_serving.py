@@ -0,0 +1,216 @@
+# news/media_serving.py
+"""
+Serving uploaded media with byte ranges and conditional requests.
+
+``django.views.static.serve`` only answers If-Modified-Since. It ignores
+Range, so every seek in an article's video downloads the whole file again,
+and it sends no ETag. ``serve_media`` adds:
+
+- single ``Range: bytes=...`` requests, answered with 206 (or 416), and
+  ``If-Range`` so a range is only sent if the file is still the same
+- a strong ETag built from the file's inode, size and mtime, and the
+  If-None-Match / If-Match / If-Modified-Since handling of
+  ``django.utils.cache.get_conditional_response`` (304 and 412)
+
+The file is handed to ``FileResponse`` unread. Under a server providing
+``wsgi.file_wrapper`` with sendfile (gunicorn), the kernel copies the bytes
+straight from the file to the socket, ranges included: the file is
+positioned at the start of the range and Content-Length bounds the copy.
+
+``manage.py benchmark_media`` compares it with the static view.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.static import serve
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Default for MEDIA_CACHE_MAX_AGE, in seconds
+CACHE_MAX_AGE = 60 * 60 * 24
+
+
+class FileRange:
+    """
+    ``length`` bytes of an open file from ``start``.
+
+    Has no tell() or seek(), so FileResponse takes the Content-Length it is
+    given rather than measuring to the end of the file; fileno() still lets
+    the server use sendfile.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class MediaFileResponse(FileResponse):
+    # Larger reads when the server streams the file itself
+    block_size = 64 * 1024
+
+
+def file_etag(stat):
+    """Strong ETag of a file; stored media names aren't reused, so stat is enough."""
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    The (start, end) byte positions, end included, of a single range.
+
+    Returns:
+        tuple: The positions, None to send the whole file (no header, or one
+               this view doesn't handle such as several ranges), or False
+               when the range is outside the file
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # The last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def if_range_passes(request, etag, mtime):
+    """Whether a Range may be honoured, given the request's If-Range."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    modified = parse_http_date_safe(if_range)
+    return modified is not None and int(mtime) <= modified
+
+
+def serve_media(request, path, document_root=None):
+    """
+    Serve a file below ``document_root`` (MEDIA_ROOT by default).
+
+    Use with a URL pattern such as::
+
+        re_path(r'^media/(?P<path>.*)$', serve_media)
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    fullpath = Path(safe_join(document_root or settings.MEDIA_ROOT, path))
+    try:
+        file = fullpath.open('rb')
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        raise Http404(f'"{path}" does not exist')
+
+    stat = os.fstat(file.fileno())
+    etag = file_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', CACHE_MAX_AGE)}",
+    }
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if conditional is not None:
+        # 304 or 412
+        file.close()
+        for header, value in headers.items():
+            conditional.headers.setdefault(header, value)
+        return conditional
+
+    size = stat.st_size
+    byte_range = None
+    if 'Range' in request.headers and if_range_passes(request, etag, stat.st_mtime):
+        byte_range = parse_range(request.headers['Range'], size)
+    if byte_range is False:
+        file.close()
+        return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    content_type, encoding = mimetypes.guess_type(str(fullpath))
+    content_type = content_type or 'application/octet-stream'
+    if byte_range is None:
+        response = MediaFileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = MediaFileResponse(FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+        response.headers['Content-Length'] = end - start + 1
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    for header, value in headers.items():
+        response.headers[header] = value
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def benchmark(size_mb=64, requests=20):
+    """
+    Time the static view against serve_media on a file of ``size_mb`` MB,
+    reading the responses in-process (so without sendfile).
+
+    Two cases: downloading the whole file, and seeking near the end of a
+    video, i.e. asking for its last MB.
+
+    Returns:
+        dict: Case name to a dict of view name to (bytes sent, seconds)
+    """
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+    cases = {
+        'full': {},
+        'seek': {'HTTP_RANGE': f'bytes={(size_mb - 1) * 1024 * 1024}-'},
+    }
+    views = {'static.serve': serve, 'serve_media': serve_media}
+    root = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(root, 'video.mp4'), 'wb') as file:
+            for _ in range(size_mb):
+                file.write(os.urandom(1024 * 1024))
+
+        results = {}
+        for case, headers in cases.items():
+            results[case] = {}
+            for name, view in views.items():
+                sent = 0
+                started = time.perf_counter()
+                for _ in range(requests):
+                    response = view(factory.get('/media/video.mp4', **headers), 'video.mp4', document_root=root)
+                    for chunk in response.streaming_content:
+                        sent += len(chunk)
+                    response.close()
+                results[case][name] = (sent, time.perf_counter() - started)
+        return results
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-17 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_alter_category_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='news.news')),
+            ],
+            options={
+                'verbose_name_plural': 'Article daily views',
+                'indexes': [models.Index(fields=['day'], name='news_articl_day_747cad_idx')],
+                'unique_together': {('news', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArticleHourlyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_views', to='news.news')),
+            ],
+            options={
+                'verbose_name_plural': 'Article hourly views',
+                'indexes': [models.Index(fields=['hour'], name='news_articl_hour_4ea7e7_idx')],
+                'unique_together': {('news', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-17 03:26
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other backends use news.search's
+    # Python inverted index
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS news_news_search_vector_gin '
+            'ON news_news USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS news_news_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_article_view_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-17 03:40
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def set_is_live(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    # Published articles without a date were listed everywhere but the home
+    # page; date them so they stay visible
+    News.objects.filter(status='published', publish_date__isnull=True).update(publish_date=F('created_at'))
+    News.objects.filter(status='published', publish_date__lte=timezone.now()).update(is_live=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_published_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='is_live',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(set_is_live, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_live', True)), fields=['-publish_date', '-id'], name='news_published_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_live', True)), fields=['-views'], name='news_published_views_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_live', True)), fields=['category', '-publish_date', '-id'], name='news_category_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(condition=models.Q(('is_featured', True), ('is_live', True)), fields=['-publish_date'], name='news_featured_published_idx'),
+        ),
+    ]
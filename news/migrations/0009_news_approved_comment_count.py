@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 03:42
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_approved_comments(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    Comment = apps.get_model('news', 'Comment')
+    counts = (Comment.objects.filter(is_approved=True)
+              .values('news_id').annotate(total=Count('id')).order_by())
+    for row in counts:
+        News.objects.filter(pk=row['news_id']).update(approved_comment_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_is_live'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='approved_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_approved_comments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_news_approved_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
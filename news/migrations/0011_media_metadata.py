@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-17 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsmedia',
+            name='duration',
+            field=models.FloatField(blank=True, editable=False, help_text='Seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='newsmedia',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='newsmedia',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='newsmedia',
+            name='icon_class',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='newsmedia',
+            name='mime_type',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='newsmedia',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='newsmedia',
+            index=models.Index(fields=['news', 'media_type'], name='newsmedia_news_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsmedia',
+            index=models.Index(fields=['mime_type'], name='newsmedia_mime_type_idx'),
+        ),
+    ]
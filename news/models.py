@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django_ckeditor_5.fields import CKEditor5Field
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 from taggit.managers import TaggableManager
@@ -11,6 +13,8 @@ class Category(models.Model):
     slug = models.SlugField(max_length=120, unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='category_images/', blank=True, null=True, default='category_images/news_cat.jpg')
+    # Widths and formats written by news.images, NULL until then
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
     
     class Meta:
         verbose_name_plural = "Categories"
@@ -22,8 +26,15 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if self.image and not self.image._committed:
+            self.image_variants = None
         super().save(*args, **kwargs)
 
+class PublishedManager(models.Manager):
+    """Articles readers can see: published and past their publish date"""
+    def get_queryset(self):
+        return super().get_queryset().filter(is_live=True)
+
 class News(models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
@@ -35,6 +46,8 @@ class News(models.Model):
     author = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='news_posts')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='news')
     featured_image = models.ImageField(upload_to='news/images/')
+    # Widths and formats written by news.images, NULL until then
+    featured_image_variants = models.JSONField(null=True, blank=True, editable=False)
     summary = models.TextField(max_length=500)
     content = CKEditor5Field('Text', config_name='default')
     is_featured = models.BooleanField(default=False)
@@ -44,10 +57,33 @@ class News(models.Model):
     publish_date = models.DateTimeField(blank=True, null=True)
     tags = TaggableManager()
     views = models.PositiveIntegerField(default=0)
+    # Maintained by news.comment_counts
+    approved_comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Published and publish_date reached; set by save() and, for scheduled
+    # articles, by the publish_scheduled command
+    is_live = models.BooleanField(default=False, editable=False)
+    # Maintained by news.search, see news/signals.py
+    search_document = models.TextField(blank=True, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    objects = models.Manager()
+    published = PublishedManager()
     
     class Meta:
         verbose_name_plural = "News"
         ordering = ["-publish_date"]
+        # Partial indexes matching how published articles are listed
+        indexes = [
+            models.Index(fields=['-publish_date', '-id'], condition=models.Q(is_live=True),
+                         name='news_published_date_idx'),
+            models.Index(fields=['-views'], condition=models.Q(is_live=True),
+                         name='news_published_views_idx'),
+            models.Index(fields=['category', '-publish_date', '-id'], condition=models.Q(is_live=True),
+                         name='news_category_published_idx'),
+            models.Index(fields=['-publish_date'], condition=models.Q(is_live=True, is_featured=True),
+                         name='news_featured_published_idx'),
+            models.Index(fields=['author', '-created_at'], name='news_author_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -55,18 +91,69 @@ class News(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if self.status == 'published' and not self.publish_date:
+            self.publish_date = timezone.now()
+        self.is_live = self.status == 'published' and self.publish_date <= timezone.now()
+        if self.featured_image and not self.featured_image._committed:
+            # A new upload, its variants are built by the build_image_variants command
+            self.featured_image_variants = None
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         return reverse('news:news_detail', kwargs={'slug': self.slug})
     
     def increase_views(self):
+        # Buffered; the row is updated in bulk by news.view_counter
+        from .view_counter import record_view
+        record_view(self.pk)
         self.views += 1
-        self.save(update_fields=['views'])
 
     def approved_comments(self):
         return self.comments.filter(is_approved=True)
 
+class ArticleHourlyViews(models.Model):
+    """Views of an article within one clock hour, written by news.view_counter"""
+    news = models.ForeignKey(News, on_delete=models.CASCADE, related_name='hourly_views')
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Article hourly views"
+        unique_together = ('news', 'hour')
+        indexes = [models.Index(fields=['hour'])]
+
+    def __str__(self):
+        return f"{self.news_id} @ {self.hour:%Y-%m-%d %H:00}: {self.views}"
+
+class ArticleDailyViews(models.Model):
+    """Daily rollup of ArticleHourlyViews, kept after hourly rows are pruned"""
+    news = models.ForeignKey(News, on_delete=models.CASCADE, related_name='daily_views')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Article daily views"
+        unique_together = ('news', 'day')
+        indexes = [models.Index(fields=['day'])]
+
+    def __str__(self):
+        return f"{self.news_id} @ {self.day}: {self.views}"
+
+class RelatedArticle(models.Model):
+    """Precomputed related article, rebuilt by the build_related_articles command"""
+    news = models.ForeignKey(News, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(News, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['news', 'rank']
+        unique_together = ('news', 'related')
+        indexes = [models.Index(fields=['news', 'rank'])]
+
+    def __str__(self):
+        return f"{self.news_id} -> {self.related_id} ({self.score:.3f})"
+
 class NewsMedia(models.Model):
     """Model for storing multiple media files for a news article"""
     MEDIA_TYPE_CHOICES = (
@@ -84,10 +171,22 @@ class NewsMedia(models.Model):
     is_featured = models.BooleanField(default=False)
     upload_date = models.DateTimeField(auto_now_add=True)
     order = models.PositiveIntegerField(default=0)
+    # Read from the file by the read_media_metadata command (news.media_metadata), NULL size until then
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    duration = models.FloatField(null=True, blank=True, editable=False, help_text="Seconds")
+    icon_class = models.CharField(max_length=40, blank=True, editable=False)
     
     class Meta:
         verbose_name_plural = "News Media"
         ordering = ["order", "upload_date"]
+        indexes = [
+            # Media statistics per article and type
+            models.Index(fields=['news', 'media_type'], name='newsmedia_news_type_idx'),
+            models.Index(fields=['mime_type'], name='newsmedia_mime_type_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_media_type_display()} for {self.news.title}"
@@ -104,10 +203,27 @@ class Comment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Approved comments of an article, and the latest approved site-wide
+            models.Index(fields=['news', '-created_at'], condition=models.Q(is_approved=True),
+                         name='comment_approved_news_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_approved=True),
+                         name='comment_approved_recent_idx'),
+        ]
     
     def __str__(self):
         return f'Comment by {self.user} on {self.news}'
     
+    # The signals in news/signals.py update News.approved_comment_count; the
+    # transaction keeps the comment and the counter consistent
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+    
     def get_media_files(self):
         """Return all media files associated with this news article"""
         return self.media_files.all()
@@ -0,0 +1,269 @@
+# news/pagination.py
+"""
+Keyset (cursor) pagination.
+
+``Paginator`` fetches page N with ``OFFSET``, so the database reads and
+discards every earlier row, and it runs a ``COUNT(*)`` on each request. A
+keyset page instead continues from the sort key of the last row shown, e.g.
+``WHERE (publish_date, id) < (last_date, last_id) ORDER BY publish_date DESC,
+id DESC LIMIT n``, which costs the same on page 2 or page 2000.
+
+The position is carried in an opaque, signed ``cursor`` query parameter.
+Plain ``?page=N`` URLs keep working for the first pages, so existing links
+and bookmarks are still valid.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'news.pagination.cursor'
+# Exact counts are cached this long when approximating
+COUNT_CACHE_TIMEOUT = 60 * 5
+# On PostgreSQL, planner estimates above this are trusted instead of counting
+ESTIMATE_THRESHOLD = 1000
+
+
+def approximate_count(queryset):
+    """
+    Cheap row count for display.
+
+    On PostgreSQL this is the planner's estimate when the result is large
+    (counting it exactly is what we want to avoid). Otherwise the exact count
+    is cached for a few minutes.
+    """
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = plan[0]['Plan']['Plan Rows']
+        if estimate > ESTIMATE_THRESHOLD:
+            return estimate
+
+    sql, params = queryset.query.sql_with_params()
+    cache_key = 'pagination_count:%s' % hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class KeysetPage:
+    """One page of results, used like ``django.core.paginator.Page`` in templates."""
+
+    def __init__(self, object_list, paginator, number=None, has_next=False,
+                 has_previous=False):
+        self.object_list = object_list
+        self.paginator = paginator
+        # Known when reached through ?page=N or a cursor carrying it
+        self.number = number
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not (self._has_next and self.object_list):
+            return None
+        number = self.number + 1 if self.number else None
+        return self.paginator.make_cursor(self.object_list[-1], 'next', number)
+
+    @property
+    def previous_cursor(self):
+        if not (self._has_previous and self.object_list):
+            return None
+        number = self.number - 1 if self.number else None
+        return self.paginator.make_cursor(self.object_list[0], 'previous', number)
+
+    @property
+    def page_links(self):
+        """Nearby page numbers that can still be linked with ?page=N."""
+        if not self.number:
+            return []
+        last = self.number + 1 if self._has_next else self.number
+        if self.paginator.num_pages:
+            last = max(last, min(self.number + 2, self.paginator.num_pages))
+        last = min(last, self.paginator.page_number_limit)
+        return list(range(max(1, self.number - 2), last + 1))
+
+    def start_index(self):
+        if not self.number or not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by its ordering key instead of by offset.
+
+    Args:
+        queryset (QuerySet): Rows to paginate
+        per_page (int): Rows per page
+        ordering (tuple): Field names, '-' for descending. The primary key is
+            appended as a tiebreaker so the key is unique.
+        count (str): None (don't count), 'exact' or 'approximate'
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-publish_date',), count=None):
+        self.per_page = per_page
+        self.count_mode = count
+        self.page_number_limit = getattr(settings, 'NEWS_PAGINATION_PAGE_NUMBERS', 10)
+
+        ordering = list(ordering)
+        if not any(name.lstrip('-') in ('id', 'pk') for name in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.queryset = queryset.order_by(*self._order_by())
+
+    def _order_by(self, reverse=False):
+        # NULL sorts as the largest value, as PostgreSQL does by default, so
+        # plain "-publish_date" indexes serve these queries
+        return [
+            F(name).desc(nulls_first=True) if descending != reverse else F(name).asc(nulls_last=True)
+            for name, descending in self.fields
+        ]
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name, _descending in self.fields]
+
+    def _seek(self, values, forward):
+        """Rows strictly after (or before) the given key values."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            larger = descending != forward
+            if value is None:
+                # Nothing is larger than NULL, every value is smaller
+                strict = None if larger else Q(**{f'{name}__isnull': False})
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                strict = Q(**{f'{name}__{"gt" if larger else "lt"}': value})
+                if larger:
+                    strict |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            if strict is not None:
+                condition |= equal & strict
+            equal &= same
+        return condition
+
+    def make_cursor(self, obj, direction, number=None):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in self._key(obj)]
+        fields = [('-' if descending else '') + name for name, descending in self.fields]
+        return signing.Signer(salt=CURSOR_SALT).sign_object(
+            {'o': fields, 'k': values, 'd': direction, 'n': number}, compress=True
+        )
+
+    def _read_cursor(self, cursor):
+        """(values, forward, number) from a token, or None if it is unusable."""
+        try:
+            data = signing.Signer(salt=CURSOR_SALT).unsign_object(cursor)
+            fields = [('-' if descending else '') + name for name, descending in self.fields]
+            if data['o'] != fields or len(data['k']) != len(self.fields):
+                return None
+            model = self.queryset.model
+            values = [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for (name, _descending), value in zip(self.fields, data['k'])
+            ]
+            return values, data['d'] != 'previous', data.get('n')
+        except (signing.BadSignature, KeyError, TypeError, ValueError, LookupError):
+            return None
+
+    @cached_property
+    def count(self):
+        if self.count_mode == 'exact':
+            return self.queryset.count()
+        if self.count_mode == 'approximate':
+            return approximate_count(self.queryset)
+        return None
+
+    @property
+    def num_pages(self):
+        count = self.count
+        if count is None:
+            return None
+        return max(1, -(-count // self.per_page))
+
+    def page(self, cursor=None):
+        """The page a cursor points at; the first page without one."""
+        read = self._read_cursor(cursor) if cursor else None
+        if read is None:
+            return self.page_number(1)
+
+        values, forward, number = read
+        if forward:
+            rows = list(self.queryset.filter(self._seek(values, True))[:self.per_page + 1])
+            return KeysetPage(rows[:self.per_page], self, number,
+                              has_next=len(rows) > self.per_page, has_previous=True)
+
+        rows = list(self.queryset.filter(self._seek(values, False))
+                    .order_by(*self._order_by(reverse=True))[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not has_previous:
+            number = 1
+        return KeysetPage(rows, self, number, has_next=True, has_previous=has_previous)
+
+    def page_number(self, number):
+        """Page ``number`` by offset, only allowed for the first few pages."""
+        if number < 1 or number > self.page_number_limit:
+            raise Http404('Use the cursor links to browse further.')
+        offset = (number - 1) * self.per_page
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        if not rows and number > 1:
+            raise Http404('That page contains no results.')
+        return KeysetPage(rows[:self.per_page], self, number,
+                          has_next=len(rows) > self.per_page, has_previous=number > 1)
+
+    def get_page(self, request):
+        """Page for a request's ``cursor`` or legacy ``page`` parameter."""
+        cursor = request.GET.get('cursor')
+        if cursor:
+            return self.page(cursor)
+        try:
+            number = int(request.GET.get('page', 1))
+        except ValueError:
+            number = 1
+        return self.page_number(number)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin replacing Paginator with KeysetPaginator."""
+    paginate_ordering = ('-publish_date',)
+    paginate_count = None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.paginate_ordering, self.paginate_count)
+        page = paginator.get_page(self.request)
+        return paginator, page, page.object_list, page.has_other_pages()
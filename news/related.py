@@ -0,0 +1,185 @@
+# news/related.py
+"""
+Related-articles index.
+
+A batch job scores every pair of published articles by TF-IDF cosine
+similarity of their summary and content, shared tags and category, and
+stores the best matches per article in ``RelatedArticle`` so the detail page
+reads them with a single indexed query.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils.html import strip_tags
+
+from .models import News, RelatedArticle
+from .search import tokenize
+
+RELATED_LIMIT = 3
+
+# How much each signal contributes to the final score
+TEXT_WEIGHT = 0.6
+TAG_WEIGHT = 0.3
+CATEGORY_WEIGHT = 0.1
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the
+their this to was were will with you your we our they he she his her not
+""".split())
+
+
+def _terms(text):
+    return [term for term in tokenize(strip_tags(text or ''))
+            if term not in STOP_WORDS and len(term) > 2 and not term.isdigit()]
+
+
+def build_tfidf(documents):
+    """
+    Build L2-normalized sparse TF-IDF vectors.
+
+    Args:
+        documents (list): One list of terms per document
+
+    Returns:
+        tuple: (vectors, postings) where ``vectors[i]`` is a pair of
+        (term index array, weight array) and ``postings[term]`` is a pair of
+        (document index array, weight array)
+    """
+    vocabulary = {}
+    doc_counts = []
+    for terms in documents:
+        counts = defaultdict(int)
+        for term in terms:
+            counts[vocabulary.setdefault(term, len(vocabulary))] += 1
+        doc_counts.append(counts)
+
+    df = np.zeros(len(vocabulary))
+    for counts in doc_counts:
+        df[list(counts)] += 1
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1
+
+    vectors = []
+    posting_docs = defaultdict(list)
+    posting_weights = defaultdict(list)
+    for doc_index, counts in enumerate(doc_counts):
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        weights = (1 + np.log(weights)) * idf[indices]
+        norm = np.linalg.norm(weights)
+        if norm:
+            weights /= norm
+        vectors.append((indices, weights))
+        for term, weight in zip(indices.tolist(), weights.tolist()):
+            posting_docs[term].append(doc_index)
+            posting_weights[term].append(weight)
+
+    postings = {
+        term: (np.array(posting_docs[term]), np.array(posting_weights[term]))
+        for term in posting_docs
+    }
+    return vectors, postings
+
+
+def cosine_scores(doc_index, vectors, postings, doc_total):
+    """Cosine similarity of one document against all others."""
+    scores = np.zeros(doc_total)
+    indices, weights = vectors[doc_index]
+    for term, weight in zip(indices.tolist(), weights.tolist()):
+        docs, doc_weights = postings[term]
+        scores[docs] += weight * doc_weights
+    scores[doc_index] = 0
+    return scores
+
+
+def compute_related(limit=RELATED_LIMIT):
+    """
+    Score all published articles against each other.
+
+    Returns:
+        dict: Mapping of news id to a list of (related id, score), best first
+    """
+    articles = list(
+        News.published
+        .values_list('id', 'category_id', 'summary', 'content')
+    )
+    if len(articles) < 2:
+        return {}
+
+    ids = np.array([article[0] for article in articles])
+    categories = np.array([article[1] for article in articles])
+    position = {news_id: i for i, news_id in enumerate(ids.tolist())}
+
+    tags = defaultdict(set)
+    tag_docs = defaultdict(list)
+    for news_id, tag_id in News.tags.through.objects.filter(
+        object_id__in=position,
+        content_type__app_label='news',
+        content_type__model='news',
+    ).values_list('object_id', 'tag_id'):
+        tags[news_id].add(tag_id)
+        tag_docs[tag_id].append(position[news_id])
+    tag_docs = {tag_id: np.array(docs) for tag_id, docs in tag_docs.items()}
+    tag_counts = np.array([len(tags[news_id]) for news_id in ids.tolist()])
+
+    vectors, postings = build_tfidf([
+        _terms(summary) + _terms(content)
+        for _id, _category, summary, content in articles
+    ])
+
+    related = {}
+    for i, news_id in enumerate(ids.tolist()):
+        scores = TEXT_WEIGHT * cosine_scores(i, vectors, postings, len(ids))
+        scores += CATEGORY_WEIGHT * (categories == categories[i])
+
+        # Jaccard similarity of the tag sets
+        if tags[news_id]:
+            shared = np.zeros(len(ids))
+            for tag_id in tags[news_id]:
+                shared[tag_docs[tag_id]] += 1
+            scores += TAG_WEIGHT * shared / (tag_counts[i] + tag_counts - shared)
+
+        scores[i] = -1
+        best = np.argsort(-scores, kind='stable')[:limit]
+        related[news_id] = [
+            (int(ids[j]), float(scores[j])) for j in best if scores[j] > 0
+        ]
+
+    return related
+
+
+def rebuild_related_index(limit=RELATED_LIMIT):
+    """
+    Recompute and store related articles for every published article.
+
+    Returns:
+        int: Number of RelatedArticle rows written
+    """
+    related = compute_related(limit)
+    rows = [
+        RelatedArticle(news_id=news_id, related_id=related_id, score=score, rank=rank)
+        for news_id, matches in related.items()
+        for rank, (related_id, score) in enumerate(matches)
+    ]
+
+    with transaction.atomic():
+        RelatedArticle.objects.all().delete()
+        RelatedArticle.objects.bulk_create(rows, batch_size=500)
+
+    return len(rows)
+
+
+def get_related_news(news, limit=RELATED_LIMIT):
+    """Related published articles for the detail page, best match first."""
+    entries = RelatedArticle.objects.filter(
+        news=news, related__is_live=True
+    ).select_related('related').order_by('rank')[:limit]
+    related_news = [entry.related for entry in entries]
+
+    if not related_news:
+        # Not indexed yet (e.g. just published): latest from the same category
+        related_news = list(News.published.filter(
+            category_id=news.category_id
+        ).exclude(id=news.id).order_by('-publish_date')[:limit])
+
+    return related_news
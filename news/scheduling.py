@@ -0,0 +1,40 @@
+# news/scheduling.py
+"""
+Scheduled publishing.
+
+``News.is_live`` is what public queries filter on (through
+``News.published``). ``News.save()`` sets it for articles published now or in
+the past; articles published with a future date are switched live here once
+their date comes, by the publish_scheduled command.
+"""
+from django.utils import timezone
+
+from . import caching
+from .models import News
+
+
+def publish_due(now=None):
+    """
+    Make every published article whose publish date has passed live.
+
+    Returns:
+        list: Ids of the articles that went live
+    """
+    now = now or timezone.now()
+    ids = list(News.objects.filter(
+        status='published', is_live=False, publish_date__lte=now
+    ).values_list('id', flat=True))
+
+    if ids:
+        # update() skips the post_save signals, so invalidate here
+        News.objects.filter(id__in=ids).update(is_live=True)
+        caching.invalidate(caching.NEWS, caching.SEARCH)
+
+    return ids
+
+
+def next_due():
+    """Publish date of the next scheduled article, or None."""
+    return News.objects.filter(
+        status='published', is_live=False
+    ).order_by('publish_date').values_list('publish_date', flat=True).first()
@@ -0,0 +1,296 @@
+# news/search.py
+"""
+Full-text search over published news.
+
+Every ``News`` row stores a denormalized ``search_document`` (title, summary,
+body text, tags and author name) that is refreshed whenever the article or
+its tags change. On PostgreSQL a weighted ``search_vector`` column backed by a
+GIN index is kept next to it and queried with ``SearchQuery``/``SearchRank``.
+Other databases (SQLite in development) fall back to a pure-Python inverted
+index built from the stored documents and kept in the cache, one entry per
+term, so a search only reads the postings of its own terms.
+"""
+import hashlib
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils.html import strip_tags
+
+from . import caching
+
+SEARCH_CONFIG = 'english'
+# Index and result keys are versioned by caching.SEARCH, bumped whenever an
+# article's search document changes
+INDEX_CACHE_TIMEOUT = 60 * 60 * 24
+RESULTS_CACHE_TIMEOUT = 60 * 15
+
+SORT_OPTIONS = ('relevance', '-publish_date', 'publish_date', 'title', '-title')
+DEFAULT_SORT = '-publish_date'
+
+# Extra weight given to matches in the title and summary by the Python index
+TITLE_WEIGHT = 3
+SUMMARY_WEIGHT = 2
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return _word_re.findall((text or '').lower())
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def build_search_document(news):
+    """Return the (title, summary, body, tags, author) texts indexed for an article."""
+    tags = ' '.join(news.tags.names())
+    author = ''
+    if news.author_id:
+        user = news.author.user
+        author = f"{user.first_name} {user.last_name} {user.username}"
+    return news.title, news.summary, strip_tags(news.content or ''), tags, author
+
+
+def update_search_document(news):
+    """Refresh the stored search document (and vector on PostgreSQL) of one article."""
+    from .models import News
+
+    title, summary, body, tags, author = build_search_document(news)
+    fields = {'search_document': '\n'.join([title, summary, body, tags, author])}
+
+    if uses_postgres():
+        fields['search_vector'] = (
+            SearchVector(Value(title), weight='A', config=SEARCH_CONFIG)
+            + SearchVector(Value(f"{tags} {summary}"), weight='B', config=SEARCH_CONFIG)
+            + SearchVector(Value(f"{body} {author}"), weight='C', config=SEARCH_CONFIG)
+        )
+
+    # update() rather than save() so we don't re-trigger post_save
+    News.objects.filter(pk=news.pk).update(**fields)
+    caching.invalidate(caching.SEARCH)
+
+
+class InvertedIndex:
+    """
+    Minimal inverted index used when PostgreSQL isn't available.
+
+    Each term's postings, ``{news_id: weighted term frequency}``, are cached
+    under their own key. A header entry holds the number of articles and
+    ``vocabulary``, the sorted list of terms used for prefix matching, so a
+    search reads the header and the postings of the terms it matches rather
+    than the whole index. ``postings`` holds those read so far.
+    """
+
+    def __init__(self, key_prefix, doc_count, vocabulary, postings=None):
+        self.key_prefix = key_prefix
+        self.doc_count = doc_count
+        self.vocabulary = vocabulary
+        self.postings = postings or {}
+
+    @staticmethod
+    def compute_postings():
+        """
+        Postings of every term in the published articles.
+
+        Returns:
+            tuple: (postings, number of articles)
+        """
+        from .models import News
+
+        postings = defaultdict(lambda: defaultdict(int))
+        rows = News.published.values_list(
+            'id', 'title', 'summary', 'search_document'
+        )
+        doc_count = 0
+        for news_id, title, summary, document in rows.iterator():
+            doc_count += 1
+            for term in tokenize(document):
+                postings[term][news_id] += 1
+            for term in tokenize(title):
+                postings[term][news_id] += TITLE_WEIGHT
+            for term in tokenize(summary):
+                postings[term][news_id] += SUMMARY_WEIGHT
+
+        return {term: dict(docs) for term, docs in postings.items()}, doc_count
+
+    @classmethod
+    def build(cls, key_prefix):
+        """Compute the index and store it in the cache under ``key_prefix``."""
+        postings, doc_count = cls.compute_postings()
+        index = cls(key_prefix, doc_count, sorted(postings), postings)
+        cache.set_many(
+            {index._term_key(term): docs for term, docs in postings.items()}, INDEX_CACHE_TIMEOUT
+        )
+        # Stored last, so whoever finds the header finds the terms too
+        cache.set(key_prefix, (doc_count, index.vocabulary), INDEX_CACHE_TIMEOUT)
+        return index
+
+    @classmethod
+    def get(cls):
+        """The index at the current search version, built if missing."""
+        key_prefix = caching.section_key('search_index')
+        header = cache.get(key_prefix)
+        if header is None:
+            return cls.build(key_prefix)
+        return cls(key_prefix, *header)
+
+    def _term_key(self, term):
+        # Terms can be long or non-ASCII, which some cache backends refuse
+        return f'{self.key_prefix}:{hashlib.md5(term.encode()).hexdigest()}'
+
+    def load(self, terms):
+        """
+        Read the postings of ``terms`` from the cache.
+
+        Returns:
+            bool: False if some had been evicted and the index was rebuilt,
+                  which may have changed the vocabulary
+        """
+        keys = {self._term_key(term): term for term in terms if term not in self.postings}
+        found = cache.get_many(list(keys))
+        if len(found) < len(keys):
+            rebuilt = self.build(self.key_prefix)
+            self.doc_count, self.vocabulary, self.postings = rebuilt.doc_count, rebuilt.vocabulary, rebuilt.postings
+            return False
+        for key, docs in found.items():
+            self.postings[keys[key]] = docs
+        return True
+
+    def _expand(self, keyword):
+        """All indexed terms starting with ``keyword``."""
+        start = bisect_left(self.vocabulary, keyword)
+        for term in self.vocabulary[start:]:
+            if not term.startswith(keyword):
+                break
+            yield term
+
+    def search(self, keywords):
+        """
+        Score articles matching every keyword (prefix match, tf-idf ranking).
+
+        Returns:
+            dict: Mapping of news id to relevance score
+        """
+        expanded = {keyword: list(self._expand(keyword)) for keyword in keywords}
+        if not self.load({term for terms in expanded.values() for term in terms}):
+            expanded = {keyword: list(self._expand(keyword)) for keyword in keywords}
+
+        scores = None
+        for keyword in keywords:
+            keyword_scores = defaultdict(float)
+            for term in expanded[keyword]:
+                docs = self.postings[term]
+                idf = math.log(1 + self.doc_count / len(docs))
+                for news_id, tf in docs.items():
+                    keyword_scores[news_id] += tf * idf
+
+            if scores is None:
+                scores = keyword_scores
+            else:
+                scores = {
+                    news_id: score + keyword_scores[news_id]
+                    for news_id, score in scores.items() if news_id in keyword_scores
+                }
+            if not scores:
+                return {}
+
+        return dict(scores or {})
+
+
+def search(query, queryset, sort=DEFAULT_SORT):
+    """
+    Filter ``queryset`` down to articles matching every keyword in ``query``.
+
+    Args:
+        query (str): Raw search string
+        queryset (QuerySet): News queryset to search in (e.g. already
+            filtered by status and category)
+        sort (str): One of SORT_OPTIONS; 'relevance' orders by rank
+
+    Returns:
+        QuerySet: Matching articles in the requested order
+    """
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+
+    keywords = tokenize(query)
+    if not keywords:
+        return queryset.none()
+
+    if uses_postgres():
+        search_query = SearchQuery(
+            ' & '.join(f"{keyword}:*" for keyword in keywords),
+            search_type='raw',
+            config=SEARCH_CONFIG,
+        )
+        results = queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        )
+        if sort == 'relevance':
+            return results.order_by('-rank', '-publish_date')
+        return results.order_by(sort)
+
+    scores = InvertedIndex.get().search(keywords)
+    results = queryset.filter(id__in=scores)
+    if sort == 'relevance':
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return results.order_by(Case(
+            *[When(id=news_id, then=Value(position)) for position, news_id in enumerate(ranked)],
+            output_field=IntegerField(),
+        ), '-publish_date')
+    return results.order_by(sort)
+
+
+def normalize_query(query):
+    """'  Sport  News' and 'sport news' are the same search."""
+    return ' '.join(tokenize(query))
+
+
+def result_ids(query, category_id=None, sort=DEFAULT_SORT):
+    """
+    Ordered ids of the published articles matching a search.
+
+    The id list is cached per normalized (query, category, sort) so every page
+    of the same search, whatever its URL, is served from one cache entry.
+    """
+    from .models import News
+
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+    normalized = normalize_query(query)
+
+    digest = hashlib.md5(f"{normalized}|{category_id or ''}|{sort}".encode()).hexdigest()
+    cache_key = f"{caching.section_key('search_results')}:{digest}"
+    ids = cache.get(cache_key)
+
+    if ids is None:
+        results = News.published.all()
+        if category_id:
+            results = results.filter(category_id=category_id)
+
+        if normalized:
+            results = search(normalized, results, sort)
+        else:
+            results = results.order_by(DEFAULT_SORT if sort == 'relevance' else sort)
+
+        ids = list(results.values_list('id', flat=True))
+        cache.set(cache_key, ids, RESULTS_CACHE_TIMEOUT)
+
+    return ids
+
+
+def load_results(ids):
+    """Fetch the articles for one page of ids, keeping their order."""
+    from .models import News
+
+    articles = News.objects.select_related(
+        'category', 'author__user'
+    ).prefetch_related('tags').in_bulk(ids)
+    return [articles[news_id] for news_id in ids if news_id in articles]
@@ -0,0 +1,130 @@
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from taggit.models import Tag
+
+from accounts.models import StudentProfile
+from . import caching, comment_counts, media_metadata
+from .models import News, NewsMedia, Comment, Category
+from .search import update_search_document
+
+
+@receiver(post_save, sender=News)
+def refresh_search_document(sender, instance, raw=False, **kwargs):
+    """Keep the denormalized search document in sync with the article"""
+    if not raw:
+        update_search_document(instance)
+
+
+@receiver(m2m_changed, sender=News.tags.through)
+def refresh_search_document_tags(sender, instance, action, reverse=False, **kwargs):
+    """Tags are saved after the article, so refresh again once they change"""
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, News):
+        update_search_document(instance)
+
+
+@receiver(post_delete, sender=News)
+def drop_from_search_index(sender, instance, **kwargs):
+    caching.invalidate(caching.SEARCH)
+
+
+@receiver(pre_save, sender=NewsMedia)
+def reset_media_metadata(sender, instance, raw=False, **kwargs):
+    """A new file's size, dimensions and duration are read by the read_media_metadata command"""
+    if raw or not instance.file:
+        return
+    if instance._state.adding or not instance.file._committed:
+        media_metadata.reset(instance)
+
+
+@receiver(post_save, sender=NewsMedia)
+@receiver(post_delete, sender=NewsMedia)
+def touch_news_on_media_change(sender, instance, **kwargs):
+    """Media edits change News.updated_at so the cached detail fragment is refreshed"""
+    News.objects.filter(pk=instance.news_id).update(updated_at=timezone.now())
+
+
+def is_public(instance):
+    """Whether readers can see this article or comment"""
+    if isinstance(instance, News):
+        return instance.is_live
+    return instance.is_approved
+
+
+@receiver(pre_save, sender=News)
+def remember_public_state(sender, instance, **kwargs):
+    """Unpublishing or unapproving must also invalidate, so keep the old state"""
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).first()
+        instance._was_public = previous is not None and is_public(previous)
+    else:
+        instance._was_public = False
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, **kwargs):
+    """Which article's counter the stored comment counts towards, if any"""
+    previous = None
+    if instance.pk:
+        # Locked (Comment.save runs in a transaction) so concurrent approvals count once
+        previous = sender.objects.select_for_update().filter(pk=instance.pk).values(
+            'news_id', 'is_approved'
+        ).first()
+    instance._was_public = bool(previous and previous['is_approved'])
+    instance._counted_for = previous['news_id'] if instance._was_public else None
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    counted_for = instance.news_id if instance.is_approved else None
+    previous = getattr(instance, '_counted_for', None)
+    if counted_for != previous:
+        comment_counts.adjust({counted_for: 1, previous: -1})
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, **kwargs):
+    if instance.is_approved:
+        comment_counts.adjust({instance.news_id: -1})
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_caches(sender, instance, **kwargs):
+    # Drafts never appear in cached sections
+    if is_public(instance) or getattr(instance, '_was_public', False):
+        caching.invalidate(caching.NEWS)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_caches(sender, instance, **kwargs):
+    if is_public(instance) or getattr(instance, '_was_public', False):
+        caching.invalidate(caching.COMMENTS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_caches(sender, instance, **kwargs):
+    caching.invalidate(caching.CATEGORIES)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_caches(sender, instance, **kwargs):
+    caching.invalidate(caching.TAGS)
+
+
+@receiver(m2m_changed, sender=News.tags.through)
+def invalidate_tag_caches_on_tagging(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        caching.invalidate(caching.TAGS)
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+def invalidate_writer_caches(sender, instance, **kwargs):
+    caching.invalidate(caching.WRITERS)
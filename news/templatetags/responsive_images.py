@@ -0,0 +1,54 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from news.images import CONTENT_TYPES, variant_name, variants_of
+
+register = template.Library()
+
+
+def _srcset(name, widths, fmt):
+    return ', '.join(f'{default_storage.url(variant_name(name, width, fmt))} {width}w' for width in widths)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', fallback='', loading='lazy', **attrs):
+    """
+    Render an image with its responsive variants (see news/images.py).
+
+    Emits a ``<picture>`` offering the modern formats before a JPEG
+    ``srcset``, so the browser downloads the smallest file that fits
+    ``sizes``. Until the variants are built it is a plain ``<img>`` of the
+    original. Other keyword arguments become attributes of the ``<img>``.
+
+    Usage:
+        {% responsive_image news.featured_image sizes="(min-width: 992px) 33vw, 100vw" alt=news.title class="card-img-top" %}
+    """
+    name = getattr(image, 'name', '') if image else ''
+    if not name:
+        if not fallback:
+            return ''
+        src = fallback
+    else:
+        src = image.url
+    attributes = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+
+    variants = variants_of(image) if name else None
+    widths = variants.get('widths') if variants else None
+    if not widths:
+        return format_html('<img src="{}" loading="{}"{}>', src, loading, attributes)
+
+    formats = variants['formats']
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((CONTENT_TYPES[fmt], _srcset(name, widths, fmt), sizes) for fmt in formats if fmt != 'jpeg'),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" loading="{}"{}></picture>',
+        sources,
+        default_storage.url(variant_name(name, widths[-1], 'jpeg')),
+        _srcset(name, widths, 'jpeg'),
+        sizes,
+        loading,
+        attributes,
+    )
@@ -0,0 +1,67 @@
+# news/tests/base.py
+"""
+Fixtures shared by the news tests.
+
+Most tests need a writer (a User with a StudentProfile), a category and some
+articles. ``NewsTestCase`` creates the writer and the category once per
+class and ``create_news`` fills in the fields a test doesn't care about.
+"""
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from ..models import Category, News
+
+
+def create_author(username='writer', **fields):
+    """A user with the profile articles are written by."""
+    user = User.objects.create_user(username, f'{username}@example.com', 'pass', **fields)
+    return StudentProfile.objects.create(user=user)
+
+
+def create_news(author, category, title='Article', **fields):
+    """A published article; ``fields`` override the defaults."""
+    defaults = {
+        'featured_image': 'news/images/x.jpg',
+        'summary': '',
+        'content': '',
+        'status': 'published',
+        'publish_date': timezone.now(),
+    }
+    return News.objects.create(title=title, author=author, category=category, **{**defaults, **fields})
+
+
+class NewsTestCase(TestCase):
+    """
+    Creates ``user``, its profile ``author`` and ``category`` for the class.
+
+    Subclasses adding their own test data call ``super().setUpTestData()``.
+    """
+
+    author_fields = {}
+    category_fields = {'name': 'General'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_author(**cls.author_fields)
+        cls.user = cls.author.user
+        cls.category = Category.objects.create(**cls.category_fields)
+
+    @classmethod
+    def create_news(cls, title='Article', **fields):
+        fields.setdefault('author', cls.author)
+        fields.setdefault('category', cls.category)
+        return create_news(title=title, **fields)
+
+    def use_temp_media_root(self, **overrides):
+        """Store this test's uploads in a temporary MEDIA_ROOT, removed afterwards."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, **overrides)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return media_root
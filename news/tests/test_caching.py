@@ -0,0 +1,161 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from .. import caching
+from ..models import Category, Comment
+from .base import NewsTestCase
+
+
+class SectionInvalidationTest(NewsTestCase):
+    """Changing content moves exactly the sections built from it to new keys"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news = cls.create_news('Open day')
+
+    def setUp(self):
+        cache.clear()
+
+    def keys(self):
+        return {section: caching.section_key(section) for section in caching.SECTION_DEPENDENCIES}
+
+    def assertMoved(self, before, *changed):
+        after = self.keys()
+        moved = {section for section in before if before[section] != after[section]}
+        expected = {section for section, kinds in caching.SECTION_DEPENDENCIES.items() if set(kinds) & set(changed)}
+        self.assertEqual(moved, expected)
+        return after
+
+    def test_invalidate(self):
+        before = self.keys()
+        caching.invalidate(caching.COMMENTS)
+        self.assertMoved(before, caching.COMMENTS)
+        # Stable until something changes
+        self.assertEqual(self.keys(), self.keys())
+
+    def test_evicted_version(self):
+        key = caching.section_key('most_viewed')
+        cache.delete(f'{caching.VERSION_KEY_PREFIX}:{caching.NEWS}')
+        self.assertNotEqual(caching.section_key('most_viewed'), key)
+
+    def test_signals(self):
+        keys = self.keys()
+        self.news.save()
+        keys = self.assertMoved(keys, caching.NEWS, caching.SEARCH)
+
+        # Drafts never show, saving one only changes what search indexes
+        draft = self.create_news('Draft', status='draft')
+        keys = self.assertMoved(keys, caching.SEARCH)
+        # Unpublishing changes the sections
+        self.news.status = 'draft'
+        self.news.save()
+        keys = self.assertMoved(keys, caching.NEWS, caching.SEARCH)
+
+        comment = Comment.objects.create(news=draft, user=self.user, content='Hi')
+        self.assertEqual(self.keys(), keys)
+        comment.is_approved = True
+        comment.save()
+        keys = self.assertMoved(keys, caching.COMMENTS)
+
+        Category.objects.create(name='Arts')
+        keys = self.assertMoved(keys, caching.CATEGORIES)
+
+        self.author.bio = 'Editor'
+        self.author.save()
+        self.assertMoved(keys, caching.WRITERS)
+
+    def test_cached_section_follows_content(self):
+        calls = []
+
+        @caching.cached_section('featured_articles', 60)
+        def featured():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual((featured(), featured()), (1, 1))
+        self.news.is_featured = True
+        self.news.save()
+        self.assertEqual(featured(), 2)
+
+
+class StampedeProtectionTest(SimpleTestCase):
+    """Only one process rebuilds a section; the others wait for it or serve the stale value"""
+
+    section = 'most_viewed'
+
+    def setUp(self):
+        cache.clear()
+        self.key = caching.section_key(self.section)
+        self.builds = []
+
+    def build(self, value='fresh', delay=0):
+        def build():
+            time.sleep(delay)
+            self.builds.append(value)
+            return value
+        return build
+
+    def lock(self):
+        cache.add(f'{self.key}:lock', 1, caching.LOCK_TIMEOUT)
+
+    def test_single_flight(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(caching.get_or_build(self.section, self.build(delay=0.2), 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['fresh'] * 5)
+        self.assertEqual(self.builds, ['fresh'])
+        self.assertIsNone(cache.get(f'{self.key}:lock'))
+
+    def test_wait_for_other_builder(self):
+        self.lock()
+
+        def built_elsewhere(seconds):
+            cache.set(self.key, ('theirs', time.time() + 60))
+        with mock.patch.object(caching.time, 'sleep', side_effect=built_elsewhere):
+            self.assertEqual(caching.get_or_build(self.section, self.build(), 60), 'theirs')
+        self.assertEqual(self.builds, [])
+
+    @mock.patch.object(caching, 'WAIT_TIMEOUT', 0.1)
+    def test_wait_timeout(self):
+        # The other builder died without storing anything: build it ourselves
+        self.lock()
+        started = time.time()
+        self.assertEqual(caching.get_or_build(self.section, self.build(), 60), 'fresh')
+        self.assertGreaterEqual(time.time() - started, 0.1)
+        self.assertEqual(self.builds, ['fresh'])
+
+    def test_stale_while_revalidate(self):
+        cache.set(self.key, ('stale', time.time() - 1))
+        self.lock()
+        # Somebody is refreshing it: serve the stale value meanwhile
+        self.assertEqual(caching.get_or_build(self.section, self.build(), 60), 'stale')
+        self.assertEqual(self.builds, [])
+
+        cache.delete(f'{self.key}:lock')
+        self.assertEqual(caching.get_or_build(self.section, self.build(), 60), 'fresh')
+        self.assertEqual(caching.get_or_build(self.section, self.build('again'), 60), 'fresh')
+        self.assertEqual(self.builds, ['fresh'])
+
+    def test_failed_build_releases_lock(self):
+        def fail():
+            raise RuntimeError('database down')
+        with self.assertRaises(RuntimeError):
+            caching.get_or_build(self.section, fail, 60)
+        self.assertEqual(caching.get_or_build(self.section, self.build(), 60), 'fresh')
+
+    def test_jittered_ttl(self):
+        timeouts = {caching.jittered(100) for _ in range(200)}
+        self.assertTrue(all(90 <= timeout <= 110 for timeout in timeouts))
+        self.assertGreater(len(timeouts), 1)
+        self.assertEqual(caching.jittered(0), 1)
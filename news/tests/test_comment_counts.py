@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from .. import comment_counts
+from ..models import Comment, News
+from .base import NewsTestCase
+
+
+class ApprovedCommentCountTest(NewsTestCase):
+    """News.approved_comment_count follows every way comments change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news, cls.other = [cls.create_news(title) for title in ('First', 'Second')]
+
+    def comment(self, news=None, **fields):
+        return Comment.objects.create(news=news or self.news, user=self.user, content='Hi', **fields)
+
+    def count(self, news=None):
+        return News.objects.values_list('approved_comment_count', flat=True).get(pk=(news or self.news).pk)
+
+    def test_create_approve_delete(self):
+        pending = self.comment()
+        self.comment(is_approved=True)
+        self.assertEqual(self.count(), 1)
+
+        pending.is_approved = True
+        pending.save()
+        pending.save()
+        self.assertEqual(self.count(), 2)
+
+        pending.delete()
+        self.assertEqual(self.count(), 1)
+
+    def test_unapprove_and_move(self):
+        comment = self.comment(is_approved=True)
+        comment.news = self.other
+        comment.save()
+        self.assertEqual((self.count(), self.count(self.other)), (0, 1))
+
+        comment.is_approved = False
+        comment.save()
+        self.assertEqual(self.count(self.other), 0)
+
+    def test_bulk_approve(self):
+        for _ in range(3):
+            self.comment()
+        self.comment(news=self.other)
+        self.comment(is_approved=True)
+
+        approved = comment_counts.approve(Comment.objects.all())
+        self.assertEqual(approved, 4)
+        self.assertEqual((self.count(), self.count(self.other)), (4, 1))
+
+    def test_bulk_delete(self):
+        self.comment(is_approved=True)
+        self.comment(is_approved=True)
+        Comment.objects.all().delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_repair_command(self):
+        self.comment(is_approved=True)
+        News.objects.filter(pk=self.news.pk).update(approved_comment_count=7)
+        News.objects.filter(pk=self.other.pk).update(approved_comment_count=2)
+
+        out = StringIO()
+        call_command('repair_comment_counts', stdout=out)
+        self.assertIn('2 article(s)', out.getvalue())
+        self.assertEqual((self.count(), self.count(self.other)), (1, 0))
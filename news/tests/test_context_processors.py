@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from ..context_processors import SITE_CHROME_KEYS, news_context
+from .base import NewsTestCase
+
+
+class NewsContextTest(NewsTestCase):
+    """The site-wide context must cost nothing until a template uses it"""
+
+    category_fields = {'name': 'Sports'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        news = cls.create_news('Match report', summary='We won.', content='<p>3-1</p>', is_featured=True)
+        news.tags.add('football')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def get_context(self, path):
+        request = self.factory.get(path)
+        request.user = User()
+        request.resolver_match = resolve(path)
+        return news_context(request)
+
+    def test_unused_values_issue_no_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            context = self.get_context('/news/')
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(set(SITE_CHROME_KEYS) <= set(context))
+
+    def test_values_share_one_cached_bundle(self):
+        context = self.get_context('/news/')
+        self.assertEqual([category.name for category in context['categories']], ['Sports'])
+        self.assertEqual(context['top_categories'][0].news_count, 1)
+        self.assertEqual(len(context['featured_news']), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            context = self.get_context('/news/')
+            for name in SITE_CHROME_KEYS:
+                list(context[name])
+        self.assertEqual(len(queries), 0)
+
+    def test_excluded_namespace_gets_nothing(self):
+        self.assertEqual(self.get_context('/admin/'), {})
+
+        with override_settings(NEWS_CONTEXT_EXCLUDED_NAMESPACES=['news']):
+            self.assertEqual(self.get_context('/news/'), {})
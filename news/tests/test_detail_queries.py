@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, NewsMedia
+from .base import NewsTestCase
+
+
+@override_settings(NEWS_VIEW_COUNTER='memory', NEWS_VIEW_FLUSH_INTERVAL=3600)
+class NewsDetailQueryCountTest(NewsTestCase):
+    """The detail page must not issue more queries as media or comments are added"""
+
+    # Upper bound for a cold-cache render of the whole detail page
+    MAX_QUERIES = 10
+
+    author_fields = {'first_name': 'Ada'}
+    category_fields = {'name': 'School Life'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news = cls.create_news(
+            'Science fair winners',
+            featured_image='news/images/fair.jpg',
+            summary='The results are in.',
+            content='<p>Robots everywhere.</p>',
+        )
+        cls.news.tags.add('science', 'robots')
+        cls.url = reverse('news:news_detail', kwargs={'slug': cls.news.slug})
+
+    def setUp(self):
+        cache.clear()
+
+    def add_media(self, count):
+        media_types = ['image', 'video', 'document', 'audio']
+        NewsMedia.objects.bulk_create([
+            NewsMedia(
+                news=self.news,
+                media_type=media_types[i % len(media_types)],
+                file=f'news/media/file_{i}.bin',
+                is_featured=(i == 0),
+                order=i,
+            )
+            for i in range(count)
+        ])
+
+    def add_comments(self, count):
+        Comment.objects.bulk_create([
+            Comment(news=self.news, user=self.user, content=f'Comment {i}', is_approved=True)
+            for i in range(count)
+        ])
+
+    def count_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_query_count_independent_of_media(self):
+        baseline, _ = self.count_queries()
+        self.add_media(12)
+        with_media, _ = self.count_queries()
+        self.assertEqual(with_media, baseline)
+
+    def test_query_count_independent_of_comments(self):
+        baseline, _ = self.count_queries()
+        self.add_comments(10)
+        with_comments, _ = self.count_queries()
+        self.assertEqual(with_comments, baseline)
+
+    def test_query_count_upper_bound(self):
+        self.add_media(12)
+        self.add_comments(5)
+        num_queries, _ = self.count_queries()
+        self.assertLessEqual(num_queries, self.MAX_QUERIES)
+
+    def test_media_grouped_by_type(self):
+        self.add_media(8)
+        _, response = self.count_queries()
+        context = response.context
+
+        self.assertEqual(len(context['media_files']), 8)
+        for key, media_type in [('images', 'image'), ('videos', 'video'),
+                                ('documents', 'document'), ('audio_files', 'audio')]:
+            self.assertEqual(len(context[key]), 2)
+            self.assertTrue(all(media.media_type == media_type for media in context[key]))
+        self.assertEqual(context['featured_media'].order, 0)
+
+    def test_cached_body_skips_media_queries(self):
+        self.add_media(4)
+        self.count_queries()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('news_newsmedia' in query['sql'] for query in queries))
+
+    def test_media_change_refreshes_cached_body(self):
+        self.client.get(self.url)
+        NewsMedia.objects.create(news=self.news, media_type='document', file='news/media/agenda.pdf')
+
+        response = self.client.get(self.url)
+        self.assertContains(response, 'agenda.pdf')
@@ -0,0 +1,50 @@
+import pickle
+
+from ..dto import ArticleDTO, CommentDTO
+from ..models import Comment, News
+from .base import NewsTestCase
+
+
+class SnapshotPickleTest(NewsTestCase):
+    """Cached sections store snapshots, which must be smaller than the models"""
+
+    author_fields = {'first_name': 'Ada'}
+    category_fields = {'name': 'Arts'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(5):
+            news = cls.create_news(
+                f'Exhibition {i}',
+                featured_image=f'news/images/art_{i}.jpg',
+                summary='Paintings by the art club.',
+                content='<p>Come and see.</p>',
+            )
+            news.tags.add('art')
+            Comment.objects.create(news=news, user=cls.user, content='Lovely', is_approved=True)
+
+    def articles(self):
+        return list(News.objects.select_related('category', 'author__user').prefetch_related('tags'))
+
+    def test_round_trip(self):
+        snapshots = [ArticleDTO.from_news(news, author=True, tags=True) for news in self.articles()]
+        restored = pickle.loads(pickle.dumps(snapshots))
+
+        first = restored[0]
+        self.assertEqual(first.title, snapshots[0].title)
+        self.assertEqual(first.category.slug, 'arts')
+        self.assertEqual(first.author.get_full_name(), 'Ada')
+        self.assertEqual([tag.name for tag in first.tags], ['art'])
+        self.assertTrue(first.featured_image.url.endswith(snapshots[0].featured_image.name))
+        self.assertEqual(first.get_absolute_url(), f'/news/{first.slug}/')
+
+    def test_comment_without_avatar(self):
+        comment = CommentDTO.from_comment(Comment.objects.select_related('user__profile', 'news').first())
+        self.assertFalse(comment.user.avatar)
+        self.assertEqual(comment.user.avatar.url, '')
+
+    def test_smaller_than_models(self):
+        articles = self.articles()
+        snapshots = [ArticleDTO.from_news(news, author=True, tags=True) for news in articles]
+        self.assertLess(len(pickle.dumps(snapshots)), len(pickle.dumps(articles)) / 2)
@@ -1,7 +1,7 @@
 from django.test import TestCase, Client
 from django.urls import reverse
-from .models import ContactMessage, Subscriber
-from .forms import ContactForm, SubscriptionForm
+from ..models import ContactMessage, Subscriber
+from ..forms import ContactForm, SubscriptionForm
 
 class ContactFormTest(TestCase):
     def setUp(self):
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+
+from ..models import Category, News
+from ..views import HomePageView
+from .base import NewsTestCase
+
+
+class CategoryArticlesTest(NewsTestCase):
+    """Home page category sections come from one windowed query"""
+
+    category_fields = {'name': 'Arts'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        for category in [cls.category, Category.objects.create(name='Clubs'), Category.objects.create(name='Sports')]:
+            for i in range(4):
+                cls.create_news(
+                    f'{category.name} {i}', category=category,
+                    summary='Summary', content='<p>Body</p>', publish_date=now - timedelta(days=i),
+                )
+        # Unpublished categories and articles are left out
+        Category.objects.create(name='Empty')
+        cls.create_news('Arts draft', status='draft', publish_date=now)
+
+    def setUp(self):
+        cache.clear()
+
+    def sections(self, result):
+        return [(category.name, [article.title for article in category.articles]) for category in result]
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            result = HomePageView().get_category_articles()
+        self.assertEqual(self.sections(result), [
+            ('Arts', ['Arts 0', 'Arts 1', 'Arts 2']),
+            ('Clubs', ['Clubs 0', 'Clubs 1', 'Clubs 2']),
+            ('Sports', ['Sports 0', 'Sports 1', 'Sports 2']),
+        ])
+
+    @override_settings(HOME_CATEGORY_SECTIONS=2, HOME_CATEGORY_ARTICLES=1)
+    def test_configurable_limits(self):
+        result = HomePageView().get_category_articles()
+        self.assertEqual(self.sections(result), [('Arts', ['Arts 0']), ('Clubs', ['Clubs 0'])])
+
+    def test_matches_per_category_fallback(self):
+        view = HomePageView()
+        published = News.objects.filter(status='published', publish_date__lte=timezone.now())
+        self.assertEqual(
+            self.sections(view.get_category_articles()),
+            self.sections(view.get_category_articles_per_category(published, 6, 3)),
+        )
@@ -0,0 +1,80 @@
+import pickle
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from PIL import Image
+
+from .. import images
+from ..dto import ArticleDTO
+from .base import NewsTestCase
+
+
+def upload(size=(1000, 500), name='photo.png'):
+    output = BytesIO()
+    Image.new('RGB', size, 'blue').save(output, format='PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+class ImageVariantTest(NewsTestCase):
+    """Article images are served at several widths and formats once processed"""
+
+    category_fields = {'name': 'Science', 'image': ''}
+
+    def setUp(self):
+        cache.clear()
+        self.use_temp_media_root()
+        self.news = self.create_news('Science fair', featured_image=upload(), summary='Projects')
+
+    def render(self, image):
+        template = Template('{% load responsive_images %}{% responsive_image image sizes="50vw" alt="Fair" %}')
+        return template.render(Context({'image': image}))
+
+    def test_build_variants(self):
+        self.assertIsNone(self.news.featured_image_variants)
+        html = self.render(self.news.featured_image)
+        self.assertNotIn('srcset', html)
+        self.assertIn(self.news.featured_image.url, html)
+
+        self.assertEqual(images.process_pending(), (1, 0))
+        self.news.refresh_from_db()
+        variants = self.news.featured_image_variants
+        # Never wider than the original
+        self.assertEqual(variants['widths'], [320, 640, 960, 1000])
+        self.assertEqual(variants['formats'], images.available_formats())
+        name = images.variant_name(self.news.featured_image.name, 320, 'webp')
+        with default_storage.open(name) as file, Image.open(file) as img:
+            self.assertEqual((img.format, img.size), ('WEBP', (320, 160)))
+
+        # Nothing left to do
+        self.assertEqual(images.process_pending(), (0, 0))
+
+    def test_tag(self):
+        images.process_pending()
+        self.news.refresh_from_db()
+        html = self.render(self.news.featured_image)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('/640.jpeg 640w', html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn('alt="Fair"', html)
+
+        # Snapshots in the section cache keep them
+        article = pickle.loads(pickle.dumps(ArticleDTO.from_news(self.news)))
+        self.assertEqual(self.render(article.featured_image), html)
+
+    def test_detail_page_after_processing(self):
+        url = self.news.get_absolute_url()
+        self.assertNotIn('srcset', self.client.get(url).content.decode())
+
+        images.process_pending()
+        # The article body fragment is cached by updated_at, which moved on
+        self.assertIn('srcset', self.client.get(url).content.decode())
+
+    def test_new_upload_resets_variants(self):
+        images.process_pending()
+        self.news.refresh_from_db()
+        self.news.featured_image = upload(name='other.png')
+        self.news.save()
+        self.assertIsNone(self.news.featured_image_variants)
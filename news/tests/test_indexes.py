@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+from ..models import Comment, News
+from ..pagination import KeysetPaginator
+from .base import NewsTestCase
+
+
+class QueryPlanIndexTest(NewsTestCase):
+    """
+    The main published-news queries must be able to use their indexes.
+
+    Test tables are tiny, so on PostgreSQL sequential scans are disabled while
+    explaining: the test checks the index *can* serve the query shape, which
+    is what the planner relies on once tables grow. SQLite picks the indexes
+    on its own.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news = cls.create_news('Indexed')
+        Comment.objects.create(news=cls.news, user=cls.user, content='Hi', is_approved=True)
+
+    @contextmanager
+    def planner(self):
+        if connection.vendor != 'postgresql':
+            yield
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+    def assertUsesIndex(self, queryset, index_name):
+        with self.planner():
+            plan = queryset.explain()
+        self.assertIn(index_name, plan, f'{index_name} not used:\n{plan}')
+
+    def test_latest_published(self):
+        self.assertUsesIndex(News.published.order_by('-publish_date')[:10], 'news_published_date_idx')
+
+    def test_keyset_page(self):
+        paginator = KeysetPaginator(News.published.all(), 8)
+        cursor = paginator.make_cursor(self.news, 'next', 2)
+        values, forward, _number = paginator._read_cursor(cursor)
+        queryset = paginator.queryset.filter(paginator._seek(values, forward))[:9]
+        self.assertUsesIndex(queryset, 'news_published_date_idx')
+
+    def test_most_viewed(self):
+        self.assertUsesIndex(News.published.order_by('-views')[:4],
+                             'news_published_views_idx')
+
+    def test_category_page(self):
+        queryset = News.published.filter(category=self.category).order_by('-publish_date')[:8]
+        self.assertUsesIndex(queryset, 'news_category_published_idx')
+
+    def test_featured(self):
+        self.assertUsesIndex(News.published.filter(is_featured=True).order_by('-publish_date')[:4],
+                             'news_featured_published_idx')
+
+    def test_writer_posts(self):
+        self.assertUsesIndex(News.objects.filter(author=self.author).order_by('-created_at')[:10],
+                             'news_author_created_idx')
+
+    def test_recent_approved_comments(self):
+        self.assertUsesIndex(Comment.objects.filter(is_approved=True).order_by('-created_at')[:5],
+                             'comment_approved_recent_idx')
+
+    def test_approved_comments_of_article(self):
+        self.assertUsesIndex(self.news.approved_comments().order_by('-created_at'),
+                             'comment_approved_news_idx')
@@ -0,0 +1,119 @@
+import struct
+import wave
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from PIL import Image
+
+from .. import media_metadata
+from ..models import News, NewsMedia
+from .base import NewsTestCase
+
+
+def box(kind, payload):
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def mp4(seconds, width, height):
+    """A minimal MP4: the moov box holds the duration and the video size."""
+    mvhd = b'\0' * 12 + struct.pack('>II', 1000, int(seconds * 1000)) + b'\0' * 80
+    tkhd = b'\0' * 76 + struct.pack('>II', width << 16, height << 16)
+    return box(b'ftyp', b'isom\0\0\0\0') + box(b'mdat', b'\0' * 64) + box(
+        b'moov', box(b'mvhd', mvhd) + box(b'trak', box(b'tkhd', tkhd))
+    )
+
+
+def wav(seconds, rate=8000):
+    output = BytesIO()
+    with wave.open(output, 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(1)
+        audio.setframerate(rate)
+        audio.writeframes(b'\x80' * int(rate * seconds))
+    return output.getvalue()
+
+
+def png(size):
+    output = BytesIO()
+    Image.new('RGB', size).save(output, format='PNG')
+    return output.getvalue()
+
+
+class MediaMetadataTest(NewsTestCase):
+    """File metadata is read once, by a worker, after the upload and stored"""
+
+    category_fields = {'name': 'Events', 'image': ''}
+
+    def setUp(self):
+        self.use_temp_media_root()
+        self.post = self.create_news('Open day', summary='Tour')
+
+    def add(self, media_type, name, content):
+        return NewsMedia.objects.create(news=self.post, media_type=media_type, file=SimpleUploadedFile(name, content))
+
+    def read(self):
+        call_command('read_media_metadata', stdout=StringIO())
+        return {media.file.name.rsplit('/', 1)[-1]: media for media in NewsMedia.objects.all()}
+
+    def test_upload_leaves_reading_to_worker(self):
+        with mock.patch.object(media_metadata, 'read_metadata') as read_metadata:
+            video = self.add('video', 'tour.mp4', mp4(12.5, 1280, 720))
+        read_metadata.assert_not_called()
+        # What the name tells is there straight away
+        self.assertEqual((video.mime_type, video.icon_class), ('video/mp4', 'fas fa-file-video'))
+        self.assertIsNone(video.file_size)
+
+        # Replacing the file forgets the old one's metadata
+        self.read()
+        video.refresh_from_db()
+        video.file = SimpleUploadedFile('speech.wav', wav(2))
+        video.save()
+        video.refresh_from_db()
+        self.assertEqual((video.file_size, video.duration, video.mime_type), (None, None, 'audio/wav'))
+
+    def test_read_by_worker(self):
+        self.add('video', 'tour.mp4', mp4(12.5, 1280, 720))
+        self.add('audio', 'speech.wav', wav(2))
+        self.add('image', 'hall.png', png((40, 30)))
+        self.add('document', 'Plan.PDF', b'%PDF-1.4')
+        News.objects.filter(pk=self.post.pk).update(updated_at=self.post.updated_at)
+
+        media = self.read()
+        video, audio, image, document = media['tour.mp4'], media['speech.wav'], media['hall.png'], media['Plan.PDF']
+        self.assertEqual((video.mime_type, video.icon_class), ('video/mp4', 'fas fa-file-video'))
+        self.assertEqual((video.width, video.height, video.duration), (1280, 720, 12.5))
+        self.assertEqual(video.file_size, video.file.size)
+        self.assertEqual((audio.mime_type, audio.duration), ('audio/wav', 2.0))
+        self.assertEqual((image.width, image.height), (40, 30))
+        self.assertEqual(image.file_size, len(png((40, 30))))
+        self.assertEqual((document.mime_type, document.icon_class), ('application/pdf', 'fas fa-file-pdf'))
+        self.assertIsNone(document.duration)
+        # The cached article fragment is refreshed
+        self.assertGreater(News.objects.get(pk=self.post.pk).updated_at, self.post.updated_at)
+        self.assertEqual(media_metadata.process_pending(), (0, 0))
+
+    def test_backfill(self):
+        media = self.add('video', 'tour.mp4', mp4(3, 640, 360))
+        NewsMedia.objects.update(file_size=None, mime_type='', width=None, height=None, duration=None, icon_class='')
+        NewsMedia.objects.create(news=self.post, media_type='document', file='news/media/missing.pdf')
+
+        self.assertEqual(media_metadata.process_pending(), (1, 1))
+        media.refresh_from_db()
+        self.assertEqual((media.width, media.duration, media.mime_type), (640, 3.0, 'video/mp4'))
+        # A missing file isn't retried on every check
+        self.assertEqual(media_metadata.process_pending(), (0, 0))
+
+    def test_templates_use_stored_fields(self):
+        self.add('document', 'minutes.docx', b'PK')
+        self.add('audio', 'choir.m4a', mp4(1, 0, 0))
+        self.read()
+        html = render_to_string('news/news_detail.html', {
+            'news': self.post,
+            'documents': list(self.post.media_files.filter(media_type='document')),
+            'audio_files': list(self.post.media_files.filter(media_type='audio')),
+        })
+        self.assertIn('fas fa-file-word', html)
+        self.assertIn('type="audio/mp4"', html)
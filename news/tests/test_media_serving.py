@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+
+from django.test import RequestFactory, SimpleTestCase
+
+from ..media_serving import serve_media
+
+
+class MediaServingTest(SimpleTestCase):
+    """Media supports byte ranges, so seeking in a video doesn't download it again"""
+
+    content = bytes(range(256)) * 40
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        with open(os.path.join(self.root, 'clip.mp4'), 'wb') as file:
+            file.write(self.content)
+
+    def get(self, **headers):
+        request = RequestFactory().get('/media/clip.mp4', **headers)
+        response = serve_media(request, 'clip.mp4', document_root=self.root)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_full(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(int(response['Content-Length']), len(self.content))
+
+    def test_ranges(self):
+        response, body = self.get(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+        self.assertEqual(self.get(HTTP_RANGE='bytes=10000-')[1], self.content[10000:])
+        self.assertEqual(self.get(HTTP_RANGE='bytes=-24')[1], self.content[-24:])
+        # Several ranges aren't supported, the whole file is sent
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1,5-6')[0].status_code, 200)
+
+        response, _body = self.get(HTTP_RANGE='bytes=20000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_conditional(self):
+        etag = self.get()[0]['ETag']
+        response, body = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, body), (304, b''))
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.get(HTTP_IF_MATCH='"other"')[0].status_code, 412)
+
+        # A range of a file that changed since is not sent alone
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)[0].status_code, 206)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"other"')[0].status_code, 200)
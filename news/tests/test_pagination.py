@@ -0,0 +1,93 @@
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.http import Http404
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import News
+from ..pagination import KeysetPaginator
+from .base import NewsTestCase
+
+
+class KeysetPaginatorTest(NewsTestCase):
+    """Cursor pages must cover every row exactly once, in order, both ways"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        for i in range(23):
+            cls.create_news(
+                f'Article {i}',
+                summary='Summary',
+                content='<p>Body</p>',
+                # Duplicate dates exercise the id tiebreaker
+                publish_date=now - timedelta(days=i // 3),
+                views=i % 4,
+            )
+        # save() dates published articles, so clear some directly for the NULL handling
+        News.objects.filter(title__in=['Article 9', 'Article 19']).update(publish_date=None)
+        cls.factory = RequestFactory()
+
+    def paginator(self, ordering=('-publish_date',)):
+        return KeysetPaginator(News.objects.all(), 5, ordering)
+
+    def expected(self, ordering):
+        return list(self.paginator(ordering).queryset.values_list('id', flat=True))
+
+    def walk_forward(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_forward_matches_offset_order(self):
+        for ordering in [('-publish_date',), ('title',), ('-views',)]:
+            paginator = self.paginator(ordering)
+            pages = self.walk_forward(paginator)
+            self.assertEqual([news.id for page in pages for news in page], self.expected(ordering))
+            self.assertEqual([page.number for page in pages], [1, 2, 3, 4, 5])
+
+    def test_backward_returns_same_pages(self):
+        paginator = self.paginator()
+        pages = self.walk_forward(paginator)
+
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = paginator.page(page.previous_cursor)
+            self.assertEqual([news.id for news in page], [news.id for news in expected])
+            self.assertEqual(page.number, expected.number)
+        self.assertFalse(page.has_previous())
+
+    def test_page_numbers_for_first_pages(self):
+        paginator = self.paginator()
+        page = paginator.page_number(3)
+        self.assertEqual([news.id for news in page], self.expected(('-publish_date',))[10:15])
+
+        with override_settings(NEWS_PAGINATION_PAGE_NUMBERS=2):
+            with self.assertRaises(Http404):
+                self.paginator().page_number(3)
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        paginator = self.paginator()
+        cursor = paginator.page().next_cursor
+        self.assertEqual(paginator.page(cursor[:-2] + 'xx').number, 1)
+        # A cursor for another sort order isn't reused
+        self.assertEqual(self.paginator(('title',)).page(cursor).number, 1)
+
+    def test_no_count_query_by_default(self):
+        paginator = self.paginator()
+        with self.assertNumQueries(1):
+            list(paginator.page())
+        self.assertIsNone(paginator.count)
+
+    def test_list_view_links(self):
+        response = self.client.get(reverse('news:news_list'))
+        page = response.context['page_obj']
+        self.assertContains(response, f'?{urlencode({"cursor": page.next_cursor})}')
+
+        response = self.client.get(reverse('news:news_list'), {'cursor': page.next_cursor})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(self.client.get(reverse('news:news_list'), {'page': 99}).status_code, 404)
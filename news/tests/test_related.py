@@ -0,0 +1,79 @@
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+
+from .. import related
+from ..models import Category, RelatedArticle
+from .base import NewsTestCase
+
+
+class TfidfTest(NewsTestCase):
+    """Text similarity is the cosine of normalized TF-IDF vectors"""
+
+    def test_vectors(self):
+        vectors, postings = related.build_tfidf([['robot', 'robot', 'fair'], ['robot', 'chess'], ['poetry']])
+        for _indices, weights in vectors:
+            self.assertAlmostEqual(float(np.linalg.norm(weights)), 1)
+
+        scores = related.cosine_scores(0, vectors, postings, 3)
+        # Never similar to itself; sharing a term beats sharing nothing
+        self.assertEqual(scores[0], 0)
+        self.assertGreater(scores[1], 0)
+        self.assertEqual(scores[2], 0)
+
+    def test_terms(self):
+        self.assertEqual(related._terms('<p>The 2024 robots of our club</p>'), ['robots', 'club'])
+
+
+class RelatedArticlesTest(NewsTestCase):
+    """Related articles combine text, tag and category similarity"""
+
+    category_fields = {'name': 'Science'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        sports = Category.objects.create(name='Sports')
+        cls.robots = cls.create_news('Robots', content='<p>Robotics club robots soldering circuits</p>')
+        cls.circuits = cls.create_news('Circuits', content='<p>Soldering circuits for club robots</p>')
+        # Shares tags but no words with the first article
+        cls.tagged = cls.create_news('Tagged', category=sports, content='<p>Football results</p>')
+        # Same category, nothing else in common
+        cls.poetry = cls.create_news('Poetry', content='<p>Sonnets and haiku</p>')
+        cls.unrelated = cls.create_news('Match', category=sports, content='<p>Basketball scores</p>')
+        cls.draft = cls.create_news('Draft', status='draft', content='<p>Robotics club robots circuits</p>')
+        cls.robots.tags.add('stem', 'makers')
+        cls.tagged.tags.add('stem', 'makers')
+
+    def test_scores(self):
+        scores = dict(related.compute_related()[self.robots.pk])
+        self.assertEqual(list(scores), [self.circuits.pk, self.tagged.pk, self.poetry.pk])
+        # Identical tag sets: the full tag weight, and no text in common
+        self.assertAlmostEqual(scores[self.tagged.pk], related.TAG_WEIGHT)
+        self.assertAlmostEqual(scores[self.poetry.pk], related.CATEGORY_WEIGHT)
+        self.assertGreater(scores[self.circuits.pk], related.CATEGORY_WEIGHT)
+        # Drafts are neither scored nor suggested
+        self.assertNotIn(self.draft.pk, related.compute_related())
+
+    def test_rebuild(self):
+        RelatedArticle.objects.create(news=self.robots, related=self.unrelated, score=1, rank=0)
+        out = StringIO()
+        call_command('build_related_articles', stdout=out)
+
+        rows = RelatedArticle.objects.filter(news=self.robots).order_by('rank')
+        self.assertEqual([row.related_id for row in rows], [self.circuits.pk, self.tagged.pk, self.poetry.pk])
+        self.assertEqual([row.rank for row in rows], [0, 1, 2])
+        self.assertEqual(related.get_related_news(self.robots), [self.circuits, self.tagged, self.poetry])
+
+        # A match that is unpublished since the rebuild is left out
+        self.circuits.status = 'draft'
+        self.circuits.save()
+        self.assertEqual(related.get_related_news(self.robots), [self.tagged, self.poetry])
+
+    def test_same_category_fallback(self):
+        # Nothing indexed yet: the latest articles of the same category
+        with self.assertNumQueries(2):
+            fallback = related.get_related_news(self.robots)
+        self.assertEqual(set(fallback), {self.circuits, self.poetry})
+        self.assertNotIn(self.draft, fallback)
@@ -0,0 +1,53 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from .. import scheduling
+from ..models import News
+from .base import NewsTestCase
+
+
+class ScheduledPublishingTest(NewsTestCase):
+    """News.published only returns live articles; scheduled ones go live on time"""
+
+    def create(self, title, **fields):
+        # Leave the date to save() unless the test sets it
+        fields.setdefault('publish_date', None)
+        return self.create_news(title, **fields)
+
+    def test_live_flag_follows_status_and_date(self):
+        live = self.create('Live', publish_date=timezone.now() - timedelta(hours=1))
+        undated = self.create('Undated')
+        scheduled = self.create('Scheduled', publish_date=timezone.now() + timedelta(days=1))
+        draft = self.create('Draft', status='draft')
+
+        self.assertTrue(live.is_live)
+        self.assertTrue(undated.is_live)
+        self.assertIsNotNone(undated.publish_date)
+        self.assertFalse(scheduled.is_live)
+        self.assertFalse(draft.is_live)
+        self.assertQuerySetEqual(News.published.order_by('title'), [live, undated])
+
+        live.status = 'draft'
+        live.save()
+        self.assertFalse(News.published.filter(pk=live.pk).exists())
+
+    def test_publish_due(self):
+        scheduled = self.create('Scheduled', publish_date=timezone.now() + timedelta(hours=2))
+        self.assertEqual(scheduling.next_due(), scheduled.publish_date)
+        self.assertEqual(scheduling.publish_due(), [])
+
+        self.assertEqual(scheduling.publish_due(now=timezone.now() + timedelta(hours=3)), [scheduled.pk])
+        self.assertTrue(News.published.filter(pk=scheduled.pk).exists())
+        self.assertIsNone(scheduling.next_due())
+
+    def test_command(self):
+        scheduled = self.create('Scheduled', publish_date=timezone.now() + timedelta(hours=2))
+        News.objects.filter(pk=scheduled.pk).update(publish_date=timezone.now() - timedelta(minutes=1))
+
+        out = StringIO()
+        call_command('publish_scheduled', stdout=out)
+        self.assertIn('Published 1 scheduled article(s)', out.getvalue())
+        self.assertTrue(News.published.filter(pk=scheduled.pk).exists())
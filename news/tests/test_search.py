@@ -0,0 +1,111 @@
+from unittest import skipIf, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+
+from .. import caching, search
+from ..models import Category, News
+from .base import NewsTestCase
+
+
+class SearchTest(NewsTestCase):
+    """Searches match every keyword by prefix, rank title matches first and respect filters"""
+
+    category_fields = {'name': 'Science'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.robots = cls.create_news('Robots at the science fair', summary='Projects', content='<p>Judges</p>')
+        cls.mention = cls.create_news('Prize giving', summary='Awards', content='<p>The robotics club won.</p>')
+        cls.sports = cls.create_news(
+            'Robot football', category=Category.objects.create(name='Sports'), content='<p>Goals</p>',
+        )
+        cls.draft = cls.create_news('Robot draft', status='draft')
+        cls.mention.tags.add('awards')
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, query, sort='relevance', queryset=None):
+        results = search.search(query, queryset if queryset is not None else News.published.all(), sort)
+        return [news.title for news in results]
+
+    def test_ranking(self):
+        # Every title starting with "robot" outranks the body-only match
+        self.assertEqual(self.titles('robot')[-1], 'Prize giving')
+        self.assertEqual(set(self.titles('robot')), {'Robots at the science fair', 'Robot football', 'Prize giving'})
+        self.assertEqual(self.titles('robot', sort='title'), ['Prize giving', 'Robot football', 'Robots at the science fair'])
+
+    def test_every_keyword_must_match(self):
+        self.assertEqual(self.titles('robot fair'), ['Robots at the science fair'])
+        self.assertEqual(self.titles('robot awards'), ['Prize giving'])
+        self.assertEqual(self.titles('robot cooking'), [])
+        self.assertEqual(self.titles('  '), [])
+
+    def test_filtering(self):
+        self.assertEqual(self.titles('robot', queryset=News.published.filter(category=self.sports.category)),
+                         ['Robot football'])
+        self.assertNotIn(self.draft.pk, search.result_ids('robot'))
+        self.assertEqual(search.result_ids('robot', category_id=self.category.pk, sort='title'),
+                         [self.mention.pk, self.robots.pk])
+
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL searches the search_vector column')
+    def test_fallback_stores_terms_separately(self):
+        self.assertEqual(len(self.titles('judges')), 1)
+
+        index = search.InvertedIndex.get()
+        self.assertIn('judges', index.vocabulary)
+        self.assertEqual(cache.get(index._term_key('judges')), {self.robots.pk: 1})
+        # A search reads only the postings of the terms it matches
+        self.assertEqual(index.postings, {})
+        index.search(['judge'])
+        self.assertEqual(set(index.postings), {'judges'})
+
+        # An evicted term rebuilds the index rather than missing results
+        cache.delete(index._term_key('judges'))
+        self.assertEqual(search.InvertedIndex.get().search(['judges']).keys(), {self.robots.pk})
+
+    @skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+    def test_search_vector(self):
+        self.assertIsNotNone(News.objects.values_list('search_vector', flat=True).get(pk=self.robots.pk))
+        results = search.search('robot fair', News.published.all(), 'relevance')
+        self.assertEqual([news.pk for news in results], [self.robots.pk])
+        self.assertGreater(results[0].rank, 0)
+
+
+class SearchResultCacheTest(NewsTestCase):
+    """Result id lists are cached per normalized search and dropped when an article changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news = cls.create_news('Chess club final')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_normalized_query(self):
+        self.assertEqual(search.normalize_query('  Chess,  CLUB! '), 'chess club')
+        self.assertEqual(search.result_ids('  Chess,  CLUB! '), [self.news.pk])
+        # Every spelling of the search, and every page of it, is served from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(search.result_ids('chess club'), [self.news.pk])
+        # Other categories and sort orders are separate entries
+        self.assertEqual(search.result_ids('chess club', category_id=self.category.pk + 1), [])
+        self.assertEqual(search.result_ids('chess', sort='bogus'), search.result_ids('chess', sort='-publish_date'))
+
+    def test_invalidated_on_save_and_delete(self):
+        self.assertEqual(search.result_ids('chess'), [self.news.pk])
+        versions = caching.get_versions([caching.SEARCH])
+
+        other = self.create_news('Chess tournament')
+        self.assertNotEqual(caching.get_versions([caching.SEARCH]), versions)
+        self.assertEqual(set(search.result_ids('chess')), {self.news.pk, other.pk})
+
+        other.tags.add('checkmate')
+        self.assertEqual(search.result_ids('checkmate'), [other.pk])
+
+        other.delete()
+        self.assertEqual(search.result_ids('chess'), [self.news.pk])
+        self.assertEqual(search.result_ids('checkmate'), [])
@@ -0,0 +1,129 @@
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+
+from .. import view_counter
+from ..models import ArticleHourlyViews, News
+from .base import NewsTestCase
+
+
+class ViewCounterTest(NewsTestCase):
+    """Views reach News.views and the hourly rows in every counting mode"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news, cls.other = cls.create_news('First'), cls.create_news('Second')
+
+    def setUp(self):
+        cache.clear()
+        view_counter._pending.clear()
+
+    def views(self, news):
+        return News.objects.values_list('views', flat=True).get(pk=news.pk)
+
+    def hourly(self, news):
+        return {
+            row.hour: row.views for row in ArticleHourlyViews.objects.filter(news=news)
+        }
+
+    def record(self, news, times=1):
+        for _ in range(times):
+            view_counter.record_view(news.pk)
+
+    def test_default_mode_follows_cache(self):
+        with override_settings(NEWS_VIEW_COUNTER=''):
+            # The test cache is local memory, which other processes don't see
+            self.assertEqual(view_counter.get_mode(), 'direct')
+            # Shared, but incr() reads and writes back the value
+            with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+            }}):
+                self.assertEqual(view_counter.get_mode(), 'direct')
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379',
+            }}):
+                self.assertEqual(view_counter.get_mode(), 'cache')
+
+        with override_settings(NEWS_VIEW_COUNTER='cache'):
+            self.assertEqual([warning.id for warning in view_counter.check_cache(None)], ['news.W001'])
+
+    @override_settings(NEWS_VIEW_COUNTER='direct')
+    def test_direct(self):
+        self.record(self.news, 2)
+        self.assertEqual(self.views(self.news), 2)
+        hour = view_counter.hour_to_datetime(view_counter.current_hour())
+        self.assertEqual(self.hourly(self.news), {hour: 2})
+        self.assertEqual(view_counter.pending_views(self.news.pk), 0)
+
+    @override_settings(NEWS_VIEW_COUNTER='memory', NEWS_VIEW_FLUSH_INTERVAL=3600)
+    def test_memory(self):
+        self.record(self.news, 3)
+        self.assertEqual(self.views(self.news), 0)
+        self.assertEqual(view_counter.pending_views(self.news.pk), 3)
+
+        self.assertEqual(view_counter.flush(), 3)
+        self.assertEqual(self.views(self.news), 3)
+        self.assertEqual(view_counter.pending_views(self.news.pk), 0)
+
+    @override_settings(NEWS_VIEW_COUNTER='cache')
+    def test_cache(self):
+        hour = view_counter.current_hour()
+        with mock.patch.object(view_counter, 'current_hour', return_value=hour - 1):
+            self.record(self.news)
+        self.record(self.news, 2)
+        self.record(self.other)
+
+        # Requests never flush the buffer themselves
+        self.assertEqual((self.views(self.news), self.views(self.other)), (0, 0))
+        self.assertEqual(view_counter.pending_views(self.news.pk), 3)
+
+        out = StringIO()
+        call_command('flush_news_views', stdout=out)
+        self.assertIn('Flushed 4 buffered view(s)', out.getvalue())
+        self.assertEqual((self.views(self.news), self.views(self.other)), (3, 1))
+        self.assertEqual(self.hourly(self.news), {
+            view_counter.hour_to_datetime(hour - 1): 1,
+            view_counter.hour_to_datetime(hour): 2,
+        })
+        self.assertEqual(view_counter.flush(), 0)
+
+        # A flushed bucket keeps counting
+        self.record(self.news)
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(self.views(self.news), 4)
+
+    @override_settings(NEWS_VIEW_COUNTER='cache')
+    def test_cache_flush_reads_touched_articles_only(self):
+        self.record(self.news)
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            view_counter.flush()
+        bucket_keys = [key for call in get_many.call_args_list for key in call.args[0]
+                       if ':touched' not in key]
+        self.assertEqual(bucket_keys, [view_counter._cache_key(self.news.pk, view_counter.current_hour())])
+
+    @override_settings(NEWS_VIEW_COUNTER='cache')
+    def test_concurrent_flushes(self):
+        self.record(self.news, 2)
+        apply_counts = view_counter._apply_counts
+        overlapping = []
+
+        def apply_counts_with_second_flush(counts):
+            # Another flusher starts while this one is writing
+            overlapping.append(view_counter.flush())
+            return apply_counts(counts)
+
+        with mock.patch.object(view_counter, '_apply_counts', side_effect=apply_counts_with_second_flush):
+            self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(overlapping, [0])
+        self.assertEqual(self.views(self.news), 2)
+        self.assertEqual(cache.get(view_counter._cache_key(self.news.pk, view_counter.current_hour())), 0)
+
+        # The lock is released once the flush is done
+        self.record(self.news)
+        self.assertEqual(view_counter.flush(), 1)
+        self.assertEqual(self.views(self.news), 3)
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from utils.analytics import get_time_series_data
+
+from .. import view_stats
+from ..models import ArticleDailyViews, ArticleHourlyViews
+from .base import NewsTestCase
+
+
+class ViewStatsTest(NewsTestCase):
+    """Hourly views roll up into daily rows, and reports count both"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.news, cls.other = cls.create_news('First'), cls.create_news('Second')
+        cls.draft = cls.create_news('Draft', status='draft')
+
+    def add_views(self, news, days_ago, views, hour=12):
+        start = view_stats._start_of_day(days_ago)
+        ArticleHourlyViews.objects.create(news=news, hour=start + timedelta(hours=hour), views=views)
+
+    def daily(self, news):
+        return dict(ArticleDailyViews.objects.filter(news=news).values_list('day', 'views'))
+
+    def day(self, days_ago):
+        return timezone.now().date() - timedelta(days=days_ago)
+
+    def ranking(self, days=30):
+        return [(news.title, news.period_views) for news in view_stats.most_viewed_news(days)]
+
+    def test_rollup(self):
+        self.add_views(self.news, 1, 2, hour=1)
+        self.add_views(self.news, 1, 3, hour=2)
+        self.add_views(self.news, 0, 4)
+        self.add_views(self.news, 5, 9)
+
+        self.assertEqual(view_stats.rollup_daily(days=2), 2)
+        self.assertEqual(self.daily(self.news), {self.day(1): 5, self.day(0): 4})
+
+        # Recomputing a day overwrites its row rather than adding to it
+        self.add_views(self.news, 0, 1, hour=13)
+        view_stats.rollup_daily(days=2)
+        self.assertEqual(self.daily(self.news), {self.day(1): 5, self.day(0): 5})
+
+    def test_prune(self):
+        self.add_views(self.news, 8, 1)
+        self.add_views(self.news, 7, 1, hour=0)
+        self.add_views(self.news, 6, 1)
+        self.assertEqual(view_stats.prune_hourly(keep_days=7), 1)
+        self.assertEqual(ArticleHourlyViews.objects.count(), 2)
+
+    def test_most_viewed_before_rollup(self):
+        # Nothing rolled up yet: the hourly rows alone
+        self.add_views(self.news, 3, 2)
+        self.add_views(self.other, 0, 5)
+        self.add_views(self.draft, 0, 50)
+        self.assertEqual(self.ranking(), [('Second', 5), ('First', 2)])
+        self.assertEqual(self.ranking(days=1), [('Second', 5)])
+
+    def test_most_viewed_after_rollup(self):
+        self.add_views(self.news, 40, 100)
+        self.add_views(self.news, 3, 2)
+        self.add_views(self.other, 1, 3)
+        view_stats.rollup_daily(days=45)
+        # Older hourly rows are gone; the daily rows keep their views
+        view_stats.prune_hourly(keep_days=2)
+
+        # Views since the rollup are added, without counting the rolled-up day twice
+        self.add_views(self.other, 1, 4, hour=20)
+        self.add_views(self.news, 0, 1)
+        self.assertEqual(self.ranking(), [('Second', 7), ('First', 3)])
+
+    def test_time_series(self):
+        self.add_views(self.news, 2, 2)
+        view_stats.rollup_daily(days=3)
+        self.add_views(self.news, 0, 3)
+        self.add_views(self.other, 0, 4)
+        self.assertEqual(get_time_series_data('views', 'day', days=7), {
+            f'{self.day(2):%Y-%m-%d}': 2,
+            f'{self.day(0):%Y-%m-%d}': 7,
+        })
@@ -0,0 +1,303 @@
+# news/view_counter.py
+"""
+Buffered view counting for news articles.
+
+Instead of writing to the ``News`` row on every page view, hits are
+accumulated per article and clock hour in the cache (or in a per-process
+counter) and flushed in bulk: ``News.views`` gets an ``F()`` update and the
+hourly buckets land in ``ArticleHourlyViews`` for time-based statistics.
+
+The 'cache' mode needs a cache shared by every process whose ``incr`` is
+atomic, i.e. Redis (settings.py configures one from REDIS_URL) or
+Memcached. With the local-memory cache each process would buffer, and lose,
+its own hits; the file and database caches read and write back the value,
+so hits arriving together overwrite each other. Requests only add to the
+buffer; ``manage.py flush_news_views --watch`` (or the same command from
+cron) writes it out, one flush at a time. Each hour's buffer lists the
+articles it has hits for, so a flush reads those buckets only.
+
+Settings:
+    NEWS_VIEW_COUNTER (str): 'cache', 'memory' or 'direct'. Unset, 'cache'
+        when the default cache is Redis or Memcached and 'direct' otherwise.
+        'memory' buffers in each process, which flushes its own hits every
+        NEWS_VIEW_FLUSH_INTERVAL. 'direct' writes every hit immediately
+        with atomic ``F()`` updates and never loses an increment; use it
+        when exact counts matter more than throughput.
+    NEWS_VIEW_FLUSH_INTERVAL (int): Seconds between flushes of the 'memory'
+        buffers, and between ``flush_news_views --watch`` runs.
+"""
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models import F
+
+CACHE_KEY_PREFIX = 'news_views'
+LAST_FLUSH_KEY = f'{CACHE_KEY_PREFIX}:last_flush_hour'
+FLUSH_LOCK_KEY = f'{CACHE_KEY_PREFIX}:flush_lock'
+# Longer than a flush takes; frees the lock if a flusher dies holding it
+FLUSH_LOCK_TIMEOUT = 300
+FLUSH_CHUNK_SIZE = 500
+# How many hours of unflushed buckets a flush looks back for
+MAX_BACKLOG_HOURS = 24
+# Buffered keys outlive the backlog a flush looks at, then expire
+BUFFER_TIMEOUT = (MAX_BACKLOG_HOURS + 2) * 3600
+# Modules of the cache backends shared by every process with an atomic incr()
+ATOMIC_CACHE_MODULES = (
+    'django.core.cache.backends.redis',
+    'django.core.cache.backends.memcached',
+    'django_redis.',
+)
+
+# Per-process buffer used by the 'memory' mode, keyed by (news_id, hour)
+_pending = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def cache_is_shared():
+    """Whether the default cache is seen by every process and increments atomically."""
+    return type(caches['default']).__module__.startswith(ATOMIC_CACHE_MODULES)
+
+
+def get_mode():
+    mode = getattr(settings, 'NEWS_VIEW_COUNTER', '')
+    if mode:
+        return mode
+    return 'cache' if cache_is_shared() else 'direct'
+
+
+def get_flush_interval():
+    return getattr(settings, 'NEWS_VIEW_FLUSH_INTERVAL', 60)
+
+
+def current_hour():
+    """Hours since the epoch, used as the bucket for a hit."""
+    return int(time.time() // 3600)
+
+
+def hour_to_datetime(hour):
+    return datetime.fromtimestamp(hour * 3600, tz=dt_timezone.utc)
+
+
+def _cache_key(news_id, hour):
+    return f'{CACHE_KEY_PREFIX}:{hour}:{news_id}'
+
+
+def _touched_count_key(hour):
+    return f'{CACHE_KEY_PREFIX}:{hour}:touched'
+
+
+def _touched_key(hour, n):
+    return f'{CACHE_KEY_PREFIX}:{hour}:touched:{n}'
+
+
+def record_view(news_id):
+    """Register a single view of the article with the given id."""
+    mode = get_mode()
+
+    if mode == 'direct':
+        _apply_counts({(news_id, current_hour()): 1})
+    elif mode == 'memory':
+        _record_in_memory(news_id)
+    else:
+        _record_in_cache(news_id)
+
+
+def _record_in_cache(news_id):
+    hour = current_hour()
+    key = _cache_key(news_id, hour)
+    if cache.add(key, 1, timeout=BUFFER_TIMEOUT):
+        _touch(news_id, hour)
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The key expired between add() and incr()
+        if cache.add(key, 1, timeout=BUFFER_TIMEOUT):
+            _touch(news_id, hour)
+
+
+def _touch(news_id, hour):
+    """List the article among those the hour's buffer has hits for."""
+    count_key = _touched_count_key(hour)
+    cache.add(count_key, 0, timeout=BUFFER_TIMEOUT)
+    cache.set(_touched_key(hour, cache.incr(count_key)), news_id, timeout=BUFFER_TIMEOUT)
+
+
+def _touched_ids(hour):
+    """Ids of the articles with buffered hits in an hour."""
+    count = cache.get(_touched_count_key(hour)) or 0
+    keys = [_touched_key(hour, n) for n in range(1, count + 1)]
+    return set(cache.get_many(keys).values())
+
+
+def _record_in_memory(news_id):
+    global _last_flush
+    with _pending_lock:
+        _pending[(news_id, current_hour())] += 1
+        if time.monotonic() - _last_flush < get_flush_interval():
+            return
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    _apply_counts(counts)
+
+
+def _apply_counts(counts):
+    """
+    Write buffered counts to the database.
+
+    Args:
+        counts (dict): Mapping of (news_id, hour) to number of views
+
+    Returns:
+        int: Number of views written
+    """
+    from .models import News, ArticleHourlyViews
+
+    counts = {key: count for key, count in counts.items() if count > 0}
+    if not counts:
+        return 0
+
+    totals = Counter()
+    for (news_id, _hour), count in counts.items():
+        totals[news_id] += count
+
+    # One UPDATE per distinct count rather than one per article
+    ids_by_total = defaultdict(list)
+    for news_id, total in totals.items():
+        ids_by_total[total].append(news_id)
+
+    ids_by_bucket = defaultdict(list)
+    for (news_id, hour), count in counts.items():
+        ids_by_bucket[(hour, count)].append(news_id)
+
+    with transaction.atomic():
+        for total, ids in ids_by_total.items():
+            News.objects.filter(pk__in=ids).update(views=F('views') + total)
+
+        # Make sure every bucket row exists, then increment atomically so
+        # concurrent flushes can't overwrite each other
+        existing = set(News.objects.filter(pk__in=totals).values_list('id', flat=True))
+        ArticleHourlyViews.objects.bulk_create([
+            ArticleHourlyViews(news_id=news_id, hour=hour_to_datetime(hour), views=0)
+            for news_id, hour in counts if news_id in existing
+        ], ignore_conflicts=True)
+
+        for (hour, count), ids in ids_by_bucket.items():
+            ArticleHourlyViews.objects.filter(
+                news_id__in=ids, hour=hour_to_datetime(hour)
+            ).update(views=F('views') + count)
+
+    return sum(counts.values())
+
+
+def _unflushed_hours():
+    now = current_hour()
+    last = cache.get(LAST_FLUSH_KEY) or now - 1
+    return range(max(last, now - MAX_BACKLOG_HOURS), now + 1)
+
+
+def flush_cache():
+    """
+    Move buffered view counts from the cache into the database.
+
+    Only one flush runs at a time; two would both subtract and write the
+    same counts.
+
+    Returns:
+        int: Number of views written, 0 if another flush is running
+    """
+    if not cache.add(FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        return _flush_cache()
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+
+def _flush_cache():
+    hours = _unflushed_hours()
+    buckets = [(news_id, hour) for hour in hours for news_id in _touched_ids(hour)]
+    flushed = 0
+
+    for i in range(0, len(buckets), FLUSH_CHUNK_SIZE):
+        keys = {_cache_key(news_id, hour): (news_id, hour) for news_id, hour in buckets[i:i+FLUSH_CHUNK_SIZE]}
+        buffered = cache.get_many(list(keys))
+
+        counts = {}
+        for key, count in buffered.items():
+            if not count:
+                continue
+            # Subtract rather than delete so hits recorded meanwhile are kept
+            try:
+                cache.decr(key, count)
+            except ValueError:
+                continue
+            counts[keys[key]] = count
+
+        flushed += _apply_counts(counts)
+
+    # Buckets of the current hour may still grow, so start there next time
+    cache.set(LAST_FLUSH_KEY, hours[-1], timeout=None)
+    return flushed
+
+
+def flush_memory():
+    """Write this process' buffered view counts to the database."""
+    global _last_flush
+    with _pending_lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    return _apply_counts(counts)
+
+
+def flush():
+    """Flush whichever buffer the configured mode uses."""
+    if get_mode() == 'memory':
+        return flush_memory()
+    if get_mode() == 'cache':
+        return flush_cache()
+    return 0
+
+
+def pending_views(news_id):
+    """Views recorded for an article that have not reached the database yet."""
+    mode = get_mode()
+    if mode == 'memory':
+        with _pending_lock:
+            return sum(count for (pk, _hour), count in _pending.items() if pk == news_id)
+    if mode == 'cache':
+        keys = [_cache_key(news_id, hour) for hour in _unflushed_hours()]
+        return sum(cache.get_many(keys).values())
+    return 0
+
+
+@atexit.register
+def _flush_on_exit():
+    # Don't drop a worker's in-process buffer on graceful shutdown
+    if _pending:
+        try:
+            flush_memory()
+        except Exception:
+            pass
+
+
+def check_cache(app_configs, **kwargs):
+    """Warn when the 'cache' mode is chosen with a per-process cache."""
+    if getattr(settings, 'NEWS_VIEW_COUNTER', '') == 'cache' and not cache_is_shared():
+        return [checks.Warning(
+            "NEWS_VIEW_COUNTER is 'cache' but the default cache isn't shared with atomic increments",
+            hint="Set REDIS_URL (or configure a Memcached CACHES backend), "
+                 "or unset NEWS_VIEW_COUNTER to write views directly.",
+            id='news.W001',
+        )]
+    return []
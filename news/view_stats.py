@@ -0,0 +1,109 @@
+# news/view_stats.py
+"""
+Rollups and queries over the per-period article view tables.
+
+``ArticleHourlyViews`` is filled by news.view_counter. ``rollup_daily``
+aggregates it into ``ArticleDailyViews`` and ``prune_hourly`` drops hourly
+rows once they are old enough, so reports read pre-aggregated rows instead
+of scanning ``News``.
+
+Reports read the daily rows up to the last rolled-up day and the hourly rows
+after it, so views recorded since the last rollup (or before the rollup ever
+ran) are counted too.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import News, ArticleHourlyViews, ArticleDailyViews
+
+
+def _days_ago(days):
+    return timezone.now().date() - timedelta(days=days)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _start_of_day(days_ago):
+    return _start_of(_days_ago(days_ago))
+
+
+def rollup_daily(days=2):
+    """
+    (Re)compute daily totals from the hourly rows of the last ``days`` days.
+
+    Whole days are recomputed, so running this repeatedly is safe.
+
+    Returns:
+        int: Number of daily rows written
+    """
+    totals = (ArticleHourlyViews.objects
+              .filter(hour__gte=_start_of_day(days))
+              .annotate(day=TruncDate('hour'))
+              .values('news_id', 'day')
+              .annotate(total=Sum('views')))
+
+    rows = [
+        ArticleDailyViews(news_id=row['news_id'], day=row['day'], views=row['total'])
+        for row in totals
+    ]
+    ArticleDailyViews.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['news', 'day'],
+        update_fields=['views'],
+    )
+    return len(rows)
+
+
+def prune_hourly(keep_days=7):
+    """
+    Delete hourly rows older than ``keep_days`` whole days.
+
+    Returns:
+        int: Number of rows deleted
+    """
+    deleted, _ = ArticleHourlyViews.objects.filter(hour__lt=_start_of_day(keep_days)).delete()
+    return deleted
+
+
+def view_rows(days=30):
+    """
+    The rows holding the views of the last ``days`` days, without overlap.
+
+    The last rolled-up day may have been rolled up part-way through, so it
+    and every later day are read from the hourly rows.
+
+    Returns:
+        tuple: (ArticleDailyViews queryset, ArticleHourlyViews queryset)
+    """
+    since = _days_ago(days)
+    latest = ArticleDailyViews.objects.filter(day__gte=since).order_by('-day').values_list('day', flat=True).first()
+    cutoff = latest or since
+    return (
+        ArticleDailyViews.objects.filter(day__gte=since, day__lt=cutoff),
+        ArticleHourlyViews.objects.filter(hour__gte=_start_of(cutoff)),
+    )
+
+
+def _views_per_article(rows):
+    totals = rows.filter(news=OuterRef('pk')).values('news').annotate(total=Sum('views')).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def most_viewed_news(days=30):
+    """
+    Published articles ordered by the views they received in the last ``days`` days.
+
+    Each article carries a ``period_views`` annotation.
+    """
+    daily, hourly = view_rows(days)
+    return News.published.filter(
+        Q(pk__in=daily.values('news')) | Q(pk__in=hourly.values('news')),
+    ).annotate(
+        period_views=_views_per_article(daily) + _views_per_article(hourly)
+    ).order_by('-period_views', '-publish_date')
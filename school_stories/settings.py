@@ -83,6 +83,31 @@ CACHE_MIDDLEWARE_ALIAS = 'default'
 CACHE_MIDDLEWARE_SECONDS = 600  # 10 minutes
 CACHE_MIDDLEWARE_KEY_PREFIX = 'lbc'
 
+# A cache shared by every process; without it each process has its own
+# local-memory cache
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Article view counting: 'cache' and 'memory' buffer hits and flush them in
+# bulk, 'direct' writes every hit to the database (no increments are lost).
+# Left empty, 'cache' with a shared cache (REDIS_URL) and 'direct' without.
+# The 'cache' buffer is written by `manage.py flush_news_views --watch`.
+NEWS_VIEW_COUNTER = os.getenv('NEWS_VIEW_COUNTER', '')
+NEWS_VIEW_FLUSH_INTERVAL = int(os.getenv('NEWS_VIEW_FLUSH_INTERVAL', 60))  # seconds
+
+# URL namespaces whose pages skip news.context_processors.news_context
+NEWS_CONTEXT_EXCLUDED_NAMESPACES = ['admin']
+
+# Category sections on the home page, and latest articles shown in each
+HOME_CATEGORY_SECTIONS = 6
+HOME_CATEGORY_ARTICLES = 3
+
 CSRF_TRUSTED_ORIGINS = os.getenv('CSRF_TRUSTED_ORIGINS', 'http://localhost:8000').split(',')
 CSRF_COOKIE_SECURE = os.getenv('CSRF_COOKIE_SECURE', 'False') == 'True'
 CSRF_COOKIE_HTTPONLY = os.getenv('CSRF_COOKIE_HTTPONLY', 'True') == 'True'
@@ -168,6 +193,14 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'    # Where collectstatic puts everything
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Served by news.media_serving when DEBUG is on or SERVE_MEDIA is set
+SERVE_MEDIA = os.getenv('SERVE_MEDIA', 'False') == 'True'
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24  # seconds, revalidated with the ETag after that
+
+# Chunked media uploads from the dashboard (dashboard.uploads)
+MEDIA_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+MEDIA_UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+MEDIA_UPLOAD_EXPIRY = 24 * 60 * 60  # seconds after the last chunk, see `manage.py clear_stale_uploads`
 
 # Use WhiteNoise's compressed and hashed storage for static files
 STATICFILES_STORAGE='whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -196,6 +229,15 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', 'mkumczlmeijtqtus')
 DEFAULT_FROM_EMAIL = 'LBC <ko.youssef.public@gmail.com>'
 EMAIL_SUBJECT_PREFIX = '[LBC] '
 
+# Outbound email queue, delivered by `manage.py send_queued_email`
+EMAIL_QUEUE_MAX_ATTEMPTS = 6
+EMAIL_QUEUE_RETRY_DELAY = 60  # seconds, doubled after each failed attempt
+
+# Newsletters and announcements (subscription.bulk_mail)
+EMAIL_BULK_WORKERS = int(os.getenv('EMAIL_BULK_WORKERS', 4))  # parallel SMTP connections
+# Messages per second per recipient domain, '*' for any other domain
+EMAIL_BULK_RATE_LIMITS = {'*': 10}
+
 SERVER_EMAIL = 'inginessef@gmail.com'
 ADMINS = [('Youssef Kotari', os.getenv('ADMIN_EMAIL', 'inginessef@gmail.com'))]
 MANAGERS = [('Yacine', os.getenv('MANAGER_EMAIL', 'inginessef@gmail.com'))]
@@ -1,9 +1,12 @@
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from accounts.views import ProfileListView, ProfileDetailView
 from news.views import HomePageView
+from news.media_serving import serve_media
 from news.sitemap import NewsSitemap
 from django.contrib.sitemaps.views import sitemap
 from django.views.decorators.cache import cache_page
@@ -37,5 +40,12 @@ urlpatterns = [
 
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Uploaded media, with Range and conditional request support for video seeking.
+# In production the web server usually serves MEDIA_ROOT; SERVE_MEDIA=True lets
+# Django do it (under gunicorn the files are still sent with sendfile).
+if settings.DEBUG or getattr(settings, 'SERVE_MEDIA', False):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media,
+                {'document_root': settings.MEDIA_ROOT}),
+    ]
 
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import ContactMessage
+from django.db.models import Count, Q
+from .models import BulkRecipient, BulkSend, ContactMessage, OutgoingEmail, Subscriber
+from . import mail_queue
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
@@ -15,18 +17,56 @@ class ContactMessageAdmin(admin.ModelAdmin):
     
     message_preview.short_description = 'Message'
 
-# @admin.register(Subscriber)
-# class SubscriberAdmin(admin.ModelAdmin):
-#     list_display = ('email', 'name', 'subscribed_at', 'is_active')
-#     list_filter = ('is_active', 'subscribed_at')
-#     search_fields = ('email', 'name')
-#     readonly_fields = ('subscribed_at',)
-#     actions = ['mark_active', 'mark_inactive']
-    
-#     def mark_active(self, request, queryset):
-#         queryset.update(is_active=True)
-#     mark_active.short_description = "Mark selected subscribers as active"
-    
-#     def mark_inactive(self, request, queryset):
-#         queryset.update(is_active=False)
-#     mark_inactive.short_description = "Mark selected subscribers as inactive"
\ No newline at end of file
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'to', 'last_error')
+    readonly_fields = ('attempts', 'locked_until', 'last_error', 'created_at', 'sent_at')
+    date_hierarchy = 'created_at'
+    actions = ['requeue_emails']
+    
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+    
+    def requeue_emails(self, request, queryset):
+        count = mail_queue.requeue(queryset)
+        self.message_user(request, f"Requeued {count} failed email(s)")
+    requeue_emails.short_description = "Retry selected failed emails"
+
+@admin.register(BulkSend)
+class BulkSendAdmin(admin.ModelAdmin):
+    list_display = ('key', 'subject', 'sent_count', 'failed_count', 'created_at', 'finished_at')
+    search_fields = ('key', 'subject')
+    readonly_fields = ('created_at', 'finished_at')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            sent=Count('recipients', filter=Q(recipients__status=BulkRecipient.SENT)),
+            failed=Count('recipients', filter=Q(recipients__status=BulkRecipient.FAILED)),
+        )
+    
+    def sent_count(self, obj):
+        return obj.sent
+    sent_count.short_description = 'Sent'
+    
+    def failed_count(self, obj):
+        return obj.failed
+    failed_count.short_description = 'Failed'
+
+@admin.register(Subscriber)
+class SubscriberAdmin(admin.ModelAdmin):
+    list_display = ('email', 'name', 'subscribed_at', 'is_active')
+    list_filter = ('is_active', 'subscribed_at', 'categories')
+    search_fields = ('email', 'name')
+    readonly_fields = ('subscribed_at',)
+    filter_horizontal = ('categories',)
+    actions = ['mark_active', 'mark_inactive']
+    
+    def mark_active(self, request, queryset):
+        queryset.update(is_active=True)
+    mark_active.short_description = "Mark selected subscribers as active"
+    
+    def mark_inactive(self, request, queryset):
+        queryset.update(is_active=False)
+    mark_inactive.short_description = "Mark selected subscribers as inactive"
@@ -0,0 +1,222 @@
+# subscription/bulk_mail.py
+"""
+Bulk email sending for newsletters and announcements.
+
+Each recipient gets their own message, sent from a thread pool where every
+thread keeps its own open SMTP connection. Sends can be throttled per
+recipient domain (mailbox providers rate-limit senders) with
+``EMAIL_BULK_RATE_LIMITS``, e.g. ``{'gmail.com': 5, '*': 20}`` messages per
+second, ``'*'`` applying to each domain not listed.
+
+The outcome for every address is stored in ``BulkRecipient`` as chunks
+finish. Running a send again under the same key skips the addresses it
+already reached, so a send interrupted by a crash resumes where it stopped.
+
+Everything goes through Django's email backend, so a local stand-in such as
+``python -m aiosmtpd -n -l localhost:1025`` with ``EMAIL_HOST=localhost``,
+``EMAIL_PORT=1025`` and ``EMAIL_USE_TLS=False`` can be used to try it out.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from smtplib import SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.utils import timezone
+
+from .models import BulkRecipient, BulkSend
+
+logger = logging.getLogger(__name__)
+
+# Defaults for EMAIL_BULK_WORKERS and EMAIL_BATCH_SIZE
+WORKERS = 4
+CHUNK_SIZE = 50
+
+
+class RateLimiter:
+    """Spaces calls out to at most ``rate`` per second, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ProviderRateLimits:
+    """A RateLimiter per recipient domain, created as domains come up."""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def wait(self, recipient):
+        domain = recipient.rpartition('@')[2].lower()
+        rate = self.limits.get(domain, self.limits.get('*'))
+        if not rate:
+            return
+        with self.lock:
+            limiter = self.limiters.get(domain)
+            if limiter is None:
+                limiter = self.limiters[domain] = RateLimiter(rate)
+        limiter.wait()
+
+
+class ConnectionPool:
+    """One open email backend connection per thread."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = get_connection()
+            # Opened here, the SMTP backend keeps it open between messages.
+            # Kept only once open, so the next message tries to connect again.
+            connection.open()
+            self.local.connection = connection
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+
+
+class BulkSender:
+    """
+    Send one message per recipient, resumably.
+
+    Args:
+        key (str): Identifies the send. Addresses already sent to under this
+            key are skipped.
+        subject (str): Recorded with the send, for the admin
+        build_message (callable): Returns the EmailMessage for an address.
+            Called from the worker threads.
+        workers (int, optional): Parallel SMTP connections, defaults to
+            EMAIL_BULK_WORKERS
+    """
+
+    def __init__(self, key, subject, build_message, workers=None):
+        self.key = key
+        self.subject = subject
+        self.build_message = build_message
+        self.workers = workers or getattr(settings, 'EMAIL_BULK_WORKERS', WORKERS)
+        self.chunk_size = getattr(settings, 'EMAIL_BATCH_SIZE', CHUNK_SIZE)
+        self.rate_limits = ProviderRateLimits(getattr(settings, 'EMAIL_BULK_RATE_LIMITS', {}))
+        self.pool = ConnectionPool()
+
+    def _send_one(self, recipient):
+        """(recipient, error), error being None once sent."""
+        self.rate_limits.wait(recipient)
+        try:
+            # A refused connection fails this recipient, not the whole send
+            connection = self.pool.get()
+            message = self.build_message(recipient)
+            message.connection = connection
+            try:
+                message.send()
+            except SMTPServerDisconnected:
+                # Servers drop idle or long-lived connections, retry once
+                connection.close()
+                connection.open()
+                message.send()
+        except Exception as e:
+            logger.warning(f"Failed to send '{self.subject}' to {recipient}: {e}")
+            return recipient, str(e) or e.__class__.__name__
+        return recipient, None
+
+    def _send_chunk(self, chunk):
+        return [self._send_one(recipient) for recipient in chunk]
+
+    def _unsent(self, bulk_send, chunk):
+        chunk = list(dict.fromkeys(chunk))
+        sent = set(BulkRecipient.objects.filter(
+            bulk_send=bulk_send, status=BulkRecipient.SENT, email__in=chunk
+        ).values_list('email', flat=True))
+        return [recipient for recipient in chunk if recipient not in sent]
+
+    def _record(self, bulk_send, outcomes, results):
+        # The checkpoint: once stored, these addresses are skipped on resume
+        BulkRecipient.objects.bulk_create(
+            [
+                BulkRecipient(
+                    bulk_send=bulk_send,
+                    email=recipient,
+                    status=BulkRecipient.FAILED if error else BulkRecipient.SENT,
+                    error=error or '',
+                )
+                for recipient, error in outcomes
+            ],
+            update_conflicts=True,
+            unique_fields=['bulk_send', 'email'],
+            update_fields=['status', 'error', 'updated_at'],
+        )
+        failed = sum(1 for _recipient, error in outcomes if error)
+        results['success'] += len(outcomes) - failed
+        results['failure'] += failed
+        logger.info(f"Sent '{self.subject}' to {len(outcomes) - failed} recipients, {failed} failed")
+
+    def send(self, recipients):
+        """
+        Send to every address in ``recipients``, any iterable.
+
+        Returns:
+            dict: success, failure, skipped (sent before) and total counts
+        """
+        bulk_send, _ = BulkSend.objects.get_or_create(key=self.key, defaults={'subject': self.subject})
+        results = {'success': 0, 'failure': 0, 'skipped': 0, 'total': 0}
+        recipients = iter(recipients)
+        # Chunk being sent by each future
+        pending = {}
+        exhausted = False
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                while True:
+                    # Only a few chunks are in flight, the rest of the list
+                    # is read as they finish
+                    while not exhausted and len(pending) < self.workers * 2:
+                        chunk = list(islice(recipients, self.chunk_size))
+                        if not chunk:
+                            exhausted = True
+                            break
+                        results['total'] += len(chunk)
+                        todo = self._unsent(bulk_send, chunk)
+                        results['skipped'] += len(chunk) - len(todo)
+                        if todo:
+                            pending[executor.submit(self._send_chunk, todo)] = todo
+                    if not pending:
+                        break
+                    done, _not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk = pending.pop(future)
+                        try:
+                            outcomes = future.result()
+                        except Exception as e:
+                            # Recorded as failed rather than losing the chunks
+                            # still in flight and those already sent
+                            logger.exception(f"Failed to send '{self.subject}' to a chunk of recipients")
+                            outcomes = [(recipient, str(e) or e.__class__.__name__) for recipient in chunk]
+                        self._record(bulk_send, outcomes, results)
+        finally:
+            self.pool.close()
+
+        bulk_send.finished_at = timezone.now()
+        bulk_send.save(update_fields=['finished_at'])
+        return results
@@ -0,0 +1,205 @@
+# subscription/digest.py
+"""
+Weekly article digest.
+
+Rendering the digest for each subscriber would repeat the same work 100k
+times. Instead:
+
+1. The week's top articles per category are computed once, from the daily
+   view rollups (news.view_stats), and cached like the home page sections.
+2. Subscribers are grouped into segments by the categories they follow, and
+   the digest is rendered once per segment. Only the unsubscribe link
+   differs between recipients, and it is swapped into the rendered HTML.
+   It is signed (subscription.unsubscribe) and deactivates the Subscriber,
+   so the next digest leaves them out.
+3. Segments are sent through subscription.bulk_mail, under one key per week
+   so an interrupted run resumes.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import escape, strip_tags
+
+from news import caching
+from news.dto import ArticleDTO, CategoryDTO
+from news.models import Category, News
+from news.view_stats import most_viewed_news
+from utils.email_utils import UNSUBSCRIBE_PLACEHOLDER
+
+from .bulk_mail import BulkSender
+from .models import Subscriber
+from .unsubscribe import list_unsubscribe_headers, unsubscribe_url
+
+SUBJECT = "Your Weekly Article Digest"
+# Defaults for DIGEST_DAYS and DIGEST_ARTICLES_PER_CATEGORY
+DAYS = 7
+ARTICLES_PER_CATEGORY = 3
+# The top articles are computed at most this often
+TOP_ARTICLES_TIMEOUT = 60 * 60
+
+
+def build_top_articles():
+    """
+    The most viewed articles of the period, per category.
+
+    Categories without enough viewed articles are filled up with the most
+    viewed articles published during the period, so the digest still has
+    content while the view rollups are empty.
+
+    Returns:
+        list: CategoryDTO with ``articles``, for categories that have any
+    """
+    days = getattr(settings, 'DIGEST_DAYS', DAYS)
+    per_category = getattr(settings, 'DIGEST_ARTICLES_PER_CATEGORY', ARTICLES_PER_CATEGORY)
+    related = ('category', 'author__user')
+
+    articles = defaultdict(dict)
+
+    def add(news_list):
+        for news in news_list:
+            picked = articles[news.category_id]
+            if len(picked) < per_category and news.id not in picked:
+                picked[news.id] = news
+
+    add(most_viewed_news(days).select_related(*related))
+    since = timezone.now() - timedelta(days=days)
+    add(News.published.filter(publish_date__gte=since).select_related(*related).order_by('-views'))
+
+    categories = []
+    for category in Category.objects.filter(id__in=articles).order_by('name'):
+        categories.append(CategoryDTO.from_category(category, [
+            ArticleDTO.from_news(news, category=False, author=True)
+            for news in articles[category.id].values()
+        ]))
+    return categories
+
+
+def top_articles():
+    """Cached build_top_articles()."""
+    return caching.get_or_build('weekly_digest', build_top_articles, TOP_ARTICLES_TIMEOUT)
+
+
+def segments():
+    """
+    Active subscribers grouped by the categories they follow.
+
+    Returns:
+        dict: Sorted tuple of category ids (empty for all categories) to
+              the list of email addresses
+    """
+    followed = defaultdict(list)
+    choices = Subscriber.categories.through.objects.filter(subscriber__is_active=True)
+    for subscriber_id, category_id in choices.values_list('subscriber_id', 'category_id').iterator():
+        followed[subscriber_id].append(category_id)
+
+    grouped = defaultdict(list)
+    subscribers = Subscriber.objects.filter(is_active=True).values_list('id', 'email')
+    for subscriber_id, email in subscribers.iterator(chunk_size=5000):
+        grouped[tuple(sorted(followed.get(subscriber_id, ())))].append(email)
+    return dict(grouped)
+
+
+def render_segment(categories, segment):
+    """
+    Digest HTML for a segment, with UNSUBSCRIBE_PLACEHOLDER for the link.
+
+    Returns:
+        str: The HTML, or None when the segment's categories have no articles
+    """
+    if segment:
+        categories = [category for category in categories if category.id in segment]
+    if not categories:
+        return None
+    return render_to_string('emails/article_digest.html', {
+        'categories': categories,
+        'site_url': settings.SITE_URL,
+        'unsubscribe_url': UNSUBSCRIBE_PLACEHOLDER,
+    })
+
+
+def message_builder(html_content):
+    """Return a function building the digest message for one recipient."""
+    text_content = strip_tags(html_content)
+    from_email = getattr(settings, 'DIGEST_FROM_EMAIL', settings.DEFAULT_FROM_EMAIL)
+
+    def build(recipient):
+        email = EmailMultiAlternatives(
+            subject=SUBJECT,
+            body=text_content,
+            from_email=from_email,
+            to=[recipient],
+            headers=list_unsubscribe_headers(recipient),
+        )
+        email.attach_alternative(
+            html_content.replace(UNSUBSCRIBE_PLACEHOLDER, escape(unsubscribe_url(recipient))),
+            "text/html",
+        )
+        return email
+
+    return build
+
+
+def send_digest(key=None):
+    """
+    Send this week's digest to every active subscriber.
+
+    Args:
+        key (str, optional): Identifies the send for resuming, defaults to
+            one per ISO week
+
+    Returns:
+        dict: success, failure, skipped and total counts, plus the number
+              of segments rendered
+    """
+    if key is None:
+        year, week, _day = timezone.now().isocalendar()
+        key = f'digest-{year}-W{week:02d}'
+
+    categories = top_articles()
+    results = {'success': 0, 'failure': 0, 'skipped': 0, 'total': 0, 'segments': 0}
+    for segment, recipients in segments().items():
+        html_content = render_segment(categories, segment)
+        if html_content is None:
+            # Nothing new in the categories they follow
+            results['skipped'] += len(recipients)
+            results['total'] += len(recipients)
+            continue
+        results['segments'] += 1
+        sent = BulkSender(key, SUBJECT, message_builder(html_content)).send(recipients)
+        for name in ('success', 'failure', 'skipped', 'total'):
+            results[name] += sent[name]
+    return results
+
+
+def benchmark(subscribers):
+    """
+    Time building and serializing digests for fake subscribers, without
+    sending anything.
+
+    The addresses are spread over a segment for all categories and one per
+    category, so the rendering cost is included.
+
+    Returns:
+        tuple: (digests built, segments rendered, seconds)
+    """
+    started = time.perf_counter()
+    categories = top_articles()
+    segment_list = [()] + [(category.id,) for category in categories]
+    builders = []
+    for segment in segment_list:
+        html_content = render_segment(categories, segment)
+        if html_content is not None:
+            builders.append(message_builder(html_content))
+
+    built = 0
+    if builders:
+        for i in range(subscribers):
+            build = builders[i % len(builders)]
+            build(f'subscriber{i}@example.com').message().as_bytes()
+            built += 1
+    return built, len(builders), time.perf_counter() - started
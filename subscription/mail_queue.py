@@ -0,0 +1,218 @@
+# subscription/mail_queue.py
+"""
+Outbound email queue.
+
+Talking to the SMTP server inside a request ties the HTTP worker to it: a
+slow or unreachable server stalls the page. Messages are instead stored as
+``OutgoingEmail`` rows, in the same transaction as whatever caused them, and
+delivered by ``manage.py send_queued_email``.
+
+Workers claim a batch of due rows at a time, so several of them (threads or
+processes) can run together without sending a message twice. A claim expires
+after ``EMAIL_QUEUE_LEASE`` seconds, so messages held by a worker that died
+are picked up again. A failed delivery is retried with exponential backoff;
+after ``EMAIL_QUEUE_MAX_ATTEMPTS`` tries the message is marked failed and
+left in the admin, which can requeue it.
+"""
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the EMAIL_QUEUE_* settings
+BATCH_SIZE = 20
+LEASE = 10 * 60
+MAX_ATTEMPTS = 6
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 6 * 60 * 60
+
+
+def enqueue(message, attachment_paths=()):
+    """
+    Queue an email message for delivery.
+
+    Args:
+        message (EmailMessage): The message to send. Files must be given as
+            ``attachment_paths``, in-memory attachments can't be stored.
+        attachment_paths (list, optional): Paths of files to attach
+
+    Returns:
+        OutgoingEmail: The queued message
+    """
+    if message.attachments:
+        raise ValueError("Queued emails take attachments as file paths")
+
+    html_body = ''
+    for content, mimetype in getattr(message, 'alternatives', []):
+        if mimetype == 'text/html':
+            html_body = content
+
+    return OutgoingEmail.objects.create(
+        subject=message.subject,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        body=message.body,
+        html_body=html_body,
+        attachments=list(attachment_paths),
+    )
+
+
+def build_message(email, connection=None):
+    """The EmailMultiAlternatives a queued row stands for."""
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    for path in email.attachments:
+        message.attach_file(path)
+    return message
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the given number of failed attempts."""
+    base = getattr(settings, 'EMAIL_QUEUE_RETRY_DELAY', RETRY_DELAY)
+    ceiling = getattr(settings, 'EMAIL_QUEUE_MAX_RETRY_DELAY', MAX_RETRY_DELAY)
+    # Jitter keeps messages that failed together from retrying together
+    return min(base * 2 ** (attempts - 1), ceiling) * random.uniform(1, 1.25)
+
+
+def _claimable(now):
+    expired = Q(status=OutgoingEmail.SENDING, locked_until__lt=now)
+    return Q(status=OutgoingEmail.QUEUED, next_attempt_at__lte=now) | expired
+
+
+def claim(limit=None):
+    """
+    Reserve up to ``limit`` due messages for the calling worker.
+
+    Returns:
+        list: The claimed OutgoingEmail rows
+    """
+    limit = limit or getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', BATCH_SIZE)
+    lease = getattr(settings, 'EMAIL_QUEUE_LEASE', LEASE)
+    max_attempts = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', MAX_ATTEMPTS)
+    now = timezone.now()
+    token = uuid.uuid4().hex
+
+    # A message whose worker died on its last attempt isn't tried again
+    OutgoingEmail.objects.filter(
+        status=OutgoingEmail.SENDING, locked_until__lt=now, attempts__gte=max_attempts
+    ).update(status=OutgoingEmail.FAILED, last_error='Worker stopped while sending')
+
+    with transaction.atomic():
+        # Rows locked by another worker are skipped rather than waited for
+        ids = list(
+            OutgoingEmail.objects.filter(_claimable(now))
+            .order_by('next_attempt_at')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # The claim condition is checked again so databases without row
+        # locks can't hand the same message to two workers
+        OutgoingEmail.objects.filter(_claimable(now), id__in=ids).update(
+            status=OutgoingEmail.SENDING,
+            claimed_by=token,
+            locked_until=now + timedelta(seconds=lease),
+            attempts=F('attempts') + 1,
+        )
+    return list(OutgoingEmail.objects.filter(claimed_by=token, status=OutgoingEmail.SENDING))
+
+
+def _finish(email, **fields):
+    # Only while still holding the claim, in case it expired meanwhile
+    OutgoingEmail.objects.filter(id=email.id, claimed_by=email.claimed_by).update(
+        claimed_by='', locked_until=None, **fields
+    )
+
+
+def deliver(email, connection=None):
+    """
+    Send one claimed message and record the outcome.
+
+    Returns:
+        bool: True if it was sent
+    """
+    try:
+        build_message(email, connection).send()
+    except Exception as e:
+        if connection is not None:
+            # Reconnect for the next message in case the connection broke
+            connection.close()
+        max_attempts = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', MAX_ATTEMPTS)
+        if email.attempts >= max_attempts:
+            logger.error(f"Giving up on email {email.id} '{email.subject}' after {email.attempts} attempts: {e}")
+            _finish(email, status=OutgoingEmail.FAILED, last_error=str(e))
+        else:
+            logger.warning(f"Failed to send email {email.id} '{email.subject}', will retry: {e}")
+            _finish(
+                email,
+                status=OutgoingEmail.QUEUED,
+                next_attempt_at=timezone.now() + timedelta(seconds=retry_delay(email.attempts)),
+                last_error=str(e),
+            )
+        return False
+
+    _finish(email, status=OutgoingEmail.SENT, sent_at=timezone.now(), last_error='')
+    logger.info(f"Email '{email.subject}' sent to {', '.join(email.to)}")
+    return True
+
+
+def process_queue(batch_size=None):
+    """
+    Deliver due messages over one SMTP connection until none are left.
+
+    Returns:
+        tuple: (sent, failed) message counts
+    """
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        while True:
+            batch = claim(batch_size)
+            if not batch:
+                break
+            for email in batch:
+                if deliver(email, connection):
+                    sent += 1
+                else:
+                    failed += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def requeue(queryset):
+    """Give failed messages a fresh set of attempts."""
+    return queryset.filter(status=OutgoingEmail.FAILED).update(
+        status=OutgoingEmail.QUEUED, attempts=0, next_attempt_at=timezone.now(),
+    )
+
+
+def next_due():
+    """When the next queued message is due, or None."""
+    return OutgoingEmail.objects.filter(status=OutgoingEmail.QUEUED).order_by(
+        'next_attempt_at'
+    ).values_list('next_attempt_at', flat=True).first()
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from subscription import mail_queue
+
+
+def _worker(batch_size):
+    # Each thread gets its own database connection, close it when done
+    try:
+        return mail_queue.process_queue(batch_size)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails, retrying failed ones with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Messages sent in parallel, each over its own SMTP connection (default: 4)")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Messages a worker claims at a time (default: EMAIL_QUEUE_BATCH_SIZE)")
+        parser.add_argument('--watch', action='store_true',
+                            help="Keep running, checking the queue for new messages")
+        parser.add_argument('--interval', type=int, default=5,
+                            help="Longest sleep between checks with --watch, in seconds (default: 5)")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                results = list(executor.map(_worker, [options['batch_size']] * workers))
+                sent = sum(result[0] for result in results)
+                failed = sum(result[1] for result in results)
+                if sent or failed:
+                    self.stdout.write(self.style.SUCCESS(f"Sent {sent} email(s), {failed} failed"))
+
+                if not options['watch']:
+                    if not (sent or failed):
+                        self.stdout.write("No queued emails are due")
+                    return
+
+                # Retries due sooner than the interval are picked up on time
+                sleep = options['interval']
+                due = mail_queue.next_due()
+                if due:
+                    sleep = min(sleep, max(0.5, (due - timezone.now()).total_seconds()))
+                time.sleep(sleep)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from subscription import digest
+
+
+class Command(BaseCommand):
+    help = "Email the week's top articles to every active subscriber"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--key', default=None,
+                            help="Identifies the send for resuming (default: one per ISO week)")
+        parser.add_argument('--benchmark', type=int, metavar='SUBSCRIBERS', default=None,
+                            help="Only time building digests for this many fake subscribers, sending nothing")
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            built, segments, seconds = digest.benchmark(options['benchmark'])
+            rate = built / seconds if seconds else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"Built {built} digest(s) from {segments} rendered segment(s) "
+                f"in {seconds:.2f}s ({rate:.0f} digests/s)"
+            ))
+            return
+
+        results = digest.send_digest(options['key'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent the digest to {results['success']} of {results['total']} subscriber(s) "
+            f"from {results['segments']} segment(s): {results['failure']} failed, "
+            f"{results['skipped']} skipped"
+        ))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-17 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_news_approved_comment_count'),
+        ('subscription', '0003_bulk_send'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Subscriber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('subscribed_at', models.DateTimeField(auto_now_add=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('categories', models.ManyToManyField(blank=True, related_name='subscribers', to='news.category')),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class ContactMessage(models.Model):
     name = models.CharField(max_length=100)
@@ -10,11 +11,101 @@ class ContactMessage(models.Model):
     def __str__(self):
         return f"{self.name}: {self.subject}"
 
-# class Subscriber(models.Model):
-#     email = models.EmailField(unique=True)
-#     name = models.CharField(max_length=100, blank=True)
-#     subscribed_at = models.DateTimeField(auto_now_add=True)
-#     is_active = models.BooleanField(default=True)
-    
-#     def __str__(self):
-#         return self.email
\ No newline at end of file
+class OutgoingEmail(models.Model):
+    """An email waiting for delivery by the send_queued_email command (see mail_queue.py)"""
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+    
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    # File paths, attached when the message is sent
+    attachments = models.JSONField(default=list, blank=True)
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Set by the worker holding the message; the claim expires at locked_until
+    claimed_by = models.CharField(max_length=32, blank=True, editable=False)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        # Sent messages pile up, only the pending ones are searched for work
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status__in=['queued', 'sending']),
+                         name='outgoing_email_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
+
+class BulkSend(models.Model):
+    """A newsletter or announcement send, recording who got it so a crashed send can resume"""
+    key = models.CharField(max_length=100, unique=True)
+    subject = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return self.key
+
+class BulkRecipient(models.Model):
+    """Outcome of a bulk send for one address"""
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+    
+    bulk_send = models.ForeignKey(BulkSend, on_delete=models.CASCADE, related_name='recipients')
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bulk_send', 'email'], name='bulk_recipient_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.email} ({self.status})"
+
+class Subscriber(models.Model):
+    email = models.EmailField(unique=True)
+    name = models.CharField(max_length=100, blank=True)
+    subscribed_at = models.DateTimeField(auto_now_add=True)
+    is_active = models.BooleanField(default=True)
+    # What the weekly digest covers; every category when left empty
+    categories = models.ManyToManyField('news.Category', blank=True, related_name='subscribers')
+    
+    def __str__(self):
+        return self.email
+    
+    @classmethod
+    def unsubscribe(cls, email):
+        """
+        Stop sending mailings to an address.
+        
+        Returns:
+            bool: Whether the address was subscribed
+        """
+        return cls.objects.filter(email__iexact=email, is_active=True).update(is_active=False) > 0
@@ -1,3 +1,295 @@
-from django.test import TestCase
+from datetime import timedelta
+from smtplib import SMTPException, SMTPRecipientsRefused
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail, signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from news.models import Category, News
+from utils.email_utils import send_bulk_announcement, send_newsletter
+from . import digest, mail_queue, unsubscribe
+from .bulk_mail import RateLimiter
+from .models import BulkRecipient, BulkSend, OutgoingEmail, Subscriber
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise SMTPException('Connection refused')
+
+
+class RefusingBackend(EmailBackend):
+    """Refuses addresses at bounce.example.com"""
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].endswith('@bounce.example.com'):
+                raise SMTPRecipientsRefused({message.to[0]: (550, b'No such user')})
+        return super().send_messages(messages)
+
+
+class UnreachableBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError(111, 'Connection refused')
+
+
+class MailQueueTest(TestCase):
+    """Emails are queued in the request and delivered by the worker"""
+
+    def submit_contact_form(self):
+        return self.client.post(reverse('contact'), {
+            'name': 'Sam',
+            'email': 'sam@example.com',
+            'subject': 'Hello',
+            'message': 'A question about the paper.',
+        })
+
+    def test_contact_form_only_queues(self):
+        response = self.submit_contact_form()
+        self.assertRedirects(response, reverse('contact_success'))
+        self.assertEqual(mail.outbox, [])
+        # Admin notification, confirmation and forward to the admins
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.QUEUED).count(), 3)
+
+        self.assertEqual(mail_queue.process_queue(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn(['sam@example.com'], [message.to for message in mail.outbox])
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(), 3)
+        self.assertEqual(mail_queue.process_queue(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='subscription.tests.FailingBackend', EMAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_retry_then_dead_letter(self):
+        self.submit_contact_form()
+        email = OutgoingEmail.objects.first()
+        OutgoingEmail.objects.exclude(id=email.id).delete()
+
+        self.assertEqual(mail_queue.process_queue(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.QUEUED, 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('Connection refused', email.last_error)
+        # Not retried before its backoff is over
+        self.assertEqual(mail_queue.process_queue(), (0, 0))
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(mail_queue.process_queue(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+
+        mail_queue.requeue(OutgoingEmail.objects.all())
+        with self.settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            self.assertEqual(mail_queue.process_queue(), (1, 0))
+
+    def test_expired_claim_is_taken_over(self):
+        self.submit_contact_form()
+        claimed = mail_queue.claim(10)
+        self.assertEqual(len(claimed), 3)
+        self.assertEqual(mail_queue.claim(10), [])
+
+        # The worker holding them died, its claim runs out
+        OutgoingEmail.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(mail_queue.process_queue(), (3, 0))
+        # The old worker can no longer change them
+        mail_queue.deliver(claimed[0])
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(), 3)
+
+
+class NewsletterTest(TestCase):
+    """The newsletter is rendered once and personalized per recipient"""
+
+    def newsletter(self):
+        return SimpleNamespace(
+            title='Spring issue',
+            content='<p>Exams are coming.</p>',
+            author='The editors',
+            publication_date=timezone.now(),
+            issue_number=4,
+            featured_image=ContentFile(b'GIF89a\x01\x00\x01\x00\x00\x00\x00;', name='news/images/cover.gif'),
+        )
+
+    @override_settings(EMAIL_BATCH_SIZE=2, EMAIL_BULK_RATE_LIMITS={})
+    def test_render_once(self):
+        recipients = (f'reader{i}@example.com' for i in range(5))
+        with mock.patch('utils.email_utils.render_to_string', wraps=render_to_string) as render:
+            results = send_newsletter(self.newsletter(), recipients)
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(results, {'success': 5, 'failure': 0, 'skipped': 0, 'total': 5})
+        self.assertEqual(len(mail.outbox), 5)
+
+        # Sent in parallel, so in no particular order
+        message = next(message for message in mail.outbox if message.to == ['reader3@example.com'])
+        html = message.alternatives[0][0]
+        self.assertIn(unsubscribe.unsubscribe_url('reader3@example.com'), html)
+        self.assertEqual(message.extra_headers['List-Unsubscribe-Post'], 'List-Unsubscribe=One-Click')
+        self.assertIn('cid:cover.gif', html)
+        self.assertIn(b'Content-ID: <cover.gif>', message.message().as_bytes())
+
+    @override_settings(EMAIL_BULK_RATE_LIMITS={})
+    def test_new_issue_without_number(self):
+        first, second = self.newsletter(), self.newsletter()
+        first.issue_number = second.issue_number = None
+        second.title = 'Summer issue'
+        self.assertEqual(send_newsletter(first, ['reader@example.com'])['success'], 1)
+        # Only the same issue again is skipped
+        self.assertEqual(send_newsletter(first, ['reader@example.com'])['skipped'], 1)
+        self.assertEqual(send_newsletter(second, ['reader@example.com'])['success'], 1)
+
+
+class UnsubscribeTest(TestCase):
+    """Unsubscribe links are signed and lead to a page that works"""
+
+    def setUp(self):
+        Subscriber.objects.create(email='Reader@example.com')
+
+    def test_confirm_then_unsubscribe(self):
+        url = unsubscribe.unsubscribe_url('Reader@example.com')
+        self.assertTrue(url.startswith(f"{settings.SITE_URL}/unsubscribe/"))
+        path = url[len(settings.SITE_URL):]
+
+        response = self.client.get(path)
+        self.assertContains(response, 'reader@example.com')
+        self.assertTrue(Subscriber.objects.get().is_active)
+
+        self.assertContains(self.client.post(path), 'You Have Been Unsubscribed')
+        self.assertFalse(Subscriber.objects.get().is_active)
+        # Following it again is harmless
+        self.assertEqual(self.client.post(path).status_code, 200)
+
+    def test_forged_link(self):
+        # Signed for something else, or not at all
+        for bad in (signing.dumps('reader@example.com'), 'reader@example.com'):
+            self.assertEqual(self.client.post(reverse('unsubscribe', args=[bad])).status_code, 404)
+        self.assertTrue(Subscriber.objects.get().is_active)
+
+
+@override_settings(EMAIL_BACKEND='subscription.tests.RefusingBackend', EMAIL_BATCH_SIZE=3, EMAIL_BULK_RATE_LIMITS={})
+class BulkSendTest(TestCase):
+    """Bulk sends track each recipient and resume where they stopped"""
+
+    recipients = [f'student{i}@example.com' for i in range(10)] + ['gone@bounce.example.com']
+
+    def test_per_recipient_outcome(self):
+        results = send_bulk_announcement('Sports day', '<p>Friday</p>', self.recipients)
+        self.assertEqual(results, {'success': 10, 'failure': 1, 'skipped': 0, 'total': 11})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(self.recipients[:10]))
+
+        failed = BulkRecipient.objects.get(status=BulkRecipient.FAILED)
+        self.assertEqual(failed.email, 'gone@bounce.example.com')
+        self.assertIn('No such user', failed.error)
+        self.assertIsNotNone(BulkSend.objects.get().finished_at)
+
+    def test_resume(self):
+        # A previous run got through the first four before crashing
+        bulk_send = BulkSend.objects.create(key='spring', subject='Sports day')
+        for recipient in self.recipients[:4]:
+            BulkRecipient.objects.create(bulk_send=bulk_send, email=recipient, status=BulkRecipient.SENT)
+
+        results = send_bulk_announcement('Sports day', '<p>Friday</p>', iter(self.recipients), key='spring')
+        self.assertEqual(results, {'success': 6, 'failure': 1, 'skipped': 4, 'total': 11})
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertNotIn(['student0@example.com'], [message.to for message in mail.outbox])
+
+    @override_settings(EMAIL_BACKEND='subscription.tests.UnreachableBackend')
+    def test_unreachable_server(self):
+        results = send_bulk_announcement('Sports day', '<p>Friday</p>', self.recipients)
+        self.assertEqual(results, {'success': 0, 'failure': 11, 'skipped': 0, 'total': 11})
+        self.assertEqual(BulkRecipient.objects.filter(status=BulkRecipient.FAILED).count(), 11)
+        self.assertIn('Connection refused', BulkRecipient.objects.first().error)
+        self.assertIsNotNone(BulkSend.objects.get().finished_at)
+
+        # Once the server is back, the send resumes with everybody
+        with override_settings(EMAIL_BACKEND='subscription.tests.RefusingBackend'):
+            results = send_bulk_announcement('Sports day', '<p>Friday</p>', self.recipients)
+        self.assertEqual(results['success'], 10)
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(50)
+        start = timezone.now()
+        for _ in range(6):
+            limiter.wait()
+        # Five intervals of 20ms after the first call
+        self.assertGreaterEqual((timezone.now() - start).total_seconds(), 0.09)
+
+
+@override_settings(EMAIL_BULK_RATE_LIMITS={})
+class WeeklyDigestTest(TestCase):
+    """The digest is rendered once per segment of subscribers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = StudentProfile.objects.create(
+            user=User.objects.create_user('writer', 'writer@example.com', 'pass', first_name='Ada')
+        )
+        cls.arts = Category.objects.create(name='Arts')
+        cls.sports = Category.objects.create(name='Sports')
+        Category.objects.create(name='Quiet')
+        for category in (cls.arts, cls.sports):
+            for i in range(4):
+                News.objects.create(
+                    title=f'{category.name} {i}', author=author, category=category,
+                    featured_image='news/images/x.jpg', summary='Summary', content='',
+                    status='published', publish_date=timezone.now() - timedelta(days=1), views=i,
+                )
+
+        for i in range(3):
+            Subscriber.objects.create(email=f'all{i}@example.com')
+        for i in range(2):
+            Subscriber.objects.create(email=f'arts{i}@example.com').categories.add(cls.arts)
+        Subscriber.objects.create(email='quiet@example.com').categories.add(Category.objects.get(name='Quiet'))
+        Subscriber.objects.create(email='gone@example.com', is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_top_articles(self):
+        categories = digest.build_top_articles()
+        self.assertEqual([category.name for category in categories], ['Arts', 'Sports'])
+        self.assertEqual([article.title for article in categories[0].articles], ['Arts 3', 'Arts 2', 'Arts 1'])
+
+    def test_segments(self):
+        self.assertEqual(digest.segments(), {
+            (): ['all0@example.com', 'all1@example.com', 'all2@example.com'],
+            (self.arts.id,): ['arts0@example.com', 'arts1@example.com'],
+            (Category.objects.get(name='Quiet').id,): ['quiet@example.com'],
+        })
+
+    def test_send(self):
+        with mock.patch('subscription.digest.render_to_string', wraps=render_to_string) as render:
+            results = digest.send_digest(key='week')
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual(results, {'success': 5, 'failure': 0, 'skipped': 1, 'total': 6, 'segments': 2})
+
+        by_recipient = {message.to[0]: message.alternatives[0][0] for message in mail.outbox}
+        self.assertIn('Sports 3', by_recipient['all0@example.com'])
+        self.assertNotIn('Sports 3', by_recipient['arts0@example.com'])
+        self.assertIn(unsubscribe.unsubscribe_url('arts1@example.com'), by_recipient['arts1@example.com'])
+
+        # Running it again the same week sends nothing twice
+        mail.outbox = []
+        self.assertEqual(digest.send_digest(key='week')['skipped'], 6)
+        self.assertEqual(mail.outbox, [])
+
+    def test_unsubscribe_link(self):
+        digest.send_digest(key='week')
+        message = next(message for message in mail.outbox if message.to == ['arts1@example.com'])
+        url = message.extra_headers['List-Unsubscribe'].strip('<>')
+        self.assertIn(url, message.alternatives[0][0])
+
+        # The one-click POST a mail client sends
+        response = self.client.post(url[len(settings.SITE_URL):], {'List-Unsubscribe': 'One-Click'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Subscriber.objects.get(email='arts1@example.com').is_active)
+
+        mail.outbox = []
+        digest.send_digest(key='next-week')
+        self.assertNotIn(['arts1@example.com'], [message.to for message in mail.outbox])
+        self.assertEqual(len(mail.outbox), 4)
@@ -4,7 +4,8 @@ from . import views
 urlpatterns = [
     path('contact/', views.ContactView.as_view(), name='contact'),
     path('contact/success/', views.ContactSuccessView.as_view(), name='contact_success'),
-    path("about/", views.AboutUsView.as_view(), name="about")
+    path("about/", views.AboutUsView.as_view(), name="about"),
+    path('unsubscribe/<str:token>/', views.UnsubscribeView.as_view(), name='unsubscribe'),
     # path('subscribe/', views.SubscribeView.as_view(), name='subscribe'),
     # path('subscribe/success/', views.SubscribeSuccessView.as_view(), name='subscribe_success'),
     # path('unsubscribe/<str:email>/', views.unsubscribe, name='unsubscribe'),
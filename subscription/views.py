@@ -1,10 +1,15 @@
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
+from django.http import Http404
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import FormView, TemplateView
 from django.contrib import messages
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.conf import settings
 from .forms import ContactForm
+from .models import Subscriber
+from . import mail_queue, unsubscribe
 from django.conf import settings
 
 
@@ -16,7 +21,7 @@ def error_404_view(request, exception=None):
     # You may need to adjust these imports and queries based on your project structure
     from news.models import News, Category
     
-    popular_news = News.objects.filter(status='published').order_by('-views')[:3]
+    popular_news = News.published.order_by('-views')[:3]
     categories = Category.objects.all()
     
     context = {
@@ -42,7 +47,7 @@ def error_403_view(request, exception=None):
     # Get popular news and categories for the footer
     from news.models import News, Category
     
-    popular_news = News.objects.filter(status='published').order_by('-views')[:3]
+    popular_news = News.published.order_by('-views')[:3]
     categories = Category.objects.all()
     
     context = {
@@ -66,13 +71,13 @@ class ContactView(FormView):
         # Send notification email to admin
         subject = f"New contact message: {contact.subject}"
         message = f"You received a new message from {contact.name} ({contact.email}):\n\n{contact.message}"
-        send_mail(
+        # Queued, so a slow mail server doesn't hold up the response
+        mail_queue.enqueue(EmailMessage(
             subject,
             message,
             settings.DEFAULT_FROM_EMAIL,
             [settings.ADMIN_EMAIL],  # Add this to your settings.py
-            fail_silently=False,
-        )
+        ))
         
         messages.success(self.request, "Your message has been sent successfully!")
         return super().form_valid(form)
@@ -80,6 +85,28 @@ class ContactView(FormView):
 class ContactSuccessView(TemplateView):
     template_name = 'contact/contact_success.html'
 
+# The signed token stands in for the CSRF token: mail clients post the
+# one-click unsubscribe without a session
+@method_decorator(csrf_exempt, name='dispatch')
+class UnsubscribeView(TemplateView):
+    """Confirm, then unsubscribe the address signed into the link (see unsubscribe.py)"""
+    template_name = 'contact/unsubscribe.html'
+    
+    def dispatch(self, request, *args, **kwargs):
+        self.email = unsubscribe.read_token(kwargs['token'])
+        if self.email is None:
+            raise Http404("Invalid unsubscribe link")
+        return super().dispatch(request, *args, **kwargs)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['email'] = self.email
+        return context
+    
+    def post(self, request, *args, **kwargs):
+        Subscriber.unsubscribe(self.email)
+        return self.render_to_response(self.get_context_data(unsubscribed=True))
+
 # class SubscribeView(FormView):
 #     template_name = 'contact/subscribe.html'
 #     form_class = SubscriptionForm
@@ -11,6 +11,7 @@ import numpy as np
 from collections import Counter
 
 from news.models import News, Category, Comment
+from news.view_stats import most_viewed_news, view_rows
 from accounts.models import StudentProfile
 
 
@@ -25,11 +26,7 @@ def get_top_articles(days=30, limit=10):
     Returns:
         QuerySet: Top articles by view count
     """
-    period_start = timezone.now() - timedelta(days=days)
-    return News.objects.filter(
-        status='published',
-        publish_date__gte=period_start
-    ).order_by('-views')[:limit]
+    return most_viewed_news(days=days)[:limit]
 
 
 def get_category_distribution():
@@ -130,16 +127,18 @@ def get_time_series_data(metric_type='views', interval='day', days=30):
         trunc_func = TruncMonth
     
     if metric_type == 'views':
-        # For views, we need to calculate based on the current view count
-        # This is an approximation as we don't track when views occurred
-        articles = News.objects.filter(
-            status='published',
-            publish_date__gte=period_start
-        ).annotate(
-            period=trunc_func('publish_date')
-        ).values('period').annotate(
-            count=Sum('views')
-        ).order_by('period')
+        # Views are read from the daily rollup, plus the hourly rows not rolled up yet
+        daily, hourly = view_rows(days)
+        result = Counter()
+        for rows, field in ((daily, 'day'), (hourly, 'hour')):
+            periods = rows.annotate(
+                period=trunc_func(field)
+            ).values('period').annotate(
+                count=Sum('views')
+            ).order_by('period')
+            for item in periods:
+                result[item['period'].strftime('%Y-%m-%d')] += item['count']
+        return dict(result)
         
     elif metric_type == 'posts':
         # For posts, we count the number published in each time period
@@ -315,18 +314,14 @@ def export_analytics_data(start_date=None, end_date=None, format='csv'):
         publish_date__lte=end_date
     ).values(
         'id', 'title', 'slug', 'author__user__username', 
-        'category__name', 'views', 'publish_date'
+        'category__name', 'views', 'publish_date', 'approved_comment_count'
     )
     
     # Convert to pandas DataFrame
     df = pd.DataFrame(list(articles))
     
-    # Add comment counts
-    comment_counts = {}
-    for article in News.objects.filter(id__in=df['id']):
-        comment_counts[article.id] = article.comments.count()
-    
-    df['comment_count'] = df['id'].map(comment_counts)
+    # Approved comment counts are stored on the article
+    df = df.rename(columns={'approved_comment_count': 'comment_count'})
     
     # Export to the specified format
     filename = f"analytics_export_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
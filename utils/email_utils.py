@@ -1,20 +1,27 @@
+import copy
+import hashlib
 import logging
 import os
 from email.mime.image import MIMEImage
-from smtplib import SMTPException
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail import EmailMultiAlternatives
+from django.db import DatabaseError
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.utils.html import escape, strip_tags
 from django.utils import timezone
 
+from news.dto import ArticleDTO, CategoryDTO
+from subscription import mail_queue
+from subscription.bulk_mail import BulkSender
+from subscription.unsubscribe import list_unsubscribe_headers, unsubscribe_url
+
 logger = logging.getLogger(__name__)
 
 
 def send_email(subject, recipients, template_name, context, attachments=None, from_email=None):
     """
-    Send an email to one or more recipients using a template.
+    Queue an email to one or more recipients using a template.
     
     Args:
         subject (str): Email subject
@@ -25,7 +32,7 @@ def send_email(subject, recipients, template_name, context, attachments=None, fr
         from_email (str, optional): Override the default from email address
     
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if the email was queued, False otherwise
     """
     if from_email is None:
         from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'ko.youssef.public@gmail.com')
@@ -46,35 +53,37 @@ def send_email(subject, recipients, template_name, context, attachments=None, fr
     # Attach HTML version
     email.attach_alternative(html_content, "text/html")
     
-    # Add any attachments
-    if attachments:
-        for file_path in attachments:
-            email.attach_file(file_path)
-    
-    # Try to send the email
+    # Queue it, the send_queued_email command delivers it outside the request
     try:
-        email.send()
-        logger.info(f"Email '{subject}' sent to {', '.join(recipients)}")
+        mail_queue.enqueue(email, attachment_paths=attachments or ())
+        logger.info(f"Email '{subject}' queued for {', '.join(recipients)}")
         return True
-    except SMTPException as e:
-        logger.error(f"Failed to send email '{subject}': {str(e)}")
+    except DatabaseError as e:
+        logger.error(f"Failed to queue email '{subject}': {str(e)}")
         return False
 
 
-def send_newsletter(newsletter, recipients=None):
+# Stands in for each recipient's unsubscribe link in mailings rendered once
+UNSUBSCRIBE_PLACEHOLDER = '__unsubscribe_url__'
+
+
+def _newsletter_builder(newsletter):
     """
-    Send a newsletter to a list of recipients.
-    
-    Args:
-        newsletter: Newsletter object containing content and metadata
-        recipients (list, optional): List of email addresses to send to.
-                                    If None, uses newsletter.recipients
+    Return a function building the newsletter message for one recipient,
+    and the rendered HTML.
     
-    Returns:
-        dict: A summary of the sending operation with success and failure counts
+    The template is rendered once with a placeholder for the unsubscribe
+    link, which is swapped for each recipient's link. The featured image is
+    read and base64-encoded once; each message gets a copy of that part,
+    which shares the encoded payload.
     """
-    if recipients is None:
-        recipients = newsletter.recipients
+    image = None
+    image_cid = None
+    if newsletter.featured_image:
+        image_cid = os.path.basename(newsletter.featured_image.name)
+        with newsletter.featured_image.open('rb') as img:
+            image = MIMEImage(img.read())
+        image.add_header('Content-ID', f'<{image_cid}>')
     
     context = {
         'title': newsletter.title,
@@ -83,60 +92,61 @@ def send_newsletter(newsletter, recipients=None):
         'publication_date': newsletter.publication_date,
         'issue_number': newsletter.issue_number,
         'site_url': settings.SITE_URL,
+        'featured_image_cid': image_cid,
+        'unsubscribe_url': UNSUBSCRIBE_PLACEHOLDER,
     }
+    html_content = render_to_string('emails/newsletter_template.html', context)
+    text_content = strip_tags(newsletter.content)
+    from_email = getattr(settings, 'NEWSLETTER_FROM_EMAIL', settings.DEFAULT_FROM_EMAIL)
+    
+    def build(recipient):
+        email = EmailMultiAlternatives(
+            subject=newsletter.title,
+            body=text_content,
+            from_email=from_email,
+            to=[recipient],
+            headers=list_unsubscribe_headers(recipient),
+        )
+        email.attach_alternative(
+            html_content.replace(UNSUBSCRIBE_PLACEHOLDER, escape(unsubscribe_url(recipient))),
+            "text/html",
+        )
+        if image is not None:
+            # Messages are built in parallel, so they don't share the part itself
+            email.attach(copy.deepcopy(image))
+        return email
+    
+    return build, html_content
+
+
+def send_newsletter(newsletter, recipients=None, key=None):
+    """
+    Send a newsletter to a list of recipients.
     
-    # Track success and failure
-    results = {
-        'success': 0,
-        'failure': 0,
-        'total': len(recipients)
-    }
+    Messages are sent in parallel over several SMTP connections and the
+    outcome is stored per recipient, so sending the same issue again only
+    reaches the recipients that didn't get it (see subscription.bulk_mail).
+    
+    Args:
+        newsletter: Newsletter object containing content and metadata
+        recipients (iterable, optional): Email addresses to send to.
+                                    If None, uses newsletter.recipients
+        key (str, optional): Identifies the send for resuming, defaults to
+                             one per title and rendered content
+    
+    Returns:
+        dict: A summary of the sending operation with success, failure and
+              skipped (already sent) counts
+    """
+    if recipients is None:
+        recipients = newsletter.recipients
     
-    # Send in batches to avoid server limits
-    batch_size = getattr(settings, 'EMAIL_BATCH_SIZE', 50)
-    
-    # Get connection to reuse
-    connection = get_connection()
-    connection.open()
-    
-    for i in range(0, len(recipients), batch_size):
-        batch = recipients[i:i+batch_size]
-        
-        # Create individual messages for each recipient
-        messages = []
-        for recipient in batch:
-            email = EmailMultiAlternatives(
-                subject=newsletter.title,
-                body=strip_tags(newsletter.content),
-                from_email=getattr(settings, 'NEWSLETTER_FROM_EMAIL', settings.DEFAULT_FROM_EMAIL),
-                to=[recipient],
-                connection=connection,
-            )
-            
-            # Render HTML with context
-            html_content = render_to_string('emails/newsletter_template.html', context)
-            email.attach_alternative(html_content, "text/html")
-            
-            # Add embedded images if present
-            if newsletter.featured_image:
-                with open(newsletter.featured_image.path, 'rb') as img:
-                    image = MIMEImage(img.read())
-                    image.add_header('Content-ID', f'<{os.path.basename(newsletter.featured_image.name)}>')
-                    email.attach(image)
-            
-            messages.append(email)
-        
-        # Send all emails in the batch
-        try:
-            connection.send_messages(messages)
-            results['success'] += len(batch)
-            logger.info(f"Sent newsletter '{newsletter.title}' to {len(batch)} recipients")
-        except Exception as e:
-            results['failure'] += len(batch)
-            logger.error(f"Failed to send newsletter batch: {str(e)}")
-    
-    connection.close()
-    return results
+    build, html_content = _newsletter_builder(newsletter)
+    if key is None:
+        # Not the issue number: it may be missing or reused, and every
+        # recipient of the earlier send would be skipped
+        key = 'newsletter-%s' % hashlib.md5(f'{newsletter.title}|{html_content}'.encode()).hexdigest()
+    return BulkSender(key, newsletter.title, build).send(recipients)
 
 
 def send_notification_to_author(article, notification_type):
@@ -217,80 +227,78 @@ def send_feedback_response(feedback, response_text):
     )
 
 
-def send_bulk_announcement(subject, content, recipient_list):
+def send_bulk_announcement(subject, content, recipient_list, key=None):
     """
     Send a bulk announcement to a list of recipients.
     
     Args:
         subject (str): Email subject
         content (str): Email content (HTML supported)
-        recipient_list (list): List of recipient email addresses
+        recipient_list (iterable): Recipient email addresses
+        key (str, optional): Identifies the send for resuming, defaults to
+                             one per subject and content
     
     Returns:
-        dict: Summary of success and failure counts
+        dict: Summary of success, failure and skipped (already sent) counts
     """
     context = {
         'subject': subject,
         'content': content,
         'site_url': settings.SITE_URL,
-        'current_year': timezone.now().year
-    }
-    
-    results = {
-        'success': 0,
-        'failure': 0,
-        'total': len(recipient_list)
+        'current_year': timezone.now().year,
+        'unsubscribe_url': UNSUBSCRIBE_PLACEHOLDER,
     }
     
-    # Send in batches to avoid hitting limits
-    batch_size = getattr(settings, 'EMAIL_BATCH_SIZE', 100)
-    
-    with get_connection() as connection:
-        for i in range(0, len(recipient_list), batch_size):
-            batch = recipient_list[i:i+batch_size]
-            
-            try:
-                # Create email message with both plain text and HTML
-                html_content = render_to_string('emails/announcement.html', context)
-                text_content = strip_tags(html_content)
-                
-                # Create message
-                email = EmailMultiAlternatives(
-                    subject=subject,
-                    body=text_content,
-                    from_email=getattr(settings, 'ANNOUNCEMENT_FROM_EMAIL', settings.DEFAULT_FROM_EMAIL),
-                    to=[],  # Empty to list since we're using BCC
-                    bcc=batch,
-                    connection=connection,
-                )
-                
-                email.attach_alternative(html_content, "text/html")
-                email.send()
-                
-                results['success'] += len(batch)
-                logger.info(f"Sent announcement to batch of {len(batch)} recipients")
-            except Exception as e:
-                results['failure'] += len(batch)
-                logger.error(f"Failed to send announcement batch: {str(e)}")
-    
-    return results
+    # Rendered once, every recipient gets the same content but for the unsubscribe link
+    html_content = render_to_string('emails/announcement.html', context)
+    text_content = strip_tags(html_content)
+    from_email = getattr(settings, 'ANNOUNCEMENT_FROM_EMAIL', settings.DEFAULT_FROM_EMAIL)
+    
+    def build(recipient):
+        # One message per recipient so each delivery is tracked
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=text_content,
+            from_email=from_email,
+            to=[recipient],
+            headers=list_unsubscribe_headers(recipient),
+        )
+        email.attach_alternative(
+            html_content.replace(UNSUBSCRIBE_PLACEHOLDER, escape(unsubscribe_url(recipient))),
+            "text/html",
+        )
+        return email
+    
+    if key is None:
+        key = 'announcement-%s' % hashlib.md5(f'{subject}|{content}'.encode()).hexdigest()
+    return BulkSender(key, subject, build).send(recipient_list)
 
 
 def prepare_article_digest(articles, recipient_email):
     """
     Prepare an email digest of recent articles.
     
+    For the weekly digest sent to every subscriber, see subscription.digest,
+    which renders it once per audience segment instead of once per recipient.
+    
     Args:
-        articles (list): List of article objects
+        articles (list): List of article objects, with their category and
+                         author's user loaded
         recipient_email (str): Recipient's email address
     
     Returns:
         EmailMultiAlternatives: Prepared email message ready to send
     """
+    # Grouped under their categories, in the order given
+    categories = {}
+    for article in articles:
+        category = categories.setdefault(article.category_id, CategoryDTO.from_category(article.category))
+        category.articles.append(ArticleDTO.from_news(article, category=False, author=True))
+    
     context = {
-        'articles': articles,
+        'categories': list(categories.values()),
         'site_url': settings.SITE_URL,
-        'unsubscribe_url': f"{settings.SITE_URL}/unsubscribe/?email={recipient_email}",
+        'unsubscribe_url': unsubscribe_url(recipient_email),
     }
     
     html_content = render_to_string('emails/article_digest.html', context)
@@ -321,6 +329,7 @@ def send_welcome_email(email_address, name=None):
     context = {
         'name': name or 'Reader',
         'site_url': settings.SITE_URL,
+        'unsubscribe_url': unsubscribe_url(email_address),
     }
     
     return send_email(